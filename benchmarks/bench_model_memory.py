@@ -0,0 +1,83 @@
+"""Per-task memory footprint of TaskModel with and without raw payload retention."""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+from dataclasses import dataclass
+from pathlib import Path
+import time
+import tracemalloc
+from typing import List
+
+from azurebatch_cleanup.models import TaskModel
+
+TEMPLATE_PATH = Path(__file__).resolve().parents[1] / "examples" / "az_batch_task.json"
+# inventory size the footprint is projected to; measuring it directly needs tens of GB
+EXTRAPOLATED_TASKS = 1_000_000
+
+
+@dataclass(frozen=True)
+class CliOptions:
+    tasks: int
+
+
+@dataclass(frozen=True)
+class MemoryResult:
+    keep_raw: bool
+    tasks: int
+    total_bytes: int
+    seconds: float
+
+    @property
+    def bytes_per_task(self) -> float:
+        return self.total_bytes / self.tasks
+
+
+def measure(template: str, tasks: int, keep_raw: bool) -> MemoryResult:
+    """Parse `tasks` fresh task payloads, as a streaming listing would, and keep only models."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    inventory: List[TaskModel] = []
+    for index in range(tasks):
+        data = json.loads(template.replace("nf-a3c8f9d7", f"nf-{index:08x}", 1))
+        inventory.append(TaskModel.from_az(data, keep_raw=keep_raw))
+    seconds = time.perf_counter() - started
+    gc.collect()
+    total_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del inventory
+    return MemoryResult(keep_raw=keep_raw, tasks=tasks, total_bytes=total_bytes, seconds=seconds)
+
+
+def _build_parser() -> CliOptions:
+    parser = argparse.ArgumentParser(
+        description="Measure TaskModel memory footprint with and without raw payload retention."
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=20_000,
+        help="number of synthetic tasks in the inventory; the footprint of "
+             f"{EXTRAPOLATED_TASKS:,} tasks is extrapolated from it")
+    args = parser.parse_args()
+    return CliOptions(**vars(args))
+
+
+def main() -> None:
+    opts = _build_parser()
+    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+
+    results = [measure(template, opts.tasks, keep_raw) for keep_raw in (True, False)]
+    for result in results:
+        print(
+            f"keep_raw={str(result.keep_raw):5} tasks={result.tasks} "
+            f"total={result.total_bytes / 2**20:.1f} MiB "
+            f"per_task={result.bytes_per_task:.0f} B "
+            f"parse={result.seconds:.1f} s "
+            f"{EXTRAPOLATED_TASKS:,} tasks~{result.bytes_per_task * EXTRAPOLATED_TASKS / 2**30:.1f} GiB")
+    before, after = results
+    print(f"footprint reduction: {1 - after.total_bytes / before.total_bytes:.0%}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+"""Time and peak memory of the cleanup hot paths on synthetic inventories.
+
+Results are compared with stored baselines; the exit code is 1 when a
+benchmark is slower or uses more memory than its baseline allows.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+from itertools import islice
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from azurebatch_cleanup import core, cp_api, keymap
+from azurebatch_cleanup.criteria import CleanupJobCriteria, CriteriaEvaluator
+
+import synthetic
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+NOW = datetime.fromisoformat("2020-01-03T00:00:00+00:00")
+
+CRITERIA = CleanupJobCriteria(
+    empty=timedelta(hours=12),
+    task_id_pattern=r"^nf-[0-9a-f]{32}$",
+    task_nf_workdir=r"/work/[0-9a-f]{2}/",
+    task_age=timedelta(days=1),
+    task_run_completed=timedelta(hours=6),
+)
+
+Benchmark = Callable[[synthetic.InventorySpec], Callable[[], object]]
+
+
+@dataclass(frozen=True)
+class CliOptions:
+    jobs: List[int]
+    tasks_per_job: int
+    only: Optional[List[str]]
+    baseline: Path
+    update_baseline: bool
+    time_tolerance: float
+    memory_tolerance: float
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    name: str
+    jobs: int
+    tasks: int
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.jobs}x{self.tasks // max(self.jobs, 1)}"
+
+
+# distinct `az task list` outputs kept for the parse benchmark; full payloads
+# for 1M tasks would not fit in memory, so larger inventories cycle through them
+PARSE_DISTINCT_JOBS = 1_000
+
+
+def bench_parse(spec: synthetic.InventorySpec) -> Callable[[], object]:
+    """Streaming JSON decoding plus TaskModel parsing of full `az batch task list` output.
+
+    Models are dropped after each job, as in a streaming listing; the
+    retained footprint is measured by `bench_model_memory.py`.
+    """
+    outputs = [output for _, output in islice(synthetic.iter_task_json(spec), PARSE_DISTINCT_JOBS)]
+
+    def _run() -> object:
+        parsed = 0
+        for job_index in range(spec.jobs):
+            parsed += len(synthetic.parse_task_list(outputs[job_index % len(outputs)]))
+        return parsed
+
+    return _run
+
+
+def bench_evaluate(spec: synthetic.InventorySpec) -> Callable[[], object]:
+    """`CriteriaEvaluator.evaluate` over every job, with one evaluator per run as in core."""
+    jobs, tasks_by_job = synthetic.build_inventory(spec)
+    task_ids = [task.id for tasks in tasks_by_job.values() for task in tasks]
+    run_completed = core.get_run_completed(
+        task_ids, keymap.get_mapper("NEXTFLOW"), synthetic.RunInfoStub(spec))
+
+    def _run() -> object:
+        evaluator = CriteriaEvaluator(CRITERIA, NOW)
+        return [evaluator.evaluate(job, tasks_by_job[job.id], run_completed) for job in jobs]
+
+    return _run
+
+
+def bench_collect_jobs(spec: synthetic.InventorySpec) -> Callable[[], object]:
+    jobs, tasks_by_job = synthetic.build_inventory(spec)
+    get_tasks_run_info = synthetic.RunInfoStub(spec)
+
+    def _run() -> object:
+        return core.collect_jobs(
+            lambda: jobs,
+            tasks_by_job.__getitem__,
+            CRITERIA,
+            get_tasks_run_info,
+            NOW,
+        )
+
+    return _run
+
+
+def bench_task_keys(spec: synthetic.InventorySpec) -> Callable[[], object]:
+    task_ids = [
+        spec.task_id(job_index, task_index)
+        for job_index in range(spec.jobs)
+        for task_index in range(spec.tasks_per_job)
+    ]
+
+    def _run() -> object:
+        return core.task_keys(task_ids, keymap.get_mapper("NEXTFLOW"))
+
+    return _run
+
+
+def bench_run_info_stream(spec: synthetic.InventorySpec) -> Callable[[], object]:
+    """Streaming parse of one CP API run info response covering every task key."""
+    stub = synthetic.RunInfoStub(spec)
+    body = io.BytesIO(stub(list(stub.status_by_key)).model_dump_json(by_alias=True).encode("utf-8"))
+
+    def _run() -> object:
+        body.seek(0)
+        stream = io.TextIOWrapper(body, encoding="utf-8")
+        try:
+            return cp_api.parse_task_run_info_stream(stream)
+        finally:
+            # keep the body open for the next run
+            stream.detach()
+
+    return _run
+
+
+def bench_run_completed_map(spec: synthetic.InventorySpec) -> Callable[[], object]:
+    task_ids = [
+        spec.task_id(job_index, task_index)
+        for job_index in range(spec.jobs)
+        for task_index in range(spec.tasks_per_job)
+    ]
+    task_keys, key2id, shared = core.task_keys(task_ids, keymap.get_mapper("NEXTFLOW"))
+    response = synthetic.RunInfoStub(spec)(task_keys)
+
+    def _run() -> object:
+        return cp_api.get_task_key_run_completed_map(key2id, response, shared)
+
+    return _run
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "parse": bench_parse,
+    "evaluate": bench_evaluate,
+    "collect_jobs": bench_collect_jobs,
+    "task_keys": bench_task_keys,
+    "run_info_stream": bench_run_info_stream,
+    "run_completed_map": bench_run_completed_map,
+}
+
+
+def measure(name: str, spec: synthetic.InventorySpec) -> BenchResult:
+    """Time one run, then repeat it under tracemalloc for the peak allocation.
+
+    Benchmark factories build their input before returning the run closure,
+    so neither the timing nor the peak includes the synthetic data.
+    """
+    run = BENCHMARKS[name](spec)
+    gc.collect()
+    started = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - started
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = run()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result, run
+    gc.collect()
+    return BenchResult(name, spec.jobs, spec.tasks, seconds, peak_bytes)
+
+
+def regressions(
+    results: List[BenchResult],
+    baseline: Dict[str, Dict[str, float]],
+    *,
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> List[str]:
+    found: List[str] = []
+    for result in results:
+        expected = baseline.get(result.key)
+        if expected is None:
+            continue
+        if result.seconds > expected["seconds"] * (1 + time_tolerance):
+            found.append(f"{result.key}: {result.seconds:.3f} s > baseline {expected['seconds']:.3f} s")
+        if result.peak_bytes > expected["peak_bytes"] * (1 + memory_tolerance):
+            found.append(
+                f"{result.key}: peak {result.peak_bytes / 2**20:.1f} MiB"
+                f" > baseline {expected['peak_bytes'] / 2**20:.1f} MiB")
+    return found
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item.replace("_", "")) for item in value.split(",") if item]
+
+
+def _build_parser() -> CliOptions:
+    parser = argparse.ArgumentParser(
+        description="Benchmark parsing, evaluation and run info mapping on synthetic inventories."
+    )
+    parser.add_argument(
+        "--jobs", type=_int_list, default=[1_000, 10_000, 100_000],
+        help="comma-separated inventory sizes in jobs")
+    parser.add_argument(
+        "--tasks-per-job", type=int, default=10,
+        help="tasks per synthetic job; 100k jobs x 10 tasks is 1M tasks")
+    parser.add_argument(
+        "--only", type=lambda value: value.split(","), default=None,
+        help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE_PATH,
+        help="JSON file with baseline results")
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="store these results as the new baseline instead of comparing")
+    parser.add_argument(
+        "--time-tolerance", type=float, default=0.5,
+        help="allowed relative slowdown before a run counts as a regression")
+    parser.add_argument(
+        "--memory-tolerance", type=float, default=0.1,
+        help="allowed relative peak memory growth before a run counts as a regression")
+    args = parser.parse_args()
+    unknown = set(args.only or ()) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    return CliOptions(**vars(args))
+
+
+def main() -> int:
+    opts = _build_parser()
+    results: List[BenchResult] = []
+    for jobs in opts.jobs:
+        spec = synthetic.InventorySpec(jobs=jobs, tasks_per_job=opts.tasks_per_job, now=NOW)
+        for name in opts.only or BENCHMARKS:
+            result = measure(name, spec)
+            results.append(result)
+            print(
+                f"{result.name:18} jobs={result.jobs:<7} tasks={result.tasks:<8} "
+                f"time={result.seconds:8.3f} s peak={result.peak_bytes / 2**20:8.1f} MiB",
+                flush=True)
+
+    baseline = json.loads(opts.baseline.read_text(encoding="utf-8")) if opts.baseline.exists() else {}
+    if opts.update_baseline:
+        for result in results:
+            baseline[result.key] = {"seconds": round(result.seconds, 4), "peak_bytes": result.peak_bytes}
+        opts.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"baseline updated: {opts.baseline}")
+        return 0
+
+    found = regressions(
+        results, baseline,
+        time_tolerance=opts.time_tolerance, memory_tolerance=opts.memory_tolerance)
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,141 @@
+"""Synthetic Nextflow-style Batch inventory for benchmarks.
+
+Task ids are unique `nf-xxxxxxxx...` ids whose engine task keys do not
+collide, and every task carries a `.command.run` resource file under a
+Nextflow work directory derived from its id, as Nextflow on Azure Batch does.
+"""
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from azurebatch_cleanup import cp_api
+from azurebatch_cleanup.jsonstream import iter_json_array
+from azurebatch_cleanup.models import JobSlimModel, TaskModel, TaskSlimModel
+
+EXAMPLES_PATH = Path(__file__).resolve().parents[1] / "examples"
+
+# id of the example task; its hash also appears in the work directory paths
+_TEMPLATE_HASH = "a3c8f9d7b2e6a1c4f8d0b7c2e9f1a5d3"
+_TEMPLATE_JOB_ID = "job-a9f3c7d1b52e6f8093ab-PIPELINE_STAGE_DATA_PREPARE"
+
+# odd multiplier: a bijection on 32-bit values, so task key prefixes never collide
+_KEY_MULTIPLIER = 0x9E3779B1
+
+WORKDIR_URL = "https://bench.blob.core.windows.net/data/pipeline/work/{}/{}/.command.run"
+
+RUN_STATUSES = ("SUCCESS", "FAILURE", "RUNNING")
+
+
+@dataclass(frozen=True)
+class InventorySpec:
+    jobs: int
+    tasks_per_job: int
+    now: datetime
+
+    @property
+    def tasks(self) -> int:
+        return self.jobs * self.tasks_per_job
+
+    def job_id(self, job_index: int) -> str:
+        return f"job-{job_index:08d}"
+
+    def task_hash(self, job_index: int, task_index: int) -> str:
+        index = job_index * self.tasks_per_job + task_index
+        return f"{(index * _KEY_MULTIPLIER) % 2**32:08x}{index:024x}"
+
+    def task_id(self, job_index: int, task_index: int) -> str:
+        return f"nf-{self.task_hash(job_index, task_index)}"
+
+    def last_modified(self, job_index: int) -> datetime:
+        # spread jobs over two days so age cutoffs split the inventory
+        return self.now - timedelta(hours=job_index % 48, minutes=1)
+
+    def run_status(self, job_index: int) -> str:
+        return RUN_STATUSES[job_index % len(RUN_STATUSES)]
+
+
+def job_items(spec: InventorySpec) -> List[Dict]:
+    """Projected job payloads, as listed with `--projection`."""
+    return [
+        {
+            "id": spec.job_id(job_index),
+            "state": "active",
+            "lastModified": spec.last_modified(job_index).isoformat(),
+            "eTag": f"0x{job_index:x}",
+        }
+        for job_index in range(spec.jobs)
+    ]
+
+
+def task_item(spec: InventorySpec, job_index: int, task_index: int) -> Dict:
+    """Projected task payload with its `.command.run` resource file."""
+    task_hash = spec.task_hash(job_index, task_index)
+    return {
+        "id": f"nf-{task_hash}",
+        "state": "completed",
+        "lastModified": spec.last_modified(job_index).isoformat(),
+        "eTag": "0x1",
+        "resourceFiles": [{
+            "filePath": ".command.run",
+            "httpUrl": WORKDIR_URL.format(task_hash[:2], task_hash[2:]),
+        }],
+    }
+
+
+def iter_task_json(spec: InventorySpec) -> Iterator[Tuple[str, str]]:
+    """Yield `(job_id, az task list output)` per job, built from the full example task."""
+    template = (EXAMPLES_PATH / "az_batch_task.json").read_text(encoding="utf-8")
+    template = template.replace(_TEMPLATE_JOB_ID, "{job_id}")
+    for job_index in range(spec.jobs):
+        job_id = spec.job_id(job_index)
+        tasks = [
+            template.replace(_TEMPLATE_HASH, spec.task_hash(job_index, task_index))
+            .replace("{job_id}", job_id)
+            for task_index in range(spec.tasks_per_job)
+        ]
+        yield job_id, "[" + ",".join(tasks) + "]"
+
+
+def build_inventory(spec: InventorySpec) -> Tuple[List[JobSlimModel], Dict[str, List[TaskSlimModel]]]:
+    jobs = [JobSlimModel.from_az(item, keep_raw=False) for item in job_items(spec)]
+    tasks_by_job = {
+        spec.job_id(job_index): [
+            TaskSlimModel.from_az(task_item(spec, job_index, task_index), keep_raw=False)
+            for task_index in range(spec.tasks_per_job)
+        ]
+        for job_index in range(spec.jobs)
+    }
+    return jobs, tasks_by_job
+
+
+class RunInfoStub:
+    """`GetTasksRunInfoFn` answering like the CP API: one payload item per run status."""
+
+    def __init__(self, spec: InventorySpec) -> None:
+        self.status_by_key: Dict[str, str] = {}
+        for job_index in range(spec.jobs):
+            status = spec.run_status(job_index)
+            for task_index in range(spec.tasks_per_job):
+                task_hash = spec.task_hash(job_index, task_index)
+                self.status_by_key[f"{task_hash[:2]}/{task_hash[2:8]}"] = status
+
+    def __call__(self, task_keys: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        keys_by_status: Dict[str, List[str]] = {}
+        for key in task_keys:
+            keys_by_status.setdefault(self.status_by_key[key], []).append(key)
+        return cp_api.CpApiTaskRunInfoResponse(
+            status="OK",
+            payload=[
+                cp_api.CpApiRunItem(run=cp_api.CpApiRunInfo(status=status), engine_task_keys=keys)
+                for status, keys in keys_by_status.items()
+            ],
+        )
+
+
+def parse_task_list(output: str) -> List[TaskSlimModel]:
+    """Parse `az batch task list` output the way the az provider does."""
+    return [TaskModel.from_az(item, keep_raw=False) for item in iter_json_array(io.StringIO(output))]
@@ -14,7 +14,10 @@ setup(
         "python-dotenv>=1.0",
         "pytimeparse>=1.1",
     ],
-    extras_require={"dev": ["pytest>=7.0"]},
+    extras_require={
+        "dev": ["pytest>=7.0"],
+        "columnar": ["numpy>=1.20"],
+    },
     entry_points={
         "console_scripts": [
             "azbatch-cleanup=azurebatch_cleanup.cli:main",
@@ -1,10 +1,30 @@
 """Azure Batch cleanup tool."""
 
+# every module except `columnar`, which needs the optional NumPy extra
 __all__ = [
     "models",
     "criteria",
     "core",
+    "core_async",
     "az_cli",
+    "az_cli_async",
+    "batch_rest",
+    "cli",
+    "concurrency",
     "cp_api",
+    "cp_api_async",
     "env",
+    "http_pool",
+    "inventory",
+    "io",
+    "job_filter",
+    "jsonstream",
+    "keymap",
+    "logging_utils",
+    "metrics",
+    "pipeline",
+    "ratelimit",
+    "retry",
+    "run_cache",
+    "watch",
 ]
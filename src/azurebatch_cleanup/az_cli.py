@@ -3,49 +3,115 @@ from __future__ import annotations
 import json
 import logging
 import subprocess
-from typing import List
+import tempfile
+from typing import IO, Any, Iterator, List, Optional, Sequence
 
-from .models import JobModel, TaskModel
+from . import metrics
+from .job_filter import JobListFilter
+from .jsonstream import DEFAULT_CHUNK_SIZE, iter_json_array
+from .models import JobModel, JobSlimModel, TaskModel, TaskSlimModel
 
 logger = logging.getLogger(__name__)
 
 
+def az_operation(args: Sequence[str]) -> str:
+    """Metrics operation name of an az command, e.g. `az batch job list`."""
+    return " ".join(args[:4])
+
+
+class _CountingReader:
+    """Text stream wrapper counting the characters read, for metrics."""
+
+    def __init__(self, stream: IO[str], call: metrics.Call) -> None:
+        self._stream = stream
+        self._call = call
+
+    def read(self, size: int = -1) -> str:
+        data = self._stream.read(size)
+        self._call.add_bytes(len(data))
+        return data
+
+
 def _run_az(args: List[str]) -> str:
     logger.debug("Running az: %s", " ".join(args))
-    result = subprocess.run(args, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(result.stderr.strip() or "az command failed")
+    with metrics.timer(az_operation(args)) as call:
+        result = subprocess.run(args, capture_output=True, text=True)
+        call.add_bytes(len(result.stdout))
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "az command failed")
     return result.stdout
 
 
-def list_non_complete_jobs() -> List[JobModel]:
-    stdout = _run_az([
+def _stream_az(args: List[str]) -> Iterator[Any]:
+    """Run az and yield the elements of its JSON array output as they are read."""
+    logger.debug("Streaming az: %s", " ".join(args))
+    # stderr goes to a file so a chatty az cannot block on a full pipe
+    with tempfile.TemporaryFile(mode="w+") as stderr, metrics.timer(az_operation(args)) as call:
+        process = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        try:
+            assert process.stdout is not None
+            try:
+                yield from iter_json_array(_CountingReader(process.stdout, call))
+            except ValueError:
+                # drain the rest, so an az still writing cannot block on a full pipe
+                while process.stdout.read(DEFAULT_CHUNK_SIZE):
+                    pass
+                if process.wait() == 0:
+                    raise
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(stderr.read().strip() or "az command failed")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+
+def _projection_args(fields: Optional[Sequence[str]]) -> List[str]:
+    """Server-side `$select` plus a JMESPath projection dropping unselected (null) keys."""
+    if not fields:
+        return []
+    select = ", ".join(f"{field}:{field}" for field in fields)
+    return [
+        "--select",
+        ",".join(fields),
+        "--query",
+        f"[].{{{select}}}",
+    ]
+
+
+def list_jobs_args(
+    fields: Optional[Sequence[str]] = None,
+    job_filter: Optional[JobListFilter] = None,
+) -> List[str]:
+    return [
         "az",
         "batch",
         "job",
         "list",
-        "--query",
-        "[?state!='completed']",
-    ])
-    res = [JobModel.from_az(item) for item in json.loads(stdout or "[]")]
-    return res
+        "--filter",
+        # completed jobs are excluded by the service, so no client-side query is needed
+        (job_filter or JobListFilter()).odata(),
+        *_projection_args(fields),
+    ]
 
 
-def list_tasks(job_id: str) -> List[TaskModel]:
-    stdout = _run_az([
+def list_tasks_args(job_id: str, fields: Optional[Sequence[str]] = None) -> List[str]:
+    return [
         "az",
         "batch",
         "task",
         "list",
         "--job-id",
         job_id,
-    ])
-    res = [TaskModel.from_az(item) for item in json.loads(stdout or "[]")]
-    return res
+        *_projection_args(fields),
+    ]
 
 
-def delete_job(job_id: str) -> None:
-    _run_az([
+def delete_job_args(job_id: str) -> List[str]:
+    return [
         "az",
         "batch",
         "job",
@@ -53,4 +119,41 @@ def delete_job(job_id: str) -> None:
         "--job-id",
         job_id,
         "--yes",
-    ])
+    ]
+
+
+def list_non_complete_jobs(
+    fields: Optional[Sequence[str]] = None,
+    *,
+    keep_raw: bool = True,
+    job_filter: Optional[JobListFilter] = None,
+) -> List[JobSlimModel]:
+    stdout = _run_az(list_jobs_args(fields, job_filter))
+    model = JobSlimModel if fields else JobModel
+    res = [model.from_az(item, keep_raw=keep_raw) for item in json.loads(stdout or "[]")]
+    return res
+
+
+def iter_tasks(
+    job_id: str,
+    fields: Optional[Sequence[str]] = None,
+    *,
+    keep_raw: bool = True,
+) -> Iterator[TaskSlimModel]:
+    """Yield the tasks of a job one at a time while `az` output is still being read."""
+    model = TaskSlimModel if fields else TaskModel
+    for item in _stream_az(list_tasks_args(job_id, fields)):
+        yield model.from_az(item, keep_raw=keep_raw)
+
+
+def list_tasks(
+    job_id: str,
+    fields: Optional[Sequence[str]] = None,
+    *,
+    keep_raw: bool = True,
+) -> List[TaskSlimModel]:
+    return list(iter_tasks(job_id, fields, keep_raw=keep_raw))
+
+
+def delete_job(job_id: str) -> None:
+    _run_az(delete_job_args(job_id))
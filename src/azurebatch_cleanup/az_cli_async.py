@@ -0,0 +1,110 @@
+"""Coroutine providers running `az` through `asyncio` subprocesses."""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+import logging
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from . import metrics
+from .az_cli import az_operation, delete_job_args, list_jobs_args, list_tasks_args
+from .job_filter import JobListFilter
+from .jsonstream import DEFAULT_CHUNK_SIZE, JsonStreamReader
+from .models import JobModel, JobSlimModel, TaskModel, TaskSlimModel
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_az(args: List[str]) -> str:
+    logger.debug("Running az: %s", " ".join(args))
+    with metrics.timer(az_operation(args)) as call:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            # cancelled: do not leave the az process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        call.add_bytes(len(stdout))
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode().strip() or "az command failed")
+    return stdout.decode()
+
+
+async def _stream_az(args: List[str]) -> AsyncIterator[Any]:
+    """Run az and yield the elements of its JSON array output as they are read.
+
+    Coroutine counterpart of `az_cli._stream_az`: stdout chunks are pushed
+    into a `JsonStreamReader`, so only the element being parsed is buffered.
+    """
+    logger.debug("Streaming az: %s", " ".join(args))
+    with metrics.timer(az_operation(args)) as call:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        assert process.stdout is not None and process.stderr is not None
+        # drained alongside stdout so a chatty az cannot block on a full pipe
+        stderr = asyncio.ensure_future(process.stderr.read())
+        try:
+            reader = JsonStreamReader()
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            try:
+                while True:
+                    chunk = await process.stdout.read(DEFAULT_CHUNK_SIZE)
+                    call.add_bytes(len(chunk))
+                    reader.feed(decoder.decode(chunk, final=not chunk))
+                    if not chunk:
+                        reader.feed_eof()
+                    for item in reader.pending_elements():
+                        yield item
+                    if not chunk:
+                        break
+            except ValueError:
+                if await process.wait() == 0:
+                    raise
+            if await process.wait() != 0:
+                raise RuntimeError((await stderr).decode().strip() or "az command failed")
+        finally:
+            # cancelled or failed: do not leave the az process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if not stderr.done():
+                stderr.cancel()
+
+
+async def list_non_complete_jobs(
+    fields: Optional[Sequence[str]] = None,
+    *,
+    keep_raw: bool = True,
+    job_filter: Optional[JobListFilter] = None,
+) -> List[JobSlimModel]:
+    stdout = await _run_az(list_jobs_args(fields, job_filter))
+    model = JobSlimModel if fields else JobModel
+    return [model.from_az(item, keep_raw=keep_raw) for item in json.loads(stdout or "[]")]
+
+
+async def list_tasks(
+    job_id: str,
+    fields: Optional[Sequence[str]] = None,
+    *,
+    keep_raw: bool = True,
+) -> List[TaskSlimModel]:
+    model = TaskSlimModel if fields else TaskModel
+    return [
+        model.from_az(item, keep_raw=keep_raw)
+        async for item in _stream_az(list_tasks_args(job_id, fields))
+    ]
+
+
+async def delete_job(job_id: str) -> None:
+    await _run_az(delete_job_args(job_id))
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from ssl import SSLContext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+from . import az_cli, metrics
+from .job_filter import JobListFilter
+from .http_pool import HttpConnectionPool, HttpResponse
+from .models import JobModel, JobSlimModel, TaskModel, TaskSlimModel
+from .retry import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = "2024-07-01.20.0"
+BATCH_RESOURCE = "https://batch.core.windows.net/"
+
+TokenProvider = Callable[[], str]
+
+
+class BatchRestError(RuntimeError):
+    def __init__(
+        self,
+        status: int,
+        code: Optional[str],
+        message: str,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(
+            f"HTTP {status} {code}: {message}" if code else f"HTTP {status}: {message}")
+        self.status = status
+        self.code = code
+        self.retry_after = retry_after
+
+
+class AzCliTokenProvider:
+    """Bearer token for the Batch resource, fetched once via `az` and cached until expiry."""
+
+    def __init__(
+        self,
+        resource: str = BATCH_RESOURCE,
+        *,
+        refresh_margin_seconds: float = 300,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.resource = resource
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._clock = clock
+        self._token: Optional[str] = None
+        self._expires_on = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> str:
+        with self._lock:
+            if self._token is None or self._clock() >= self._expires_on - self.refresh_margin_seconds:
+                self._token, self._expires_on = self._fetch()
+            return self._token
+
+    def _fetch(self) -> Tuple[str, float]:
+        stdout = az_cli._run_az([
+            "az",
+            "account",
+            "get-access-token",
+            "--resource",
+            self.resource,
+            "--output",
+            "json",
+        ])
+        data = json.loads(stdout)
+        if "expires_on" in data:
+            expires_on = float(data["expires_on"])
+        else:
+            # older az versions only report a naive local timestamp
+            expires_on = datetime.fromisoformat(data["expiresOn"]).timestamp()
+        return data["accessToken"], expires_on
+
+
+def _load_endpoint(endpoint: Optional[str] = None) -> str:
+    resolved = endpoint or os.getenv("AZURE_BATCH_ENDPOINT")
+    if not resolved:
+        raise ValueError("AZURE_BATCH_ENDPOINT environment variable is required")
+    if "://" not in resolved:
+        resolved = f"https://{resolved}"
+    return resolved.rstrip("/")
+
+
+class BatchRestClient:
+    """Azure Batch REST API backend implementing the `core` provider contracts.
+
+    `list_non_complete_jobs`, `list_tasks` and `delete_job` can be passed to
+    `core.run_cleanup` in place of the `az_cli` functions.
+    """
+
+    def __init__(
+        self,
+        token_provider: TokenProvider,
+        *,
+        endpoint: Optional[str] = None,
+        api_version: str = API_VERSION,
+        pool_size: int = 10,
+        timeout_seconds: float = 30,
+        ssl_context: SSLContext | None = None,
+        keep_raw: bool = True,
+    ) -> None:
+        self.endpoint = _load_endpoint(endpoint)
+        self.keep_raw = keep_raw
+        self.api_version = api_version
+        self._token_provider = token_provider
+        self._pool = HttpConnectionPool(
+            self.endpoint,
+            max_size=pool_size,
+            timeout_seconds=timeout_seconds,
+            ssl_context=ssl_context,
+        )
+
+    def _request(self, method: str, path: str) -> HttpResponse:
+        logger.debug("Batch REST %s %s", method, path)
+        with metrics.timer(f"batch_rest {method}") as call:
+            response = self._pool.request(method, path, headers={
+                "Authorization": f"Bearer {self._token_provider()}",
+                "Accept": "application/json",
+            })
+            call.add_bytes(len(response.body))
+            if response.status >= 400:
+                code: Optional[str] = None
+                message = response.body.decode("utf-8", errors="replace")
+                try:
+                    error = json.loads(message)
+                    code = error.get("code")
+                    message = (error.get("message") or {}).get("value") or message
+                except (ValueError, AttributeError):
+                    pass
+                raise BatchRestError(
+                    response.status, code, message,
+                    retry_after=parse_retry_after(response.header("Retry-After")))
+        return response
+
+    def _path(self, path: str, **params: str) -> str:
+        query = {"api-version": self.api_version, **params}
+        return f"{path}?{urlencode(query, quote_via=quote)}"
+
+    def _iter_items(self, path: str) -> Iterator[Dict[str, Any]]:
+        """Yield list items across all result pages."""
+        next_path: Optional[str] = path
+        while next_path is not None:
+            page = json.loads(self._request("GET", next_path).body or b"{}")
+            yield from page.get("value", [])
+            next_link = page.get("odata.nextLink")
+            next_path = None
+            if next_link:
+                parts = urlsplit(next_link)
+                next_path = f"{parts.path}?{parts.query}"
+
+    def list_non_complete_jobs(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        *,
+        job_filter: Optional[JobListFilter] = None,
+    ) -> List[JobSlimModel]:
+        params = {"$filter": (job_filter or JobListFilter()).odata()}
+        if fields:
+            params["$select"] = ",".join(fields)
+        model = JobSlimModel if fields else JobModel
+        return [
+            model.from_az(item, keep_raw=self.keep_raw)
+            for item in self._iter_items(self._path("/jobs", **params))
+        ]
+
+    def list_tasks(self, job_id: str, fields: Optional[Sequence[str]] = None) -> List[TaskSlimModel]:
+        params = {"$select": ",".join(fields)} if fields else {}
+        path = self._path(f"/jobs/{quote(job_id, safe='')}/tasks", **params)
+        model = TaskSlimModel if fields else TaskModel
+        return [model.from_az(item, keep_raw=self.keep_raw) for item in self._iter_items(path)]
+
+    def delete_job(self, job_id: str) -> None:
+        self._request("DELETE", self._path(f"/jobs/{quote(job_id, safe='')}"))
+
+    def close(self) -> None:
+        self._pool.close()
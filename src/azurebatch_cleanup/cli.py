@@ -1,20 +1,32 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from functools import partial
+import signal
 import ssl
-from typing import Iterable, Optional
+import threading
+from typing import Iterable, Optional, Tuple
 
 from pytimeparse.timeparse import timeparse
 
-from . import az_cli
+from . import az_cli, az_cli_async, batch_rest, cp_api_async, metrics
 from .env import load_env
 from .io import ConsoleIO
 from .logging_utils import configure_logging
-from .criteria import CleanupJobCriteria
-from .core import run_cleanup
+from .criteria import CleanupJobCriteria, projection_for
+from .job_filter import JobListFilter, job_list_filter
+from .core import OUTPUT_MODES, JsonlReport, run_cleanup
+from .core_async import run_cleanup_async
 from . import cp_api
+from .inventory import InventoryLister, InventoryStore
+from .run_cache import RunStatusCache, cached_tasks_run_info
+from .pipeline import run_pipeline
+from .concurrency import AdaptiveLimiter
+from .retry import RetryPolicy, job_already_deleted, retrying, retrying_async
+from .watch import run_watch
 
 
 def parseDuration(interval_str: str) -> timedelta:
@@ -52,11 +64,42 @@ class CliOptions:
     task_age: Optional[timedelta]
     task_run_completed: Optional[timedelta]
 
+    pool_id: Optional[str]
+
+    cp_api_chunk_size: int
+    cp_api_concurrency: int
+    cp_api_retries: int
+    cp_api_gzip_requests: bool
+    retries: int
+    retry_deadline: timedelta
+    run_cache_dir: Optional[str]
+    run_cache_ttl: timedelta
+
+    inventory: Optional[str]
+    inventory_max_age: Optional[timedelta]
+
     dry_run: bool
     yes: bool
     ignore_errors: bool
+    watch: Optional[timedelta]
+    pipeline: bool
+    queue_size: int
+
+    list_concurrency: int
+    delete_concurrency: int
+    delete_rate: Optional[float]
+    adaptive_concurrency: bool
+
+    backend: str
+    engine: str
+    projection: bool
+    columnar: bool
+
+    output: str
+    report: Optional[str]
 
     log_level: Optional[str]
+    metrics_out: Optional[str]
     insecure: bool
 
 
@@ -91,6 +134,46 @@ def _build_parser() -> CliOptions:
         help="delete jobs where all tasks belong to runs with completed status via CP API"
              "older than specified time (based on lastModified of job)")
 
+    parser.add_argument(
+        "--pool-id", type=str, default=None,
+        help="only consider jobs running on this pool")
+
+    parser.add_argument(
+        "--cp-api-chunk-size", type=int, default=5000,
+        help="number of task keys sent per CP API run info request")
+    parser.add_argument(
+        "--cp-api-concurrency", type=int, default=4,
+        help="number of CP API run info requests running in parallel")
+    parser.add_argument(
+        "--cp-api-retries", type=int, default=2,
+        help="number of retries, with backoff, for failed CP API run info requests")
+    parser.add_argument(
+        "--cp-api-gzip-requests", action="store_true",
+        help="gzip-compress CP API request bodies (the server must accept "
+             "Content-Encoding: gzip); responses are always accepted compressed")
+    parser.add_argument(
+        "--retries", type=int, default=3,
+        help="number of retries, with backoff, for throttled or failed job listing, "
+             "task listing and deletion calls")
+    parser.add_argument(
+        "--retry-deadline", type=parseDuration, default=timedelta(minutes=5),
+        help="stop retrying a call this long after its first attempt")
+
+    parser.add_argument(
+        "--run-cache-dir", type=str, default=None,
+        help="directory of the on-disk cache of CP API run statuses (disabled when not set)")
+    parser.add_argument(
+        "--run-cache-ttl", type=parseDuration, default=timedelta(minutes=5),
+        help="how long non-terminal run statuses are served from the cache")
+
+    parser.add_argument(
+        "--inventory", type=str, default=None,
+        help="path of the job/task inventory file; tasks are only re-listed "
+             "for jobs whose eTag changed since the previous run")
+    parser.add_argument(
+        "--inventory-max-age", type=parseDuration, default=None,
+        help="re-list tasks of jobs whose stored task list is older than this")
+
     parser.add_argument(
         "--dry-run", action="store_true",
         help="only show jobs to delete")
@@ -101,9 +184,60 @@ def _build_parser() -> CliOptions:
         "--ignore-errors", action="store_true",
         help="continue deleting even if one deletion fails",
     )
+    parser.add_argument(
+        "--watch", type=parseDuration, default=None,
+        help="keep running and re-check changed jobs every specified interval "
+             "(requires --yes or --dry-run)")
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="stream jobs through listing, lookup, evaluation and deletion stages; "
+             "with --yes deletions start while jobs are still being listed")
+    parser.add_argument(
+        "--queue-size", type=int, default=100,
+        help="capacity of each --pipeline stage queue")
+    parser.add_argument(
+        "--list-concurrency", type=int, default=1,
+        help="number of jobs whose tasks are listed in parallel")
+    parser.add_argument(
+        "--delete-concurrency", type=int, default=1,
+        help="number of job deletions running in parallel")
+    parser.add_argument(
+        "--delete-rate", type=float, default=None,
+        help="maximum number of job deletions started per second")
+    parser.add_argument(
+        "--adaptive-concurrency", action="store_true",
+        help="adjust concurrency to throttling and latency (AIMD); the --list-, "
+             "--delete- and --cp-api-concurrency values become upper limits")
+    parser.add_argument(
+        "--backend", type=str, default="az", choices=["az", "rest"],
+        help="Azure Batch access: 'az' runs Azure CLI commands, "
+             "'rest' calls the Batch REST API over pooled connections")
+    parser.add_argument(
+        "--engine", type=str, default="threads", choices=["threads", "asyncio"],
+        help="concurrency model: 'threads' runs blocking calls on worker threads, "
+             "'asyncio' drives az subprocesses and CP API requests from one event loop")
+    parser.add_argument(
+        "--projection", action="store_true",
+        help="fetch only the job and task fields required by the selected filters")
+    parser.add_argument(
+        "--columnar", action="store_true",
+        help="evaluate criteria for all jobs at once with NumPy "
+             "(requires the 'columnar' extra)")
+    parser.add_argument(
+        "--output", type=str, default="tasks", choices=list(OUTPUT_MODES),
+        help="candidate listing: 'tasks' prints every task of a job, "
+             "'summary' prints its task count and number of tasks per state")
+    parser.add_argument(
+        "--report", type=str, default=None,
+        help="also write skipped jobs and deletion candidates to this file as JSON lines, "
+             "with task counts per state instead of the tasks")
     parser.add_argument(
         "--log-level", type=str, default="WARNING",
         help="logging level (DEBUG, INFO, WARNING, ERROR)")
+    parser.add_argument(
+        "--metrics-out", type=str, default=None,
+        help="write call counts, latencies, bytes read and errors per operation to this file "
+             "at the end of the run; a Prometheus textfile for *.prom, JSON otherwise")
     parser.add_argument(
         "--insecure", action="store_true",
         help="disable SSL certificate verification")
@@ -117,9 +251,119 @@ def _build_parser() -> CliOptions:
         parser.error(
             "--task-age is required when using --task-id-pattern or --task-nf-workdir")
 
+    if args.watch is not None and not (args.yes or args.dry_run):
+        parser.error("--watch requires --yes or --dry-run")
+
+    if args.pipeline and (args.watch is not None or args.columnar or args.inventory):
+        parser.error("--pipeline cannot be combined with --watch, --columnar or --inventory")
+    if args.engine == "asyncio" and (
+            args.backend != "az" or args.pipeline or args.watch is not None
+            or args.inventory or args.run_cache_dir or args.cp_api_gzip_requests):
+        parser.error(
+            "--engine asyncio requires --backend az and cannot be combined with "
+            "--pipeline, --watch, --inventory, --run-cache-dir or --cp-api-gzip-requests")
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+
+    if args.list_concurrency < 1:
+        parser.error("--list-concurrency must be at least 1")
+    if args.cp_api_chunk_size < 1 or args.cp_api_concurrency < 1:
+        parser.error("--cp-api-chunk-size and --cp-api-concurrency must be at least 1")
+    if args.cp_api_retries < 0:
+        parser.error("--cp-api-retries must not be negative")
+    if args.retries < 0:
+        parser.error("--retries must not be negative")
+    if args.delete_concurrency < 1:
+        parser.error("--delete-concurrency must be at least 1")
+    if args.delete_rate is not None and args.delete_rate <= 0:
+        parser.error("--delete-rate must be positive")
+
     return CliOptions(**vars(args))
 
 
+def _write_metrics(opts: CliOptions) -> None:
+    if opts.metrics_out is not None:
+        metrics.REGISTRY.write(opts.metrics_out)
+
+
+def _retry_policies(opts: CliOptions) -> Tuple[RetryPolicy, RetryPolicy]:
+    """Policies for Batch calls and for CP API run info requests."""
+    deadline = opts.retry_deadline.total_seconds()
+    return (
+        RetryPolicy(max_attempts=opts.retries + 1, deadline=deadline),
+        RetryPolicy(max_attempts=opts.cp_api_retries + 1, deadline=deadline),
+    )
+
+
+def _limiters(
+    opts: CliOptions,
+) -> Tuple[Optional[AdaptiveLimiter], Optional[AdaptiveLimiter], Optional[AdaptiveLimiter]]:
+    """Limiters for task listing, job deletion and CP API requests."""
+    if not opts.adaptive_concurrency:
+        return None, None, None
+    return (
+        # a job's listing takes as long as it has task pages, so only throttling counts
+        AdaptiveLimiter("list_tasks", opts.list_concurrency,
+                        initial=max(opts.list_concurrency // 2, 1), latency_tolerance=None),
+        AdaptiveLimiter("delete_job", opts.delete_concurrency,
+                        initial=max(opts.delete_concurrency // 2, 1)),
+        AdaptiveLimiter("cp_api", opts.cp_api_concurrency,
+                        initial=max(opts.cp_api_concurrency // 2, 1)),
+    )
+
+
+def _run_cleanup_async(
+    opts: CliOptions,
+    criteria: CleanupJobCriteria,
+    now: datetime,
+    job_filter: JobListFilter,
+    ssl_context: Optional[ssl.SSLContext],
+    report: Optional[JsonlReport],
+) -> int:
+    batch_retry, cp_api_retry = _retry_policies(opts)
+    list_limiter, delete_limiter, cp_api_limiter = _limiters(opts)
+    list_jobs = partial(
+        az_cli_async.list_non_complete_jobs, keep_raw=False, job_filter=job_filter)
+    list_tasks = partial(az_cli_async.list_tasks, keep_raw=False)
+    delete_job = az_cli_async.delete_job
+    if opts.projection:
+        projection = projection_for(criteria)
+        list_jobs = partial(list_jobs, fields=projection.job_fields)
+        list_tasks = partial(list_tasks, fields=projection.task_fields)
+    if list_limiter is not None:
+        list_tasks = list_limiter.wrap_async(list_tasks)
+    if delete_limiter is not None:
+        delete_job = delete_limiter.wrap_async(delete_job)
+    get_tasks_run_info = partial(
+        cp_api_async.get_tasks_run_info,
+        ssl_context=ssl_context,
+        chunk_size=opts.cp_api_chunk_size,
+        concurrency=opts.cp_api_concurrency,
+        retry_policy=cp_api_retry,
+        limiter=cp_api_limiter,
+    )
+    return asyncio.run(run_cleanup_async(
+        retrying_async(list_jobs, batch_retry, description="list jobs"),
+        retrying_async(list_tasks, batch_retry, description="list tasks"),
+        get_tasks_run_info,
+        retrying_async(
+            delete_job, batch_retry,
+            description="delete job", already_done=job_already_deleted),
+        criteria,
+        dry_run=opts.dry_run,
+        assume_yes=opts.yes,
+        ignore_errors=opts.ignore_errors,
+        io=ConsoleIO(),
+        now=now,
+        list_concurrency=opts.list_concurrency,
+        delete_concurrency=opts.delete_concurrency,
+        delete_rate=opts.delete_rate,
+        columnar=opts.columnar,
+        output=opts.output,
+        report=report,
+    ))
+
+
 def main() -> int:
     load_env()
     opts = _build_parser()
@@ -141,25 +385,179 @@ def main() -> int:
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
 
+    now = datetime.now(tz=timezone.utc)
+    # only jobs old enough for the loosest criterion are listed
+    job_filter = job_list_filter(criteria, now, opts.pool_id)
+    # opened inside the guarded blocks, so a failed setup cannot leak the file
+    report: Optional[JsonlReport] = None
+    if opts.engine == "asyncio":
+        try:
+            if opts.report is not None:
+                report = JsonlReport(opts.report)
+            return _run_cleanup_async(opts, criteria, now, job_filter, ssl_context, report)
+        finally:
+            if report is not None:
+                report.close()
+            _write_metrics(opts)
+
+    batch_retry, cp_api_retry = _retry_policies(opts)
+    list_limiter, delete_limiter, cp_api_limiter = _limiters(opts)
+
+    # one client for the whole run, so chunks and watch cycles reuse its connections
+    cp_api_client = None
+    tasks_run_info_source = partial(cp_api.get_tasks_run_info, ssl_context=ssl_context)
+    if criteria.task_run_completed is not None:
+        cp_api_client = cp_api.CpApiClient(
+            pool_size=opts.cp_api_concurrency,
+            ssl_context=ssl_context,
+            gzip_requests=opts.cp_api_gzip_requests,
+        )
+        tasks_run_info_source = cp_api_client.get_tasks_run_info
+
     def _get_tasks_run_info(task_id_list: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
-        return cp_api.get_tasks_run_info(
+        return tasks_run_info_source(
             task_id_list,
+            chunk_size=opts.cp_api_chunk_size,
+            concurrency=opts.cp_api_concurrency,
+            retry_policy=cp_api_retry,
+            limiter=cp_api_limiter,
+        )
+
+    get_tasks_run_info = _get_tasks_run_info
+    run_cache = None
+    if opts.run_cache_dir is not None:
+        run_cache = RunStatusCache(
+            opts.run_cache_dir, ttl_seconds=opts.run_cache_ttl.total_seconds())
+        get_tasks_run_info = cached_tasks_run_info(_get_tasks_run_info, run_cache)
+
+    # nothing in the cleanup reads the source payload, so do not keep it
+    list_jobs = partial(
+        az_cli.list_non_complete_jobs, keep_raw=False, job_filter=job_filter)
+    list_tasks = partial(az_cli.list_tasks, keep_raw=False)
+    delete_job = az_cli.delete_job
+    batch_client = None
+    if opts.backend == "rest":
+        batch_client = batch_rest.BatchRestClient(
+            batch_rest.AzCliTokenProvider(),
+            pool_size=max(opts.list_concurrency, opts.delete_concurrency),
             ssl_context=ssl_context,
+            keep_raw=False,
+        )
+        list_jobs = partial(batch_client.list_non_complete_jobs, job_filter=job_filter)
+        list_tasks = batch_client.list_tasks
+        delete_job = batch_client.delete_job
+
+    if opts.projection:
+        projection = projection_for(criteria)
+        list_jobs = partial(list_jobs, fields=projection.job_fields)
+        list_tasks = partial(list_tasks, fields=projection.task_fields)
+
+    # inside the retries, so every throttled attempt lowers the limit
+    if list_limiter is not None:
+        list_tasks = list_limiter.wrap(list_tasks)
+    if delete_limiter is not None:
+        delete_job = delete_limiter.wrap(delete_job)
+
+    # transient failures and throttling are retried per call instead of failing the run
+    list_jobs = retrying(list_jobs, batch_retry, description="list jobs")
+    list_tasks = retrying(list_tasks, batch_retry, description="list tasks")
+    delete_job = retrying(
+        delete_job, batch_retry, description="delete job", already_done=job_already_deleted)
+
+    inventory = None
+    verify_tasks = None
+    if opts.inventory is not None:
+        inventory = InventoryLister(
+            InventoryStore(opts.inventory),
+            list_jobs,
+            list_tasks,
+            max_age_seconds=opts.inventory_max_age.total_seconds()
+            if opts.inventory_max_age is not None else None,
         )
+        list_jobs = inventory.list_jobs
+        list_tasks = inventory.list_tasks
+        verify_tasks = inventory.verify_tasks
 
     io = ConsoleIO()
-    return run_cleanup(
-        az_cli.list_non_complete_jobs,
-        az_cli.list_tasks,
-        _get_tasks_run_info,
-        az_cli.delete_job,
-        criteria,
-        dry_run=opts.dry_run,
-        assume_yes=opts.yes,
-        ignore_errors=opts.ignore_errors,
-        io=io,
-        now=datetime.now(tz=timezone.utc)
-    )
+    try:
+        if opts.report is not None:
+            report = JsonlReport(opts.report)
+        if opts.watch is not None:
+            stop = threading.Event()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: stop.set())
+            return run_watch(
+                list_jobs,
+                list_tasks,
+                get_tasks_run_info,
+                delete_job,
+                criteria,
+                interval=opts.watch,
+                stop=stop,
+                dry_run=opts.dry_run,
+                ignore_errors=opts.ignore_errors,
+                io=io,
+                list_concurrency=opts.list_concurrency,
+                delete_concurrency=opts.delete_concurrency,
+                delete_rate=opts.delete_rate,
+                output=opts.output,
+                report=report,
+                # the startup filter would hide jobs that only become old enough later
+                job_filter=partial(job_list_filter, criteria, pool_id=opts.pool_id),
+                verify_tasks=verify_tasks,
+            )
+        if opts.pipeline:
+            return run_pipeline(
+                list_jobs,
+                list_tasks,
+                get_tasks_run_info,
+                delete_job,
+                criteria,
+                dry_run=opts.dry_run,
+                assume_yes=opts.yes,
+                ignore_errors=opts.ignore_errors,
+                io=io,
+                now=now,
+                list_concurrency=opts.list_concurrency,
+                delete_concurrency=opts.delete_concurrency,
+                delete_rate=opts.delete_rate,
+                queue_size=opts.queue_size,
+                output=opts.output,
+                report=report,
+            )
+        return run_cleanup(
+            list_jobs,
+            list_tasks,
+            get_tasks_run_info,
+            delete_job,
+            criteria,
+            dry_run=opts.dry_run,
+            assume_yes=opts.yes,
+            ignore_errors=opts.ignore_errors,
+            io=io,
+            now=now,
+            list_concurrency=opts.list_concurrency,
+            delete_concurrency=opts.delete_concurrency,
+            delete_rate=opts.delete_rate,
+            columnar=opts.columnar,
+            verify_tasks=verify_tasks,
+            output=opts.output,
+            report=report,
+        )
+    finally:
+        if inventory is not None:
+            inventory.report_stats(io)
+            inventory.store.close()
+        if run_cache is not None:
+            run_cache.report_stats(io)
+            run_cache.close()
+        if cp_api_client is not None:
+            cp_api_client.close()
+        if batch_client is not None:
+            batch_client.close()
+        if report is not None:
+            report.close()
+        _write_metrics(opts)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""Columnar, vectorized evaluation of cleanup criteria over a whole inventory.
+
+Requires NumPy (`pip install azurebatch-cleanup[columnar]`).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .criteria import CleanupJobCriteria, CriteriaEvaluator, Decision
+from .models import JobSlimModel, TaskSlimModel, ensure_utc
+
+TaskCheck = Callable[[TaskSlimModel], bool]
+
+_REASONS = ("age", "empty", "task", "task-run-completed")
+
+
+def _to_datetime64(value: Optional[datetime]) -> np.datetime64:
+    if value is None:
+        return np.datetime64("NaT", "us")
+    return np.datetime64(ensure_utc(value).replace(tzinfo=None), "us")
+
+
+@dataclass(frozen=True)
+class ColumnarInventory:
+    """Jobs and tasks flattened into parallel arrays.
+
+    `task_job_index[i]` is the position in `job_ids` of the job owning
+    `tasks[i]`.
+    """
+    job_ids: List[str]
+    last_modified: np.ndarray
+    task_counts: np.ndarray
+    tasks: List[TaskSlimModel]
+    task_job_index: np.ndarray
+
+    @classmethod
+    def build(
+        cls,
+        jobs: Sequence[JobSlimModel],
+        tasks_by_job: Mapping[str, Sequence[TaskSlimModel]],
+    ) -> "ColumnarInventory":
+        tasks: List[TaskSlimModel] = []
+        task_counts = np.zeros(len(jobs), dtype=np.int64)
+        for index, job in enumerate(jobs):
+            job_tasks = tasks_by_job.get(job.id, ())
+            task_counts[index] = len(job_tasks)
+            tasks.extend(job_tasks)
+        return cls(
+            job_ids=[job.id for job in jobs],
+            last_modified=np.array(
+                [_to_datetime64(job.last_modified) for job in jobs], dtype="datetime64[us]"),
+            task_counts=task_counts,
+            tasks=tasks,
+            task_job_index=np.repeat(np.arange(len(jobs), dtype=np.int64), task_counts),
+        )
+
+    def older_than(self, cutoff: Optional[datetime]) -> np.ndarray:
+        """Per-job mask of `lastModified <= cutoff` (all False without a cutoff)."""
+        if cutoff is None:
+            return np.zeros(len(self.job_ids), dtype=bool)
+        return self.last_modified <= _to_datetime64(cutoff)
+
+    def every_task(self, job_mask: np.ndarray, check: TaskCheck) -> np.ndarray:
+        """Per-job mask of jobs in `job_mask` having at least one task, all passing `check`.
+
+        `check` is only applied to tasks of jobs selected by `job_mask`.
+        """
+        candidates = job_mask & (self.task_counts > 0)
+        task_index = np.flatnonzero(candidates[self.task_job_index])
+        passed = np.fromiter(
+            (check(self.tasks[i]) for i in task_index), dtype=bool, count=len(task_index))
+        failures = np.bincount(
+            self.task_job_index[task_index[~passed]], minlength=len(self.job_ids))
+        return candidates & (failures == 0)
+
+
+def evaluate_jobs_columnar(
+    jobs: Sequence[JobSlimModel],
+    tasks_by_job: Mapping[str, Sequence[TaskSlimModel]],
+    criteria: CleanupJobCriteria,
+    now: datetime,
+    task_run_completed: Optional[Dict[str, bool]] = None,
+) -> List[Decision]:
+    """Evaluate all jobs at once; returns the same decisions as `evaluate_job`, in job order."""
+    evaluator = CriteriaEvaluator(criteria, now or datetime.now(timezone.utc))
+    inventory = ColumnarInventory.build(jobs, tasks_by_job)
+
+    match_age = inventory.older_than(evaluator.age_cutoff)
+    match_empty = inventory.older_than(evaluator.empty_cutoff) & (inventory.task_counts == 0)
+
+    match_task = np.zeros(len(jobs), dtype=bool)
+    if criteria.task is not None:
+        match_task = inventory.every_task(
+            inventory.older_than(evaluator.task_cutoff), evaluator.matches_task)
+
+    match_task_run_completed = np.zeros(len(jobs), dtype=bool)
+    if task_run_completed:
+        match_task_run_completed = inventory.every_task(
+            inventory.older_than(evaluator.task_run_completed_cutoff),
+            lambda task: task_run_completed.get(task.id) is True)
+
+    # one bit per reason, in the order evaluate_job reports them
+    codes = match_age.astype(np.int64) \
+        | (match_empty.astype(np.int64) << 1) \
+        | (match_task.astype(np.int64) << 2) \
+        | (match_task_run_completed.astype(np.int64) << 3)
+    reasons_by_code = [
+        [reason for bit, reason in enumerate(_REASONS) if code & (1 << bit)]
+        for code in range(1 << len(_REASONS))
+    ]
+    return [
+        Decision(can_delete=code != 0, reasons=list(reasons_by_code[code]))
+        for code in codes.tolist()
+    ]
@@ -0,0 +1,193 @@
+"""AIMD concurrency limits driven by throttling and latency signals.
+
+A limiter gates individual calls to one service. While calls succeed at a
+stable latency the limit grows by one per window of `limit` successes. It is
+cut by `decrease_factor` when a call is throttled, or when a call takes
+`latency_tolerance` times longer than the smoothed latency. Worker pools stay
+sized for the maximum, and the limiter decides how many of them run at once.
+
+The latency signal assumes calls of similar size. For calls whose duration
+depends on their input, such as listing all tasks of a job, pass
+`latency_tolerance=None` so that only throttling lowers the limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from . import metrics
+from .retry import is_throttling
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LIMITERS: "weakref.WeakSet[AdaptiveLimiter]" = weakref.WeakSet()
+
+
+def describe_limits() -> str:
+    """Current limits of live limiters, e.g. `cp_api=4 list_tasks=12`, for progress output."""
+    return " ".join(
+        f"{limiter.name}={limiter.limit}"
+        for limiter in sorted(_LIMITERS, key=lambda limiter: limiter.name))
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        *,
+        initial: Optional[int] = None,
+        min_limit: int = 1,
+        decrease_factor: float = 0.5,
+        latency_tolerance: Optional[float] = 3.0,
+        smoothing: float = 0.1,
+        warmup: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("'min_limit' must be between 1 and 'max_limit'")
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.warmup = warmup
+        self.decreases = 0
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._limit = min(max(initial if initial is not None else min_limit, min_limit), max_limit)
+        self._in_flight = 0
+        self._successes = 0
+        self._latency: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = -math.inf
+        self._async_changed: Optional[asyncio.Event] = None
+        _LIMITERS.add(self)
+        metrics.REGISTRY.set_gauge("concurrency_limit", name, self._limit)
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _try_acquire(self) -> bool:
+        if self._in_flight >= self._limit:
+            return False
+        self._in_flight += 1
+        return True
+
+    def _set_limit(self, limit: int, reason: str) -> None:
+        if limit == self._limit:
+            return
+        logger.info("%s concurrency limit %d -> %d (%s)", self.name, self._limit, limit, reason)
+        self._limit = limit
+        metrics.REGISTRY.set_gauge("concurrency_limit", self.name, limit)
+
+    def _decrease(self, started: float, reason: str) -> None:
+        # calls started before the last cut reflect the old limit; one cut per episode
+        if started < self._last_decrease:
+            return
+        self._last_decrease = self._clock()
+        self._successes = 0
+        self.decreases += 1
+        metrics.REGISTRY.set_gauge("concurrency_decreases", self.name, self.decreases)
+        self._set_limit(max(self.min_limit, math.floor(self._limit * self.decrease_factor)), reason)
+
+    def _record(self, started: float, exc: Optional[BaseException]) -> None:
+        if exc is not None:
+            if is_throttling(exc):
+                self._decrease(started, "throttled")
+            return
+        latency = self._clock() - started
+        if self.latency_tolerance is not None and self._latency is not None \
+                and self._samples >= self.warmup \
+                and latency > self.latency_tolerance * self._latency:
+            self._decrease(started, "latency spike")
+            return
+        self._latency = latency if self._latency is None \
+            else (1 - self.smoothing) * self._latency + self.smoothing * latency
+        self._samples += 1
+        self._successes += 1
+        if self._successes >= self._limit:
+            self._successes = 0
+            self._set_limit(min(self.max_limit, self._limit + 1), "stable")
+
+    def acquire(self) -> float:
+        """Block until a slot is free; returns the start time to pass to `release`."""
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+            return self._clock()
+
+    def release(self, started: float, exc: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._record(started, exc)
+            self._cond.notify_all()
+            changed, self._async_changed = self._async_changed, None
+        if changed is not None:
+            changed.set()
+
+    async def acquire_async(self) -> float:
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return self._clock()
+                if self._async_changed is None:
+                    self._async_changed = asyncio.Event()
+                changed = self._async_changed
+            await changed.wait()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        started = self.acquire()
+        try:
+            yield
+        except Exception as exc:
+            self.release(started, exc)
+            raise
+        except BaseException:
+            self.release(started)
+            raise
+        self.release(started)
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        started = await self.acquire_async()
+        try:
+            yield
+        except Exception as exc:
+            self.release(started, exc)
+            raise
+        except BaseException:
+            self.release(started)
+            raise
+        self.release(started)
+
+    def wrap(self, func: Callable[..., T]) -> Callable[..., T]:
+        """Run every call of a provider in a slot of this limiter."""
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> T:
+            with self.slot():
+                return func(*args, **kwargs)
+        return _wrapper
+
+    def wrap_async(self, func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def _wrapper(*args: Any, **kwargs: Any) -> T:
+            async with self.slot_async():
+                return await func(*args, **kwargs)
+        return _wrapper
@@ -1,47 +1,176 @@
 from __future__ import annotations
 
+import json
 import logging
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from datetime import datetime
 from tqdm import tqdm
 
-from . import cp_api
-from .criteria import CleanupJobCriteria, Decision, evaluate_job
+from . import cp_api, keymap, metrics
+from .concurrency import describe_limits
+from .criteria import CleanupJobCriteria, CriteriaEvaluator, Decision
 from .io import ConsoleIO
-from .models import JobModel, TaskModel
+from .keymap import KeyMapper
+from .models import JobSlimModel, TaskSlimModel
+from .ratelimit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
-ListJobsFn = Callable[[], List[JobModel]]
-ListTasksFn = Callable[[str], List[TaskModel]]
+ListJobsFn = Callable[[], List[JobSlimModel]]
+ListTasksFn = Callable[[str], List[TaskSlimModel]]
 DeleteJobFn = Callable[[str], None]
 GetTasksRunInfoFn = Callable[[Iterable[str]], cp_api.CpApiTaskRunInfoResponse]
 
 
 @dataclass(frozen=True)
 class JobWithTasks:
-    job: JobModel
-    tasks: List[TaskModel]
+    job: JobSlimModel
+    tasks: List[TaskSlimModel]
     decision: Decision
+    error: Optional[str] = None
 
 
+def advance_progress(progress: tqdm) -> None:
+    """Count one finished job and show the current adaptive concurrency limits."""
+    limits = describe_limits()
+    if limits:
+        progress.set_postfix_str(limits, refresh=False)
+    progress.update(1)
+
+
+def list_tasks_by_job(
+    jobs: Sequence[JobSlimModel],
+    list_tasks: ListTasksFn,
+    *,
+    concurrency: int = 1,
+) -> Tuple[Dict[str, List[TaskSlimModel]], Dict[str, str]]:
+    """List tasks for every job, using up to `concurrency` worker threads.
+
+    Returns the tasks and the error message of every job whose listing failed;
+    a failed job does not abort the listing of the others.
+    """
+    tasks: Dict[str, List[TaskSlimModel]] = {}
+    errors: Dict[str, str] = {}
+
+    def _list_tasks(job_id: str) -> List[TaskSlimModel]:
+        with metrics.timer("list_tasks"):
+            return list_tasks(job_id)
+
+    def _store(job_id: str, list_job_tasks: Callable[[], List[TaskSlimModel]]) -> None:
+        try:
+            tasks[job_id] = list_job_tasks()
+        except Exception as exc:
+            logger.error("Failed to list tasks for job %s: %s", job_id, exc)
+            errors[job_id] = str(exc) or type(exc).__name__
+
+    with tqdm(total=len(jobs), desc="Collecting job data", unit="job") as progress:
+        if concurrency <= 1:
+            for job in jobs:
+                _store(job.id, lambda: _list_tasks(job.id))
+                advance_progress(progress)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {
+                    executor.submit(_list_tasks, job.id): job.id
+                    for job in jobs
+                }
+                for future in as_completed(futures):
+                    _store(futures[future], future.result)
+                    advance_progress(progress)
+
+    return tasks, errors
+
+
+def plan_jobs(jobs: Sequence[JobSlimModel], evaluator: CriteriaEvaluator) -> List[JobSlimModel]:
+    """Jobs whose tasks need listing; younger jobs cannot match any criterion."""
+    planned_jobs = [job for job in jobs if evaluator.may_match(job)]
+    if len(planned_jobs) < len(jobs):
+        logger.info(
+            "Skipping task listing for %d/%d jobs modified after %s",
+            len(jobs) - len(planned_jobs), len(jobs), evaluator.latest_cutoff)
+    return planned_jobs
+
+
+def evaluate_jobs(
+    jobs: Sequence[JobSlimModel],
+    tasks: Dict[str, List[TaskSlimModel]],
+    evaluator: CriteriaEvaluator,
+    task_run_completed: Optional[Dict[str, bool]] = None,
+    *,
+    columnar: bool = False,
+) -> Dict[str, Decision]:
+    if columnar:
+        # optional NumPy dependency, imported only when requested
+        from .columnar import evaluate_jobs_columnar
+        decision_list = evaluate_jobs_columnar(
+            jobs, tasks, evaluator.criteria, evaluator.now, task_run_completed)
+    else:
+        decision_list = [
+            evaluator.evaluate(job, tasks[job.id], task_run_completed)
+            for job in tqdm(jobs, desc="Evaluating jobs", unit="job")
+        ]
+    return {job.id: decision for job, decision in zip(jobs, decision_list)}
+
+
+def job_results(
+    jobs: Sequence[JobSlimModel],
+    tasks: Dict[str, List[TaskSlimModel]],
+    errors: Dict[str, str],
+    decisions: Dict[str, Decision],
+) -> List[JobWithTasks]:
+    """Pair every listed job with its tasks and decision, in listing order."""
+    jobs_res: List[JobWithTasks] = []
+    for job in jobs:
+        job_id = job.id
+        if job_id in errors:
+            # never delete a job whose tasks could not be inspected
+            jobs_res.append(JobWithTasks(
+                job, [], Decision(can_delete=False, reasons=[]), errors[job_id]))
+            continue
+        if job_id not in decisions:
+            jobs_res.append(JobWithTasks(
+                job, [], Decision(can_delete=False, reasons=[])))
+            continue
+        job_with_tasks = JobWithTasks(job, tasks[job_id], decisions[job_id])
+        jobs_res.append(job_with_tasks)
+    return jobs_res
+
+
+@metrics.timed("collect_jobs")
 def collect_jobs(
     list_jobs: ListJobsFn,
     list_tasks: ListTasksFn,
     criteria: CleanupJobCriteria,
     get_tasks_run_info: GetTasksRunInfoFn,
     now: datetime,
+    *,
+    list_concurrency: int = 1,
+    columnar: bool = False,
+    verify_tasks: Optional[ListTasksFn] = None,
 ) -> List[JobWithTasks, ]:
-    jobs = list_jobs()
-    tasks: Dict[str, List[TaskModel]] = {}
+    """List jobs and tasks and decide which jobs can be deleted.
+
+    When `verify_tasks` is given, tasks of deletion candidates are listed
+    again with it and the candidates are re-evaluated on that data.
+    """
+    with metrics.timer("list_jobs"):
+        jobs = list_jobs()
+    evaluator = CriteriaEvaluator(criteria, now)
+
+    # jobs younger than every age cutoff are kept without listing their tasks
+    planned_jobs = plan_jobs(jobs, evaluator)
+
+    tasks, errors = list_tasks_by_job(
+        planned_jobs, list_tasks, concurrency=list_concurrency)
     all_task_id_list: List[str] = []
 
-    for job in tqdm(jobs, desc="Collecting job data", unit="job"):
-        job_id = job.id
-        tasks[job_id] = job_tasks = list_tasks(job_id)
-        for task in job_tasks:
+    for job in planned_jobs:
+        for task in tasks.get(job.id, []):
             all_task_id_list.append(task.id)
 
     # fetch all tasks run info for efficiency
@@ -49,50 +178,103 @@ def collect_jobs(
     if criteria.task_run_completed is not None and all_task_id_list:
         task_run_completed = get_run_completed(
             all_task_id_list,
-            cp_api.id2key_azur_to_nextflow,
+            keymap.get_mapper("NEXTFLOW"),
             get_tasks_run_info,
         )
 
-    jobs_res: List[JobWithTasks] = []
-    for job in tqdm(jobs, desc="Collecting job data", unit="job"):
-        job_id = job.id
-        job_tasks = tasks[job_id]
-        decision: Decision = evaluate_job(
-            job,
-            job_tasks,
-            criteria,
-            now,
-            task_run_completed
-        )
-        job_with_tasks = JobWithTasks(job, job_tasks, decision)
-        jobs_res.append(job_with_tasks)
-    return jobs_res
+    listed_jobs = [job for job in planned_jobs if job.id not in errors]
+    job_id_map = {job.id: job for job in listed_jobs}
+    with metrics.timer("evaluate"):
+        decisions = evaluate_jobs(
+            listed_jobs, tasks, evaluator, task_run_completed, columnar=columnar)
+
+    if verify_tasks is not None:
+        # task lists may come from a previous run; re-check deletion candidates
+        candidate_jobs = [job for job in listed_jobs if decisions[job.id].can_delete]
+        verified, verify_errors = list_tasks_by_job(
+            candidate_jobs, verify_tasks, concurrency=list_concurrency)
+        errors.update(verify_errors)
+        tasks.update(verified)
+        if criteria.task_run_completed is not None:
+            known = task_run_completed or {}
+            unknown_task_ids = [
+                task.id
+                for job_tasks in verified.values()
+                for task in job_tasks
+                if task.id not in known
+            ]
+            if unknown_task_ids:
+                task_run_completed = {
+                    **known,
+                    **get_run_completed(
+                        unknown_task_ids,
+                        keymap.get_mapper("NEXTFLOW"),
+                        get_tasks_run_info,
+                    ),
+                }
+        for job_id, job_tasks in verified.items():
+            decisions[job_id] = evaluator.evaluate(
+                job_id_map[job_id], job_tasks, task_run_completed)
 
+    return job_results(jobs, tasks, errors, decisions)
 
+
+def task_keys(
+    all_task_id_list: Iterable[str],
+    map_keys: KeyMapper,
+) -> Tuple[List[str], Dict[str, str], Dict[str, List[str]]]:
+    """Map task ids to distinct engine task keys.
+
+    Returns the distinct keys, the first task id of every key, and all task
+    ids of the keys shared by several tasks (e.g. retries of a Nextflow task).
+    """
+    all_task_id_list = [task_id.strip() for task_id in all_task_id_list]
+    key2id: Dict[str, str] = {}
+    shared: Dict[str, List[str]] = {}
+    for task_key, task_id in zip(map_keys(all_task_id_list), all_task_id_list):
+        first_id = key2id.setdefault(task_key, task_id)
+        if first_id != task_id:
+            shared.setdefault(task_key, [first_id]).append(task_id)
+    return list(key2id), key2id, shared
+
+
+@metrics.timed("get_run_completed")
 def get_run_completed(
     all_task_id_list: Iterable[str],
-    id2key: Callable[[str], str],
+    map_keys: KeyMapper,
     get_tasks_run_info: GetTasksRunInfoFn,
 ) -> Dict[str, bool]:
-    all_task_key_list: List[str] = []
-    key2id: Dict[str, str] = {}
-    for task_id in all_task_id_list:
-        task_key = id2key(task_id.strip())
-        all_task_key_list.append(task_key)
-        key2id[task_key] = task_id.strip()
+    all_task_key_list, key2id, shared = task_keys(all_task_id_list, map_keys)
+    if shared:
+        logger.info(
+            "%d task ids share %d keys; looking up %d distinct keys",
+            sum(map(len, shared.values())), len(shared), len(all_task_key_list))
 
     tasks_run_info_response = get_tasks_run_info(all_task_key_list)
     task_run_completed = cp_api.get_task_key_run_completed_map(
         key2id,
-        tasks_run_info_response)
+        tasks_run_info_response,
+        shared)
 
     return task_run_completed
 
 
+OUTPUT_MODES = ("tasks", "summary")
+
+CandidateFormatter = Callable[[JobWithTasks], List[str]]
+
+
+def _candidate_header(job: JobSlimModel) -> str:
+    return f"job_id: {job.id}, state: {job.state}, display_name: {job.display_name or '<None>'}"
+
+
+def task_state_counts(tasks: Iterable[TaskSlimModel]) -> Dict[str, int]:
+    """Number of tasks per state, most frequent first."""
+    return dict(Counter(task.state or "" for task in tasks).most_common())
+
+
 def format_candidate(candidate: JobWithTasks) -> List[str]:
-    job = candidate.job
-    header = f"job_id: {job.id}, state: {job.state}, display_name: {job.display_name or '<None>'}"
-    lines = [header]
+    lines = [_candidate_header(candidate.job)]
     if candidate.tasks:
         for task in candidate.tasks:
             lines.append(f"  task_id: {task.id}, state: {task.state or ''}")
@@ -104,6 +286,177 @@ def format_candidate(candidate: JobWithTasks) -> List[str]:
     return lines
 
 
+def format_candidate_summary(candidate: JobWithTasks) -> List[str]:
+    """Like `format_candidate`, with a task count and state histogram instead of every task."""
+    lines = [_candidate_header(candidate.job)]
+    states = ", ".join(f"{state}: {count}" for state, count in task_state_counts(candidate.tasks).items())
+    lines.append(f"  tasks: {len(candidate.tasks)} ({states})" if states else "  tasks: 0")
+    if candidate.decision.reasons:
+        lines.append(f"  reasons: {', '.join(candidate.decision.reasons)}")
+    return lines
+
+
+def candidate_formatter(output: str) -> CandidateFormatter:
+    """Console format of a candidate for an output mode in `OUTPUT_MODES`."""
+    if output == "tasks":
+        return format_candidate
+    if output == "summary":
+        return format_candidate_summary
+    raise ValueError(f"Unknown output mode '{output}', expected one of: {', '.join(OUTPUT_MODES)}")
+
+
+class JsonlReport:
+    """Machine-readable plan: one JSON object per candidate or skipped job.
+
+    Records carry task counts per state rather than the tasks, and go through
+    a large write buffer, so writing the report costs the same for any number
+    of tasks. Safe to share between threads.
+    """
+
+    def __init__(self, path: str, *, buffer_size: int = 1 << 20) -> None:
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8", buffering=buffer_size)
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def write_candidate(self, candidate: JobWithTasks) -> None:
+        job = candidate.job
+        self._write({
+            "type": "candidate",
+            "job_id": job.id,
+            "state": job.state,
+            "display_name": job.display_name,
+            "tasks": len(candidate.tasks),
+            "task_states": task_state_counts(candidate.tasks),
+            "reasons": list(candidate.decision.reasons),
+        })
+
+    def write_skipped(self, job_id: str, error: str) -> None:
+        self._write({"type": "skipped", "job_id": job_id, "error": error})
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "JsonlReport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+@dataclass(frozen=True)
+class DeleteSummary:
+    deleted: List[str]
+    failed: List[str]
+
+
+def delete_jobs(
+    job_ids: Iterable[str],
+    delete_job: DeleteJobFn,
+    io: ConsoleIO,
+    *,
+    concurrency: int = 1,
+    rate_limit: Optional[float] = None,
+    ignore_errors: bool = False,
+) -> DeleteSummary:
+    """Delete jobs with up to `concurrency` calls in flight.
+
+    `rate_limit` caps the number of deletions started per second. Unless
+    `ignore_errors` is set, no new deletion is dispatched after the first
+    failure; deletions already in flight are allowed to finish. `job_ids`
+    may be a lazy iterable, such as the output of a pipeline stage.
+    """
+    bucket = TokenBucket(rate_limit) if rate_limit else None
+    deleted: List[str] = []
+    failed: List[str] = []
+    pending: Dict[Future, str] = {}
+
+    def _delete(job_id: str) -> None:
+        if bucket is not None:
+            bucket.acquire()
+        with metrics.timer("delete_job"):
+            delete_job(job_id)
+
+    def _collect(future: Future) -> bool:
+        job_id = pending.pop(future)
+        exc = future.exception()
+        if exc is None:
+            deleted.append(job_id)
+            io.print(f"Deleted job: {job_id}")
+            return False
+        logger.error("Failed to delete job %s: %s", job_id, exc)
+        failed.append(job_id)
+        return not ignore_errors
+
+    stopped = False
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for job_id in job_ids:
+            for future in [future for future in pending if future.done()]:
+                stopped = _collect(future) or stopped
+            while len(pending) >= max(concurrency, 1) and not stopped:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stopped = _collect(future) or stopped
+            if stopped:
+                break
+            pending[executor.submit(_delete, job_id)] = job_id
+        for future in as_completed(list(pending)):
+            _collect(future)
+
+    return DeleteSummary(deleted=deleted, failed=failed)
+
+
+def report_plan(
+    job_list: List[JobWithTasks],
+    io: ConsoleIO,
+    *,
+    output: str = "tasks",
+    report: Optional[JsonlReport] = None,
+) -> Optional[List[JobWithTasks]]:
+    """Print skipped jobs and deletion candidates; returns None when no job was listed.
+
+    `output` selects the console format (see `candidate_formatter`); `report`
+    additionally receives every skipped job and candidate.
+    """
+    format_lines = candidate_formatter(output)
+    if not job_list:
+        io.print("No jobs matched deletion criteria.")
+        return None
+
+    failed_list = [job for job in job_list if job.error is not None]
+    if failed_list:
+        io.print(f"Jobs skipped, task listing failed: {len(failed_list)}")
+        for failed in failed_list:
+            io.print(f"  job_id: {failed.job.id}, error: {failed.error}")
+            if report is not None:
+                report.write_skipped(failed.job.id, failed.error)
+
+    candidate_list = [job for job in job_list if job.decision.can_delete]
+    io.print(f"Jobs for deletion: {len(candidate_list)}/{len(job_list)}")
+    for candidate in candidate_list:
+        io.print_lines(format_lines(candidate))
+        if report is not None:
+            report.write_candidate(candidate)
+    return candidate_list
+
+
+def report_summary(summary: DeleteSummary, io: ConsoleIO, *, ignore_errors: bool) -> int:
+    io.print(
+        f"Deleted jobs: {len(summary.deleted)}, failed: {len(summary.failed)}")
+    if summary.failed and not ignore_errors:
+        return 1
+    return 0
+
+
 def run_cleanup(
     list_jobs: ListJobsFn,
     list_tasks: ListTasksFn,
@@ -116,6 +469,13 @@ def run_cleanup(
     ignore_errors: bool,
     io: ConsoleIO,
     now: datetime,
+    list_concurrency: int = 1,
+    delete_concurrency: int = 1,
+    delete_rate: Optional[float] = None,
+    columnar: bool = False,
+    verify_tasks: Optional[ListTasksFn] = None,
+    output: str = "tasks",
+    report: Optional[JsonlReport] = None,
 ) -> int:
     job_list = collect_jobs(
         list_jobs,
@@ -123,16 +483,14 @@ def run_cleanup(
         criteria,
         get_tasks_run_info,
         now,
+        list_concurrency=list_concurrency,
+        columnar=columnar,
+        verify_tasks=verify_tasks,
     )
-    if not job_list:
-        io.print("No jobs matched deletion criteria.")
+    candidate_list = report_plan(job_list, io, output=output, report=report)
+    if candidate_list is None:
         return 0
 
-    candidate_list = [job for job in job_list if job.decision.can_delete]
-    io.print(f"Jobs for deletion: {len(candidate_list)}/{len(job_list)}")
-    for candidate in candidate_list:
-        io.print_lines(format_candidate(candidate))
-
     if dry_run:
         io.print("Dry-run mode: no deletions performed.")
         return 0
@@ -142,14 +500,12 @@ def run_cleanup(
             io.print("Aborted by user.")
             return 0
 
-    for candidate in candidate_list:
-        job_id = candidate.job.id
-        try:
-            delete_job(job_id)
-            io.print(f"Deleted job: {job_id}")
-        except Exception as exc:  # pragma: no cover - failure path
-            logger.error("Failed to delete job %s: %s", job_id, exc)
-            if not ignore_errors:
-                return 1
-
-    return 0
+    summary = delete_jobs(
+        [candidate.job.id for candidate in candidate_list],
+        delete_job,
+        io,
+        concurrency=delete_concurrency,
+        rate_limit=delete_rate,
+        ignore_errors=ignore_errors,
+    )
+    return report_summary(summary, io, ignore_errors=ignore_errors)
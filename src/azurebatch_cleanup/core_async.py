@@ -0,0 +1,208 @@
+"""asyncio counterpart of `core`, driven by coroutine providers.
+
+A single event loop keeps thousands of listings and deletions in flight;
+concurrency is bounded by semaphores instead of worker threads.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tqdm import tqdm
+
+from . import cp_api, keymap, metrics
+from .core import (
+    DeleteSummary,
+    JobWithTasks,
+    JsonlReport,
+    advance_progress,
+    evaluate_jobs,
+    job_results,
+    plan_jobs,
+    report_plan,
+    report_summary,
+    task_keys,
+)
+from .criteria import CleanupJobCriteria, CriteriaEvaluator
+from .io import ConsoleIO
+from .keymap import KeyMapper
+from .models import JobSlimModel, TaskSlimModel
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+AsyncListJobsFn = Callable[[], Awaitable[List[JobSlimModel]]]
+AsyncListTasksFn = Callable[[str], Awaitable[List[TaskSlimModel]]]
+AsyncDeleteJobFn = Callable[[str], Awaitable[None]]
+AsyncGetTasksRunInfoFn = Callable[[Iterable[str]], Awaitable[cp_api.CpApiTaskRunInfoResponse]]
+
+
+async def list_tasks_by_job_async(
+    jobs: Sequence[JobSlimModel],
+    list_tasks: AsyncListTasksFn,
+    *,
+    concurrency: int = 1,
+) -> Tuple[Dict[str, List[TaskSlimModel]], Dict[str, str]]:
+    """Async `core.list_tasks_by_job` with up to `concurrency` listings in flight."""
+    tasks: Dict[str, List[TaskSlimModel]] = {}
+    errors: Dict[str, str] = {}
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    with tqdm(total=len(jobs), desc="Collecting job data", unit="job") as progress:
+
+        async def _list(job_id: str) -> None:
+            async with semaphore:
+                try:
+                    with metrics.timer("list_tasks"):
+                        tasks[job_id] = await list_tasks(job_id)
+                except Exception as exc:
+                    logger.error("Failed to list tasks for job %s: %s", job_id, exc)
+                    errors[job_id] = str(exc) or type(exc).__name__
+            advance_progress(progress)
+
+        await asyncio.gather(*(_list(job.id) for job in jobs))
+
+    return tasks, errors
+
+
+async def get_run_completed_async(
+    all_task_id_list: Iterable[str],
+    map_keys: KeyMapper,
+    get_tasks_run_info: AsyncGetTasksRunInfoFn,
+) -> Dict[str, bool]:
+    with metrics.timer("get_run_completed"):
+        all_task_key_list, key2id, shared = task_keys(all_task_id_list, map_keys)
+        tasks_run_info_response = await get_tasks_run_info(all_task_key_list)
+        return cp_api.get_task_key_run_completed_map(key2id, tasks_run_info_response, shared)
+
+
+async def collect_jobs_async(
+    list_jobs: AsyncListJobsFn,
+    list_tasks: AsyncListTasksFn,
+    criteria: CleanupJobCriteria,
+    get_tasks_run_info: AsyncGetTasksRunInfoFn,
+    now: datetime,
+    *,
+    list_concurrency: int = 1,
+    columnar: bool = False,
+) -> List[JobWithTasks]:
+    """Async `core.collect_jobs`; decisions are identical for the same inventory."""
+    with metrics.timer("list_jobs"):
+        jobs = await list_jobs()
+    evaluator = CriteriaEvaluator(criteria, now)
+    planned_jobs = plan_jobs(jobs, evaluator)
+
+    tasks, errors = await list_tasks_by_job_async(
+        planned_jobs, list_tasks, concurrency=list_concurrency)
+
+    task_run_completed = None
+    all_task_id_list = [
+        task.id for job in planned_jobs for task in tasks.get(job.id, [])]
+    if criteria.task_run_completed is not None and all_task_id_list:
+        task_run_completed = await get_run_completed_async(
+            all_task_id_list,
+            keymap.get_mapper("NEXTFLOW"),
+            get_tasks_run_info,
+        )
+
+    listed_jobs = [job for job in planned_jobs if job.id not in errors]
+    with metrics.timer("evaluate"):
+        decisions = evaluate_jobs(
+            listed_jobs, tasks, evaluator, task_run_completed, columnar=columnar)
+    return job_results(jobs, tasks, errors, decisions)
+
+
+async def delete_jobs_async(
+    job_ids: Sequence[str],
+    delete_job: AsyncDeleteJobFn,
+    io: ConsoleIO,
+    *,
+    concurrency: int = 1,
+    rate_limit: Optional[float] = None,
+    ignore_errors: bool = False,
+) -> DeleteSummary:
+    """Async `core.delete_jobs` with the same stop-after-first-failure semantics."""
+    bucket = TokenBucket(rate_limit) if rate_limit else None
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    stopped = asyncio.Event()
+    deleted: List[str] = []
+    failed: List[str] = []
+
+    async def _delete(job_id: str) -> None:
+        async with semaphore:
+            if bucket is not None:
+                wait_seconds = bucket.reserve()
+                while wait_seconds > 0 and not stopped.is_set():
+                    await asyncio.sleep(wait_seconds)
+                    wait_seconds = bucket.reserve()
+            if stopped.is_set():
+                return
+            try:
+                with metrics.timer("delete_job"):
+                    await delete_job(job_id)
+            except Exception as exc:
+                logger.error("Failed to delete job %s: %s", job_id, exc)
+                failed.append(job_id)
+                if not ignore_errors:
+                    stopped.set()
+                return
+            deleted.append(job_id)
+            io.print(f"Deleted job: {job_id}")
+
+    await asyncio.gather(*(_delete(job_id) for job_id in job_ids))
+    return DeleteSummary(deleted=deleted, failed=failed)
+
+
+async def run_cleanup_async(
+    list_jobs: AsyncListJobsFn,
+    list_tasks: AsyncListTasksFn,
+    get_tasks_run_info: AsyncGetTasksRunInfoFn,
+    delete_job: AsyncDeleteJobFn,
+    criteria: CleanupJobCriteria,
+    *,
+    dry_run: bool,
+    assume_yes: bool,
+    ignore_errors: bool,
+    io: ConsoleIO,
+    now: datetime,
+    list_concurrency: int = 1,
+    delete_concurrency: int = 1,
+    delete_rate: Optional[float] = None,
+    columnar: bool = False,
+    output: str = "tasks",
+    report: Optional[JsonlReport] = None,
+) -> int:
+    job_list = await collect_jobs_async(
+        list_jobs,
+        list_tasks,
+        criteria,
+        get_tasks_run_info,
+        now,
+        list_concurrency=list_concurrency,
+        columnar=columnar,
+    )
+    candidate_list = report_plan(job_list, io, output=output, report=report)
+    if candidate_list is None:
+        return 0
+
+    if dry_run:
+        io.print("Dry-run mode: no deletions performed.")
+        return 0
+
+    # nothing else runs on the loop before deletion starts, so blocking is fine
+    if not assume_yes:
+        if not io.confirm("Delete these jobs? [y/N]: "):
+            io.print("Aborted by user.")
+            return 0
+
+    summary = await delete_jobs_async(
+        [candidate.job.id for candidate in candidate_list],
+        delete_job,
+        io,
+        concurrency=delete_concurrency,
+        rate_limit=delete_rate,
+        ignore_errors=ignore_errors,
+    )
+    return report_summary(summary, io, ignore_errors=ignore_errors)
@@ -1,15 +1,28 @@
 from __future__ import annotations
 
+import codecs
+import gzip
+import http.client
 import json
+import logging
 import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-import re
 from ssl import SSLContext
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
 from urllib.request import Request, urlopen
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from . import keymap, metrics
+from .concurrency import AdaptiveLimiter
+from .http_pool import HttpConnectionPool
+from .jsonstream import JsonStreamReader
+from .retry import NO_RETRY, RetryPolicy, call_with_retry, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
 
 def is_run_completed(status: str) -> bool:
     return status in ['STOPPED', 'FAILURE', 'SUCCESS']
@@ -21,6 +34,13 @@ class CpApiConfig:
     token: str
 
 
+class CpApiHttpError(RuntimeError):
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
 class CpApiRunInfo(BaseModel):
     status: str
     model_config = ConfigDict(extra="ignore")
@@ -45,7 +65,7 @@ def _normalize_base_url(base_url: str) -> str:
     return base_url.rstrip("/") + "/"
 
 
-def _load_config(
+def load_config(
     base_url: Optional[str] = None,
     token: Optional[str] = None,
 ) -> CpApiConfig:
@@ -58,15 +78,16 @@ def _load_config(
     return CpApiConfig(base_url=_normalize_base_url(resolved_base), token=resolved_token)
 
 
-def _build_run_info_url(base_url: str, engine_type: str) -> str:
-    return f"{base_url}run/engine/{engine_type}/tasks/runInfo"
+def _build_run_info_path(engine_type: str) -> str:
+    return f"run/engine/{engine_type}/tasks/runInfo"
+
+
+def build_run_info_url(base_url: str, engine_type: str) -> str:
+    return f"{base_url}{_build_run_info_path(engine_type)}"
 
 
 def id2key_azur_to_nextflow(task_id: str) -> str:
-    return re.sub(
-        r"^nf-([a-f0-9]{2})([a-f0-9]{6}).*$",
-        r"\1/\2",
-        task_id)
+    return keymap.nextflow_key(task_id)
 
 
 def get_run_info_by_engine_task_keys(
@@ -81,8 +102,8 @@ def get_run_info_by_engine_task_keys(
     if not keys_list:
         raise ValueError("At least one engine task key must be provided")
 
-    config = _load_config(base_url=base_url, token=token)
-    url = _build_run_info_url(config.base_url, engine_type)
+    config = load_config(base_url=base_url, token=token)
+    url = build_run_info_url(config.base_url, engine_type)
     payload = json.dumps({"engineTaskKeys": keys_list}).encode("utf-8")
 
     request = Request(
@@ -95,8 +116,11 @@ def get_run_info_by_engine_task_keys(
         },
     )
 
-    with urlopen(request, timeout=timeout_seconds, context=ssl_context) as response:
-        body = response.read().decode("utf-8")
+    with metrics.timer("cp_api_run_info") as call, \
+            urlopen(request, timeout=timeout_seconds, context=ssl_context) as response:
+        data = response.read()
+        call.add_bytes(len(data))
+    body = data.decode("utf-8")
     return json.loads(body or "{}")
 
 
@@ -104,6 +128,140 @@ def parse_task_run_info(run_info: Dict[str, Any]) -> CpApiTaskRunInfoResponse:
     return CpApiTaskRunInfoResponse.model_validate(run_info)
 
 
+def _read_run_item(reader: JsonStreamReader) -> CpApiRunItem:
+    run: Optional[CpApiRunInfo] = None
+    keys: List[str] = []
+    for name in reader.iter_object():
+        if name == "run":
+            run = CpApiRunInfo.model_validate(reader.decode_value())
+        elif name == "engineTaskKeys":
+            keys.extend(reader.iter_array())
+        else:
+            reader.decode_value()
+    if run is None:
+        raise ValueError("CP API run info item without 'run'")
+    return CpApiRunItem.model_construct(run=run, engine_task_keys=keys)
+
+
+def parse_task_run_info_stream(stream: TextIO) -> CpApiTaskRunInfoResponse:
+    """`parse_task_run_info` reading the response body incrementally.
+
+    `payload` items are decoded one at a time and their engine task keys are
+    read one by one, so the body is never held as a string or dict.
+    """
+    reader = JsonStreamReader(stream)
+    status: Any = None
+    payload: List[CpApiRunItem] = []
+    if reader.peek():
+        for name in reader.iter_object():
+            if name == "payload" and reader.peek() == "[":
+                for _ in reader.iter_elements():
+                    payload.append(_read_run_item(reader))
+            elif name == "status":
+                status = reader.decode_value()
+            else:
+                reader.decode_value()
+    if not isinstance(status, str):
+        raise ValueError(f"CP API run info response without a valid 'status': {status!r}")
+    return CpApiTaskRunInfoResponse.model_construct(payload=payload, status=status)
+
+
+class _ResponseTextReader:
+    """Text stream over an HTTP response body, for `JsonStreamReader`.
+
+    Gunzips and decodes UTF-8 incrementally and counts the bytes received.
+    """
+
+    def __init__(self, response: http.client.HTTPResponse, call: metrics.Call) -> None:
+        self._response = response
+        self._call = call
+        self._decompressor = None
+        if (response.getheader("Content-Encoding") or "").lower() == "gzip":
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def read(self, size: int = -1) -> str:
+        while True:
+            raw = self._response.read(size if size > 0 else None)
+            self._call.add_bytes(len(raw))
+            data = raw
+            if self._decompressor is not None:
+                data = self._decompressor.decompress(raw) if raw else self._decompressor.flush()
+            # a gzip chunk may decompress to nothing, so only the raw body's end is the end of text
+            text = self._decoder.decode(data, final=not raw)
+            if text or not raw:
+                return text
+
+
+def merge_task_run_info(
+    responses: Iterable[CpApiTaskRunInfoResponse],
+) -> CpApiTaskRunInfoResponse:
+    """Combine chunk responses; the first non-OK status wins."""
+    payload: List[CpApiRunItem] = []
+    statuses: List[str] = []
+    for response in responses:
+        payload.extend(response.payload)
+        statuses.append(response.status)
+    status = next((item for item in statuses if item != "OK"), "OK")
+    return CpApiTaskRunInfoResponse(payload=payload, status=status)
+
+
+def _split_chunks(keys: Sequence[str], chunk_size: int) -> List[List[str]]:
+    return [list(keys[start:start + chunk_size]) for start in range(0, len(keys), chunk_size)]
+
+
+class RunInfoChunks:
+    """Chunking, chunk retry rounds and merging of one run info lookup.
+
+    Shared by the threaded and asyncio lookups, which only differ in how they
+    request the `pending` chunks. Each distinct key is sent once. Outcomes are
+    passed to `record`; `next_round` returns True while failed chunks should
+    be requested again and raises once `max_retries` rounds have failed.
+    """
+
+    def __init__(self, task_keys: Iterable[str], chunk_size: Optional[int], max_retries: int) -> None:
+        key_list = list(dict.fromkeys(task_keys))
+        if chunk_size is None or len(key_list) <= chunk_size:
+            self.chunks = [key_list]
+        else:
+            self.chunks = _split_chunks(key_list, chunk_size)
+        self.max_retries = max_retries
+        self.attempt = 0
+        self._responses: Dict[int, CpApiTaskRunInfoResponse] = {}
+        self._failures: Dict[int, Exception] = {}
+        self._pending = list(range(len(self.chunks)))
+
+    def pending(self) -> List[Tuple[int, List[str]]]:
+        return [(index, self.chunks[index]) for index in self._pending]
+
+    def record(self, index: int, result: CpApiTaskRunInfoResponse | BaseException) -> None:
+        if isinstance(result, CpApiTaskRunInfoResponse):
+            self._responses[index] = result
+            return
+        if not isinstance(result, Exception):
+            raise result
+        logger.warning(
+            "CP API run info chunk %d/%d failed (attempt %d): %s",
+            index + 1, len(self.chunks), self.attempt + 1, result)
+        self._failures[index] = result
+
+    def next_round(self) -> bool:
+        if not self._failures:
+            return False
+        self._pending = sorted(self._failures)
+        if self.attempt >= self.max_retries:
+            first_error = self._failures[self._pending[0]]
+            raise RuntimeError(
+                f"CP API run info failed for {len(self._failures)}/{len(self.chunks)} chunks: {first_error}"
+            ) from first_error
+        self.attempt += 1
+        self._failures = {}
+        return True
+
+    def response(self) -> CpApiTaskRunInfoResponse:
+        return merge_task_run_info(self._responses[index] for index in range(len(self.chunks)))
+
+
 def get_tasks_run_info(
     task_keys: Iterable[str],
     *,
@@ -112,29 +270,181 @@ def get_tasks_run_info(
     token: Optional[str] = None,
     timeout_seconds: int = 30,
     ssl_context: SSLContext | None = None,
+    chunk_size: Optional[int] = None,
+    concurrency: int = 1,
+    max_retries: int = 0,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
 ) -> CpApiTaskRunInfoResponse:
-    run_info = get_run_info_by_engine_task_keys(
+    """Fetch run info for `task_keys`, optionally split into chunks of `chunk_size` keys.
+
+    Chunks are requested by up to `concurrency` threads. Each request follows
+    `retry_policy` (backoff on transient errors); chunks that still fail are
+    requested again in up to `max_retries` rounds before the lookup fails as a whole.
+    """
+    return _get_tasks_run_info(
+        lambda keys: parse_task_run_info(get_run_info_by_engine_task_keys(
+            keys,
+            engine_type=engine_type,
+            base_url=base_url,
+            token=token,
+            timeout_seconds=timeout_seconds,
+            ssl_context=ssl_context,
+        )),
         task_keys,
-        engine_type=engine_type,
-        base_url=base_url,
-        token=token,
-        timeout_seconds=timeout_seconds,
-        ssl_context=ssl_context,
+        chunk_size=chunk_size,
+        concurrency=concurrency,
+        max_retries=max_retries,
+        retry_policy=retry_policy,
+        limiter=limiter,
     )
-    return parse_task_run_info(run_info)
+
+
+def _get_tasks_run_info(
+    fetch_run_info: Callable[[List[str]], CpApiTaskRunInfoResponse],
+    task_keys: Iterable[str],
+    *,
+    chunk_size: Optional[int],
+    concurrency: int,
+    max_retries: int,
+    retry_policy: Optional[RetryPolicy],
+    limiter: Optional[AdaptiveLimiter],
+) -> CpApiTaskRunInfoResponse:
+    # the limiter gates each attempt, so it sees the throttling responses that are retried
+    request = fetch_run_info if limiter is None else limiter.wrap(fetch_run_info)
+
+    def _fetch(keys: List[str]) -> CpApiTaskRunInfoResponse:
+        return call_with_retry(
+            lambda: request(keys),
+            retry_policy or NO_RETRY,
+            description=f"CP API run info ({len(keys)} keys)",
+        )
+
+    chunks = RunInfoChunks(task_keys, chunk_size, max_retries)
+    if len(chunks.chunks) == 1:
+        return _fetch(chunks.chunks[0])
+
+    while True:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            futures = {executor.submit(_fetch, keys): index for index, keys in chunks.pending()}
+            for future in as_completed(futures):
+                try:
+                    chunks.record(futures[future], future.result())
+                except Exception as exc:
+                    chunks.record(futures[future], exc)
+        if not chunks.next_round():
+            return chunks.response()
 
 
 def get_task_key_run_completed_map(
     key2id: Dict[str, str],
     run_info: CpApiTaskRunInfoResponse,
+    shared: Optional[Dict[str, List[str]]] = None,
 ) -> Dict[str, bool]:
+    """Completion of each task id; `shared` lists all task ids of keys used by several tasks."""
+    shared = shared or {}
     res: Dict[str, bool] = {}
     for item in run_info.payload:
         completed: bool = is_run_completed(item.run.status)
         for key in item.engine_task_keys:
-            task_id = key2id[key]
-            if task_id in res:
-                raise KeyError(
-                    f"Duplicate task_id: '{task_id}', key: '{key}'.")
-            res[task_id] = completed
+            task_ids = shared.get(key)
+            if task_ids is None:
+                res[key2id[key]] = completed
+            else:
+                for task_id in task_ids:
+                    res[task_id] = completed
     return res
+
+
+class CpApiClient:
+    """CP API client reusing pooled keep-alive connections across requests.
+
+    The config and SSL context are resolved once. Responses are requested
+    gzip-encoded; with `gzip_requests` request bodies of at least
+    `gzip_min_bytes` are compressed too.
+    """
+
+    def __init__(
+        self,
+        config: Optional[CpApiConfig] = None,
+        *,
+        pool_size: int = 4,
+        timeout_seconds: float = 30,
+        ssl_context: SSLContext | None = None,
+        gzip_requests: bool = False,
+        gzip_min_bytes: int = 1024,
+    ) -> None:
+        self.config = config or load_config()
+        self.ssl_context = ssl_context
+        self.gzip_requests = gzip_requests
+        self.gzip_min_bytes = gzip_min_bytes
+        self._pool = HttpConnectionPool(
+            self.config.base_url,
+            max_size=pool_size,
+            timeout_seconds=timeout_seconds,
+            ssl_context=ssl_context,
+        )
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def __enter__(self) -> "CpApiClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _run_info_request(self, keys_list: List[str]) -> Tuple[bytes, Dict[str, str]]:
+        if not keys_list:
+            raise ValueError("At least one engine task key must be provided")
+
+        body = json.dumps({"engineTaskKeys": keys_list}).encode("utf-8")
+        headers = {
+            "Authorization": f"Bearer {self.config.token}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip",
+        }
+        if self.gzip_requests and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def fetch_task_run_info(
+        self,
+        keys_list: List[str],
+        engine_type: str,
+    ) -> CpApiTaskRunInfoResponse:
+        """Run info of `keys_list`, parsed while the response is received."""
+        body, headers = self._run_info_request(keys_list)
+        with metrics.timer("cp_api_run_info") as call, self._pool.stream(
+                "POST", "/" + _build_run_info_path(engine_type), body=body, headers=headers) as response:
+            text = _ResponseTextReader(response, call)
+            if response.status >= 400:
+                raise CpApiHttpError(
+                    response.status,
+                    text.read()[:200],
+                    retry_after=parse_retry_after(response.getheader("Retry-After")),
+                )
+            return parse_task_run_info_stream(text)
+
+    def get_tasks_run_info(
+        self,
+        task_keys: Iterable[str],
+        *,
+        engine_type: str = "NEXTFLOW",
+        chunk_size: Optional[int] = None,
+        concurrency: int = 1,
+        max_retries: int = 0,
+        retry_policy: Optional[RetryPolicy] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> CpApiTaskRunInfoResponse:
+        """`get_tasks_run_info` over this client's connections."""
+        return _get_tasks_run_info(
+            lambda keys: self.fetch_task_run_info(keys, engine_type),
+            task_keys,
+            chunk_size=chunk_size,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            retry_policy=retry_policy,
+            limiter=limiter,
+        )
@@ -0,0 +1,180 @@
+"""CP API run info lookups as coroutines, over `asyncio` streams."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import ssl
+from ssl import SSLContext
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import metrics
+from .concurrency import AdaptiveLimiter
+from .cp_api import (
+    CpApiHttpError,
+    CpApiTaskRunInfoResponse,
+    RunInfoChunks,
+    build_run_info_url,
+    load_config,
+    parse_task_run_info,
+)
+from .http_pool import HttpResponse
+from .retry import NO_RETRY, RetryPolicy, call_with_retry_async, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = (await reader.readline()).decode("latin-1")
+    parts = status_line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ConnectionError(f"Malformed HTTP status line: {status_line!r}")
+    headers: Dict[str, str] = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+        if not line:
+            return int(parts[1]), headers
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    body = bytearray()
+    while True:
+        size = int((await reader.readline()).split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            # skip trailers up to the terminating blank line
+            while (await reader.readline()).strip():
+                pass
+            return bytes(body)
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+
+
+async def post(
+    url: str,
+    body: bytes,
+    headers: Mapping[str, str],
+    *,
+    timeout_seconds: float = 30,
+    ssl_context: SSLContext | None = None,
+) -> HttpResponse:
+    """POST `body` over a new connection closed after the response."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported url: '{url}'")
+    tls = None
+    if parts.scheme == "https":
+        tls = ssl_context or ssl.create_default_context()
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    async def _exchange() -> HttpResponse:
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=tls)
+        try:
+            head = [
+                f"POST {path} HTTP/1.1",
+                f"Host: {parts.netloc}",
+                "Connection: close",
+                f"Content-Length: {len(body)}",
+                *(f"{name}: {value}" for name, value in headers.items()),
+            ]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            status, response_headers = await _read_headers(reader)
+            if response_headers.get("transfer-encoding", "").lower() == "chunked":
+                data = await _read_chunked(reader)
+            elif "content-length" in response_headers:
+                data = await reader.readexactly(int(response_headers["content-length"]))
+            else:
+                data = await reader.read()
+            return HttpResponse(status, response_headers, data)
+        finally:
+            writer.close()
+
+    return await asyncio.wait_for(_exchange(), timeout_seconds)
+
+
+async def get_run_info_by_engine_task_keys(
+    keys_list: List[str],
+    engine_type: str,
+    *,
+    base_url: Optional[str] = None,
+    token: Optional[str] = None,
+    timeout_seconds: int = 30,
+    ssl_context: SSLContext | None = None,
+) -> Dict[str, Any]:
+    if not keys_list:
+        raise ValueError("At least one engine task key must be provided")
+
+    config = load_config(base_url=base_url, token=token)
+    with metrics.timer("cp_api_run_info") as call:
+        response = await post(
+            build_run_info_url(config.base_url, engine_type),
+            json.dumps({"engineTaskKeys": keys_list}).encode("utf-8"),
+            {
+                "Authorization": f"Bearer {config.token}",
+                "Content-Type": "application/json",
+            },
+            timeout_seconds=timeout_seconds,
+            ssl_context=ssl_context,
+        )
+        call.add_bytes(len(response.body))
+        if response.status >= 400:
+            raise CpApiHttpError(
+                response.status,
+                response.body.decode("utf-8", "replace")[:200],
+                retry_after=parse_retry_after(response.header("Retry-After")),
+            )
+    return json.loads(response.body.decode("utf-8") or "{}")
+
+
+async def get_tasks_run_info(
+    task_keys: Iterable[str],
+    *,
+    engine_type: str = "NEXTFLOW",
+    base_url: Optional[str] = None,
+    token: Optional[str] = None,
+    timeout_seconds: int = 30,
+    ssl_context: SSLContext | None = None,
+    chunk_size: Optional[int] = None,
+    concurrency: int = 1,
+    max_retries: int = 0,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+) -> CpApiTaskRunInfoResponse:
+    """Async `cp_api.get_tasks_run_info` with up to `concurrency` chunks in flight."""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    # the limiter gates each attempt, so it sees the throttling responses that are retried
+    request = get_run_info_by_engine_task_keys if limiter is None \
+        else limiter.wrap_async(get_run_info_by_engine_task_keys)
+
+    async def _fetch(keys: List[str]) -> CpApiTaskRunInfoResponse:
+        async with semaphore:
+            run_info = await call_with_retry_async(
+                lambda: request(
+                    keys,
+                    engine_type=engine_type,
+                    base_url=base_url,
+                    token=token,
+                    timeout_seconds=timeout_seconds,
+                    ssl_context=ssl_context,
+                ),
+                retry_policy or NO_RETRY,
+                description=f"CP API run info ({len(keys)} keys)",
+            )
+        return parse_task_run_info(run_info)
+
+    chunks = RunInfoChunks(task_keys, chunk_size, max_retries)
+    if len(chunks.chunks) == 1:
+        return await _fetch(chunks.chunks[0])
+
+    while True:
+        pending = chunks.pending()
+        results = await asyncio.gather(*(_fetch(keys) for _, keys in pending), return_exceptions=True)
+        for (index, _), result in zip(pending, results):
+            chunks.record(index, result)
+        if not chunks.next_round():
+            return chunks.response()
@@ -3,9 +3,9 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
 
-from .models import JobModel, TaskModel, ensure_utc
+from .models import JobSlimModel, TaskSlimModel, ensure_utc
 
 
 @dataclass(frozen=True)
@@ -52,136 +52,146 @@ class CleanupJobCriteria:
 
 
 @dataclass(frozen=True)
-class Decision:
-    can_delete: bool
-    reasons: List[str]
-
-
-def _matches_age(job: JobModel, age: timedelta, now: datetime) -> bool:
-    last_modified = job.last_modified
-    if last_modified is None:
-        return False
-    now_utc = ensure_utc(now or datetime.now(timezone.utc))
-    cutoff = now_utc - age
-    return ensure_utc(last_modified) <= cutoff
+class Projection:
+    """Azure Batch JSON fields needed to evaluate criteria and report candidates."""
+    job_fields: Tuple[str, ...]
+    task_fields: Tuple[str, ...]
 
 
-def _matches_empty(
-    job: JobModel,
-    tasks: Iterable[TaskModel],
-    empty_age: timedelta,
-    now: datetime,
-) -> bool:
-    return len(list(tasks)) == 0 and _matches_age(job, empty_age, now)
-
-
-def _matches_every_task(
-    job: JobModel,
-    tasks: Iterable[TaskModel],
-    taskCriteria: CleanupTaskCriteria,
-    now: datetime,
-) -> bool:
-    """Check if all tasks satisfy the requested pattern/workdir/age constraints."""
-    task_list = list(tasks)  # Ensure we can iterate multiple times
-    task_id_pattern_match = True
-    if taskCriteria.id_pattern is not None:
-        task_id_re = re.compile(taskCriteria.id_pattern)
+def projection_for(criteria: CleanupJobCriteria) -> Projection:
+    job_fields = ("id", "state", "lastModified", "eTag", "displayName")
+    task_fields: Tuple[str, ...] = ("id", "state", "lastModified", "eTag")
+    if criteria.task is not None and criteria.task.nf_workdir is not None:
+        task_fields += ("resourceFiles",)
+    return Projection(job_fields=job_fields, task_fields=task_fields)
 
-        def check_task_id(task: TaskModel) -> bool:
-            return task_id_re.search(task.id or "") is not None
 
-        task_id_pattern_match = len(task_list) > 0 and \
-            all(check_task_id(task) for task in task_list)
+@dataclass(frozen=True)
+class Decision:
+    can_delete: bool
+    reasons: List[str]
 
-    nf_workdir_match = True
-    if taskCriteria.nf_workdir is not None:
-        workdir_re = re.compile(taskCriteria.nf_workdir)
 
-        def check_workdir(task: TaskModel, ) -> bool:
+def _cutoff(age: Optional[timedelta], now_utc: datetime) -> Optional[datetime]:
+    return now_utc - age if age is not None else None
+
+
+def _compile(pattern: Optional[str]) -> Optional[Pattern[str]]:
+    return re.compile(pattern) if pattern is not None else None
+
+
+class CriteriaEvaluator:
+    """`CleanupJobCriteria` compiled for a fixed `now`.
+
+    Patterns and UTC age cutoffs are computed once, so a single evaluator can
+    be reused for every job of a run. Tasks are walked in a single pass that
+    stops as soon as no task-based criterion can still match.
+    """
+
+    def __init__(self, criteria: CleanupJobCriteria, now: Optional[datetime]) -> None:
+        now_utc = ensure_utc(now or datetime.now(timezone.utc))
+        self.criteria = criteria
+        self.now = now_utc
+        self.age_cutoff = _cutoff(criteria.age, now_utc)
+        self.empty_cutoff = _cutoff(criteria.empty, now_utc)
+        self.task_cutoff = _cutoff(
+            criteria.task.age if criteria.task is not None else None, now_utc)
+        self.task_run_completed_cutoff = _cutoff(criteria.task_run_completed, now_utc)
+        self.task_id_re = _compile(
+            criteria.task.id_pattern if criteria.task is not None else None)
+        self.workdir_re = _compile(
+            criteria.task.nf_workdir if criteria.task is not None else None)
+        # every criterion is AND-ed with its own age cutoff, so no job modified
+        # after the latest of them can match, whatever its tasks are
+        cutoffs = [
+            cutoff for cutoff in (
+                self.age_cutoff,
+                self.empty_cutoff,
+                self.task_cutoff,
+                self.task_run_completed_cutoff,
+            ) if cutoff is not None
+        ]
+        self.latest_cutoff: Optional[datetime] = max(cutoffs) if cutoffs else None
+
+    def may_match(self, job: JobSlimModel) -> bool:
+        """Return False for jobs too recent to match any criterion."""
+        return self.latest_cutoff is not None and job.last_modified is not None \
+            and ensure_utc(job.last_modified) <= self.latest_cutoff
+
+    def matches_task(self, task: TaskSlimModel) -> bool:
+        """Check the task against the requested pattern/workdir constraints."""
+        if self.task_id_re is not None and self.task_id_re.search(task.id or "") is None:
+            return False
+        if self.workdir_re is not None:
             resource_file = next(
                 (rf for rf
                     in task.resource_files or []
                     if rf.file_path == ".command.run"),
                 None
             )
-            return resource_file is not None and workdir_re.search(resource_file.http_url or "") is not None
-
-        nf_workdir_match = len(task_list) > 0 and \
-            all(check_workdir(task) for task in task_list)
-
-    age_match = _matches_age(job, taskCriteria.age, now)
-
-    return task_id_pattern_match and nf_workdir_match and age_match
-
+            if resource_file is None or self.workdir_re.search(resource_file.http_url or "") is None:
+                return False
+        return True
 
-def _matches_task_run_completed(
-    job: JobModel,
-    tasks: Iterable[TaskModel],
-    age: timedelta,
-    now: datetime,
-    task_run_info: Optional[Dict[str, bool]],
-) -> bool:
-    if not _matches_age(job, age, now):
-        return False
+    def evaluate(
+        self,
+        job: JobSlimModel,
+        tasks: Iterable[TaskSlimModel],
+        task_run_completed: Optional[Dict[str, bool]] = None,
+    ) -> Decision:
+        last_modified = ensure_utc(job.last_modified) \
+            if job.last_modified is not None else None
+
+        def older_than(cutoff: Optional[datetime]) -> bool:
+            return cutoff is not None and last_modified is not None and last_modified <= cutoff
+
+        # Match --age (independent, global age filter)
+        match_age = older_than(self.age_cutoff)
+
+        # Each task-based criterion is AND-ed with its own job age cutoff
+        check_empty = older_than(self.empty_cutoff)
+        task_ok = self.criteria.task is not None and older_than(self.task_cutoff)
+        run_ok = older_than(self.task_run_completed_cutoff) and bool(task_run_completed)
+
+        has_tasks = False
+        if check_empty or task_ok or run_ok:
+            for task in tasks:
+                has_tasks = True
+                if task_ok and not self.matches_task(task):
+                    task_ok = False
+                if run_ok and task_run_completed.get(task.id) is not True:  # type: ignore[union-attr]
+                    run_ok = False
+                if not (task_ok or run_ok):
+                    break
+
+        # --empty matches jobs without tasks; task-based criteria need at least one task
+        match_empty = check_empty and not has_tasks
+        match_task = task_ok and has_tasks
+        match_task_run_completed = run_ok and has_tasks
+
+        reasons: List[str] = []
+        if match_age:
+            reasons.append("age")
+        if match_empty:
+            reasons.append("empty")
+        if match_task:
+            reasons.append("task")
+        if match_task_run_completed:
+            reasons.append("task-run-completed")
 
-    task_list = list(tasks)
-    if not task_list or not task_run_info:
-        return False
+        return Decision(can_delete=bool(reasons), reasons=reasons)
 
-    for task in task_list:
-        if task_run_info.get(task.id) is not True:
-            return False
 
-    return True
+def latest_cutoff(criteria: CleanupJobCriteria, now: datetime) -> Optional[datetime]:
+    """Last modification time a job may have and still match any criterion."""
+    return CriteriaEvaluator(criteria, now).latest_cutoff
 
 
 def evaluate_job(
-    job: JobModel,
-    tasks: List[TaskModel],
+    job: JobSlimModel,
+    tasks: List[TaskSlimModel],
     criteria: CleanupJobCriteria,
     now: datetime,
     task_run_completed: Optional[Dict[str, bool]] | None = None,
 ) -> Decision:
-    reasons: List[str] = []
-
-    # Match --empty
-    match_empty = False
-    if criteria.empty is not None:
-        match_empty = _matches_empty(job, tasks, criteria.empty, now)
-
-    # Match --age (independent, global age filter)
-    match_age = _matches_age(job, criteria.age, now) \
-        if criteria.age is not None else False
-
-    # Match --task-id-pattern and/or --task-nf-workdir with --task-age)
-    match_task = False
-    if (criteria.task is not None):
-        match_task = _matches_every_task(job, tasks, criteria.task, now)
-
-    # Match --task-run-completed
-    match_task_run_completed = False
-    if criteria.task_run_completed is not None:
-        match_task_run_completed = _matches_task_run_completed(
-            job, tasks, criteria.task_run_completed, now,
-            task_run_completed,
-        )
-
-    match_res = match_age or match_empty or match_task or match_task_run_completed
-
-    if match_res:
-        if criteria.age is not None and match_age:
-            reasons.append(f"age")
-
-        if criteria.empty is not None and match_empty:
-            reasons.append(f"empty")
-
-        if criteria.task is not None and match_task:
-            reasons.append("task")
-
-        if criteria.task_run_completed is not None and match_task_run_completed:
-            reasons.append("task-run-completed")
-
-        if not reasons:
-            raise ValueError("Unexpected criteria")
-
-    return Decision(can_delete=match_res, reasons=reasons)
+    return CriteriaEvaluator(criteria, now).evaluate(job, tasks, task_run_completed)
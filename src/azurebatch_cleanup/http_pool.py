@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import http.client
+import logging
+import queue
+from contextlib import contextmanager
+from dataclasses import dataclass
+from ssl import SSLContext
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Errors raised when a keep-alive connection was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+@dataclass(frozen=True)
+class HttpResponse:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def header(self, name: str) -> Optional[str]:
+        return self.headers.get(name.lower())
+
+
+class HttpConnectionPool:
+    """Pool of persistent HTTP/1.1 connections to a single host.
+
+    Connections are reused across requests and threads, so TCP and TLS
+    handshakes are paid once per pooled connection rather than per call.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_size: int = 10,
+        timeout_seconds: float = 30,
+        ssl_context: SSLContext | None = None,
+    ) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported base url: '{base_url}'")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout_seconds = timeout_seconds
+        self.ssl_context = ssl_context
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(
+            maxsize=max(max_size, 1))
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port,
+                timeout=self.timeout_seconds, context=self.ssl_context)
+        return http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout_seconds)
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _start(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a request relative to the pool base url and read the response head."""
+        target = self.base_path + path
+        connection, reused = self._acquire()
+        try:
+            try:
+                return connection, self._send(connection, method, target, body, headers)
+            except _STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                logger.debug("Reconnecting stale connection to %s", self.host)
+                connection.close()
+                connection = self._new_connection()
+                return connection, self._send(connection, method, target, body, headers)
+        except Exception:
+            connection.close()
+            raise
+
+    def _finish(
+        self,
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ) -> None:
+        # only a fully read body leaves the connection ready for the next request
+        if response.will_close or not response.isclosed():
+            connection.close()
+        else:
+            self._release(connection)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> HttpResponse:
+        """Send a request relative to the pool base url and read the full response."""
+        connection, response = self._start(method, path, body, headers)
+        try:
+            data = response.read()
+        except Exception:
+            connection.close()
+            raise
+        self._finish(connection, response)
+        return HttpResponse(
+            status=response.status,
+            headers={name.lower(): value for name, value in response.getheaders()},
+            body=data,
+        )
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Iterator[http.client.HTTPResponse]:
+        """Send a request and yield the response with its body still unread.
+
+        The connection is pooled again when the block exits normally, after
+        the rest of the body is drained; on errors it is closed.
+        """
+        connection, response = self._start(method, path, body, headers)
+        try:
+            yield response
+            response.read()
+        except BaseException:
+            connection.close()
+            raise
+        self._finish(connection, response)
+
+    @staticmethod
+    def _send(
+        connection: http.client.HTTPConnection,
+        method: str,
+        target: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> http.client.HTTPResponse:
+        connection.request(method, target, body=body, headers=dict(headers or {}))
+        return connection.getresponse()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
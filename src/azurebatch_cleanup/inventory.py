@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from . import metrics
+from .io import ConsoleIO
+from .models import JobSlimModel, TaskSlimModel
+
+logger = logging.getLogger(__name__)
+
+ListJobsFn = Callable[[], List[JobSlimModel]]
+ListTasksFn = Callable[[str], List[TaskSlimModel]]
+
+# only the fields read by criteria and reports are stored
+_TASK_FIELDS = set(TaskSlimModel.model_fields) - {"raw"}
+
+
+@dataclass(frozen=True)
+class StoredJob:
+    e_tag: Optional[str]
+    tasks: List[TaskSlimModel]
+    refreshed_at: float
+
+
+class InventoryStore:
+    """SQLite store of the task list of every job, tagged with the job eTag."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_tasks ("
+            " job_id TEXT PRIMARY KEY,"
+            " e_tag TEXT,"
+            " tasks TEXT NOT NULL,"
+            " refreshed_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, job_id: str) -> Optional[StoredJob]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT e_tag, tasks, refreshed_at FROM job_tasks WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        e_tag, tasks, refreshed_at = row
+        return StoredJob(
+            e_tag=e_tag,
+            tasks=[TaskSlimModel.model_validate(item) for item in json.loads(tasks)],
+            refreshed_at=refreshed_at,
+        )
+
+    def put(self, job_id: str, e_tag: Optional[str], tasks: Sequence[TaskSlimModel], refreshed_at: float) -> None:
+        data = json.dumps([
+            task.model_dump(mode="json", by_alias=True, include=_TASK_FIELDS)
+            for task in tasks
+        ])
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_tasks (job_id, e_tag, tasks, refreshed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (job_id, e_tag, data, refreshed_at),
+            )
+            self._db.commit()
+
+    def retain(self, job_ids: Set[str]) -> int:
+        """Drop jobs that are no longer listed; returns the number removed."""
+        with self._lock:
+            stored = [row[0] for row in self._db.execute("SELECT job_id FROM job_tasks")]
+            removed = [(job_id,) for job_id in stored if job_id not in job_ids]
+            self._db.executemany("DELETE FROM job_tasks WHERE job_id = ?", removed)
+            self._db.commit()
+        return len(removed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class InventoryLister:
+    """Incremental refresh of job task lists backed by an `InventoryStore`.
+
+    `list_jobs` and `list_tasks` follow the `core` provider contracts. Tasks
+    are only re-listed for jobs whose eTag changed since they were stored or
+    whose stored list is older than `max_age_seconds`.
+
+    The eTag of a job does not change when tasks are added to it, so
+    `verify_tasks` lists fresh tasks for jobs answered from the store; core
+    uses it to re-check deletion candidates.
+    """
+
+    def __init__(
+        self,
+        store: InventoryStore,
+        list_jobs: ListJobsFn,
+        list_tasks: ListTasksFn,
+        *,
+        max_age_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self._list_jobs = list_jobs
+        self._list_tasks = list_tasks
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._e_tags: Dict[str, Optional[str]] = {}
+        self._fresh: Set[str] = set()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.listed = 0
+
+    def list_jobs(self, **kwargs: Any) -> List[JobSlimModel]:
+        """Keyword arguments, such as `job_filter`, are passed to the wrapped listing."""
+        jobs = self._list_jobs(**kwargs)
+        self._e_tags = {job.id: job.e_tag for job in jobs}
+        # a new listing, e.g. the next watch poll, makes earlier task lists stale
+        with self._lock:
+            self._fresh.clear()
+        removed = self.store.retain(set(self._e_tags))
+        if removed:
+            logger.info("Inventory: dropped %d jobs no longer listed", removed)
+        return jobs
+
+    def _is_current(self, job_id: str, stored: StoredJob) -> bool:
+        e_tag = self._e_tags.get(job_id)
+        if e_tag is None or stored.e_tag != e_tag:
+            return False
+        if self.max_age_seconds is None:
+            return True
+        return self._clock() - stored.refreshed_at <= self.max_age_seconds
+
+    def _refresh(self, job_id: str) -> List[TaskSlimModel]:
+        tasks = self._list_tasks(job_id)
+        self.store.put(job_id, self._e_tags.get(job_id), tasks, self._clock())
+        with self._lock:
+            self._fresh.add(job_id)
+            self.listed += 1
+        return tasks
+
+    def list_tasks(self, job_id: str) -> List[TaskSlimModel]:
+        stored = self.store.get(job_id)
+        if stored is not None and self._is_current(job_id, stored):
+            with self._lock:
+                self.reused += 1
+            return stored.tasks
+        return self._refresh(job_id)
+
+    def verify_tasks(self, job_id: str) -> List[TaskSlimModel]:
+        """Return tasks listed since the last `list_jobs`, re-listing jobs answered from the store."""
+        with self._lock:
+            fresh = job_id in self._fresh
+        if fresh:
+            stored = self.store.get(job_id)
+            if stored is not None:
+                return stored.tasks
+        return self._refresh(job_id)
+
+    def report_stats(self, io: ConsoleIO) -> None:
+        """Print reused and listed counts and record them as `--metrics-out` gauges."""
+        metrics.REGISTRY.set_gauge("cache_hits", "inventory", self.reused)
+        metrics.REGISTRY.set_gauge("cache_misses", "inventory", self.listed)
+        io.print(f"Inventory: {self.reused} task lists reused, {self.listed} listed")
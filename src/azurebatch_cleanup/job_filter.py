@@ -0,0 +1,44 @@
+"""Server-side job list filters in the OData syntax of the Batch list API."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from .criteria import CleanupJobCriteria, latest_cutoff
+from .models import ensure_utc
+
+
+def _odata_datetime(value: datetime) -> str:
+    return "DateTime'" + ensure_utc(value).strftime("%Y-%m-%dT%H:%M:%S.%fZ") + "'"
+
+
+def _odata_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+@dataclass(frozen=True)
+class JobListFilter:
+    """Restriction of the job listing that is evaluated by the Batch service."""
+    modified_before: Optional[datetime] = None
+    pool_id: Optional[str] = None
+
+    def odata(self) -> str:
+        clauses = ["state ne 'completed'"]
+        if self.modified_before is not None:
+            # lastModified cannot be filtered on by the service; creation and the
+            # last state transition never happen after it, so these are safe bounds
+            cutoff = _odata_datetime(self.modified_before)
+            clauses.append(f"creationTime le {cutoff}")
+            clauses.append(f"stateTransitionTime le {cutoff}")
+        if self.pool_id is not None:
+            clauses.append(f"executionInfo/poolId eq {_odata_string(self.pool_id)}")
+        return " and ".join(clauses)
+
+
+def job_list_filter(
+    criteria: CleanupJobCriteria,
+    now: datetime,
+    pool_id: Optional[str] = None,
+) -> JobListFilter:
+    return JobListFilter(modified_before=latest_cutoff(criteria, now), pool_id=pool_id)
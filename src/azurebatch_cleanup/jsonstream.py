@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterator, Optional, TextIO
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+# characters a number can continue with, e.g. `1` in a buffer ending with `1.`
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+# an array element that is a string without escapes, with its separator
+_PLAIN_STRING_ELEMENT = re.compile(r'[ \t\n\r]*"([^"\\\x00-\x1f]*)"[ \t\n\r]*([,\]])')
+
+
+def _number_tail_start(buffer: str) -> int:
+    """Start of the run of number characters at the end of `buffer`."""
+    start = len(buffer)
+    while start > 0 and buffer[start - 1] in _NUMBER_CHARS:
+        start -= 1
+    return start
+
+
+class JsonStreamReader:
+    """Incremental JSON reader over a text stream.
+
+    Only the data of the value being decoded is held in memory, so arrays
+    of any length can be consumed one element at a time.
+
+    Without a `stream` the reader runs in push mode for producers that cannot
+    be read from synchronously, such as asyncio subprocess pipes: input is
+    passed to `feed` and `feed_eof`, and the elements of a top-level array
+    completed so far are taken with `pending_elements`.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+        # push mode position in the top-level array: start, first, value, separator or done
+        self._array_state = "start"
+
+    def _fill(self) -> bool:
+        if self._eof or self._stream is None:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or '' at end of stream."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found or '<EOF>'}'")
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a value ending in the trailing number characters may be a number that
+            # continues in the next chunk, e.g. `1` decoded from a buffer ending in `1.`
+            if end >= _number_tail_start(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the elements of the JSON array at the current position."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            # plain strings, e.g. long arrays of ids, are sliced out without the decoder
+            match = _PLAIN_STRING_ELEMENT.match(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.end()
+                yield match[1]
+                if match[2] == "]":
+                    return
+                continue
+            yield self.decode_value()
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def iter_elements(self) -> Iterator[None]:
+        """Step through the JSON array at the current position.
+
+        Each step leaves the reader at the next element, which the caller
+        must consume (`decode_value`, `iter_array`, `iter_object`) before
+        the next step.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the member names of the JSON object at the current position.
+
+        After each name the reader is at the member value, which the caller
+        must consume before the next name is read.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError(f"Expected a member name in JSON stream, found '{self.peek() or '<EOF>'}'")
+            name = self.decode_value()
+            self.expect(":")
+            yield name
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def feed(self, text: str) -> None:
+        """Append input in push mode."""
+        if text:
+            self._buffer = self._buffer[self._pos:] + text
+            self._pos = 0
+
+    def feed_eof(self) -> None:
+        """Mark the end of push mode input."""
+        self._eof = True
+
+    def pending_elements(self) -> Iterator[Any]:
+        """Yield the top-level array elements completed by the input fed so far.
+
+        Returns when more input is needed; an empty input yields nothing.
+        """
+        while self._array_state != "done":
+            buffer = self._buffer
+            while self._pos < len(buffer) and buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos == len(buffer):
+                if not self._eof:
+                    return
+                if self._array_state == "start":
+                    self._array_state = "done"
+                    return
+                raise ValueError("Unexpected end of JSON stream")
+            char = buffer[self._pos]
+            if self._array_state == "start":
+                if char != "[":
+                    raise ValueError(f"Expected '[' in JSON stream, found '{char}'")
+                self._pos += 1
+                self._array_state = "first"
+            elif self._array_state == "separator" or (self._array_state == "first" and char == "]"):
+                if char not in ",]":
+                    raise ValueError(f"Expected ',' or ']' in JSON stream, found '{char}'")
+                self._pos += 1
+                self._array_state = "value" if char == "," else "done"
+            else:
+                try:
+                    value, end = self._decoder.raw_decode(buffer, self._pos)
+                except json.JSONDecodeError:
+                    if self._eof:
+                        raise
+                    return
+                # as in `decode_value`, a number may continue in the next chunk
+                if end >= _number_tail_start(buffer) and not self._eof:
+                    return
+                self._pos = end
+                self._array_state = "separator"
+                yield value
+
+
+def iter_json_array(stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array; an empty stream yields nothing."""
+    reader = JsonStreamReader(stream, chunk_size)
+    if reader.peek() == "":
+        return
+    yield from reader.iter_array()
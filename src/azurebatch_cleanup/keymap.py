@@ -0,0 +1,86 @@
+"""Batch mapping of Azure Batch task ids to workflow engine task keys.
+
+CP API identifies tasks by engine-specific keys. A mapper converts a whole
+batch of task ids in one pass and returns their keys in the same order.
+Mappers are registered per engine type with `register_mapper`.
+"""
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional (the 'columnar' extra)
+    np = None
+
+KeyMapper = Callable[[Sequence[str]], List[str]]
+
+_MAPPERS: Dict[str, KeyMapper] = {}
+
+# Nextflow task ids on Azure Batch start with `nf-` and the first 8 hex digits
+# of the task hash; the key is the work directory prefix `ab/cdef01`
+_NEXTFLOW_TASK_ID = re.compile(r"^nf-([a-f0-9]{2})([a-f0-9]{6})")
+_NEXTFLOW_PREFIX_LENGTH = 11
+# below this size converting to arrays costs more than it saves
+_VECTORIZE_MIN_SIZE = 256
+_VECTORIZE_CHUNK_SIZE = 4096
+
+
+def register_mapper(engine_type: str, mapper: KeyMapper) -> None:
+    """Use `mapper` for task ids of `engine_type`, replacing any earlier one."""
+    _MAPPERS[engine_type] = mapper
+
+
+def get_mapper(engine_type: str) -> KeyMapper:
+    try:
+        return _MAPPERS[engine_type]
+    except KeyError:
+        raise ValueError(f"No task key mapper registered for engine type '{engine_type}'") from None
+
+
+def per_task(id2key: Callable[[str], str]) -> KeyMapper:
+    """Adapt a function mapping one task id to the batch interface."""
+    def _mapper(task_ids: Sequence[str]) -> List[str]:
+        return [id2key(task_id) for task_id in task_ids]
+    return _mapper
+
+
+def nextflow_key(task_id: str) -> str:
+    """Key of a Nextflow task id; other ids are returned unchanged."""
+    match = _NEXTFLOW_TASK_ID.match(task_id)
+    return f"{match[1]}/{match[2]}" if match else task_id
+
+
+def _nextflow_keys_vectorized(task_ids: Sequence[str]) -> List[str]:
+    # only the prefix decides the key, so ids are truncated to a fixed width and
+    # compared as a (ids x characters) matrix of code points
+    prefixes = np.array(task_ids, dtype=f"<U{_NEXTFLOW_PREFIX_LENGTH}")
+    chars = prefixes.view("<u4").reshape(len(task_ids), _NEXTFLOW_PREFIX_LENGTH)
+    digits = chars[:, 3:]
+    matched = (chars[:, 0] == ord("n")) & (chars[:, 1] == ord("f")) & (chars[:, 2] == ord("-"))
+    matched &= np.all(
+        ((digits >= ord("0")) & (digits <= ord("9"))) | ((digits >= ord("a")) & (digits <= ord("f"))),
+        axis=1)
+
+    key_chars = np.empty((len(task_ids), 9), dtype="<u4")
+    key_chars[:, :2] = digits[:, :2]
+    key_chars[:, 2] = ord("/")
+    key_chars[:, 3:] = digits[:, 2:]
+    keys: List[str] = key_chars.view("<U9").ravel().tolist()
+    for index in np.flatnonzero(~matched).tolist():
+        keys[index] = task_ids[index]
+    return keys
+
+
+def nextflow_keys(task_ids: Sequence[str]) -> List[str]:
+    if np is None or len(task_ids) < _VECTORIZE_MIN_SIZE:
+        return [nextflow_key(task_id) for task_id in task_ids]
+    # fixed-size chunks keep the temporary arrays small next to the result
+    keys: List[str] = []
+    for start in range(0, len(task_ids), _VECTORIZE_CHUNK_SIZE):
+        keys.extend(_nextflow_keys_vectorized(task_ids[start:start + _VECTORIZE_CHUNK_SIZE]))
+    return keys
+
+
+register_mapper("NEXTFLOW", nextflow_keys)
@@ -0,0 +1,186 @@
+"""Per-operation timers and counters, exported as JSON or a Prometheus textfile.
+
+Instrumented code records into the process-wide `REGISTRY`; the CLI writes it
+out at the end of a run (`--metrics-out`).
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PREFIX = "azbatch_cleanup"
+
+# upper bounds in seconds, from fast local calls to slow az subprocesses
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class OperationStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.bytes_read = 0
+        self.duration_sum = 0.0
+        # one slot per bucket plus the implicit +Inf bucket, not cumulative
+        self.bucket_counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.duration_sum += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def cumulative_buckets(self) -> List[Tuple[str, int]]:
+        total = 0
+        buckets: List[Tuple[str, int]] = []
+        for bound, count in zip([*map(repr, LATENCY_BUCKETS), "+Inf"], self.bucket_counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+class Call:
+    """Handle yielded by `MetricsRegistry.timer` to report bytes read by the call."""
+
+    def __init__(self) -> None:
+        self.bytes_read = 0
+
+    def add_bytes(self, count: int) -> None:
+        self.bytes_read += count
+
+
+class MetricsRegistry:
+    """Thread-safe collection of `OperationStats` keyed by operation name."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._operations: Dict[str, OperationStats] = {}
+        self._gauges: Dict[str, Dict[str, float]] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self._gauges.clear()
+
+    def set_gauge(self, name: str, op: str, value: float) -> None:
+        """Record the current `value` of gauge `name` for operation `op`."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[op] = value
+
+    def get(self, op: str) -> OperationStats:
+        with self._lock:
+            return self._operations.setdefault(op, OperationStats())
+
+    @contextmanager
+    def timer(self, op: str) -> Iterator[Call]:
+        """Count a call to `op`, its latency, bytes read and whether it raised."""
+        call = Call()
+        started = self._clock()
+        failed = False
+        try:
+            yield call
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = self._clock() - started
+            with self._lock:
+                stats = self._operations.setdefault(op, OperationStats())
+                stats.calls += 1
+                stats.errors += int(failed)
+                stats.bytes_read += call.bytes_read
+                stats.observe(elapsed)
+
+    def timed(self, op: str) -> Callable[[F], F]:
+        """Decorator form of `timer`."""
+        def _decorate(func: F) -> F:
+            @functools.wraps(func)
+            def _wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.timer(op):
+                    return func(*args, **kwargs)
+            return _wrapper  # type: ignore[return-value]
+        return _decorate
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "operations": {
+                    op: {
+                        "calls": stats.calls,
+                        "errors": stats.errors,
+                        "bytes_read": stats.bytes_read,
+                        "duration_seconds": {
+                            "sum": stats.duration_sum,
+                            "count": stats.calls,
+                            "buckets": dict(stats.cumulative_buckets()),
+                        },
+                    }
+                    for op, stats in sorted(self._operations.items())
+                },
+                "gauges": {
+                    name: dict(sorted(values.items()))
+                    for name, values in sorted(self._gauges.items())
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            operations = sorted(self._operations.items())
+            lines: List[str] = []
+            for name, kind, help_text, value in (
+                ("calls_total", "counter", "Calls per operation.", lambda s: s.calls),
+                ("errors_total", "counter", "Calls that raised, per operation.", lambda s: s.errors),
+                ("bytes_read_total", "counter", "Response bytes read, per operation.", lambda s: s.bytes_read),
+            ):
+                lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+                for op, stats in operations:
+                    lines.append(f'{PREFIX}_{name}{{op="{_escape(op)}"}} {value(stats)}')
+            lines.append(f"# HELP {PREFIX}_duration_seconds Call latency per operation.")
+            lines.append(f"# TYPE {PREFIX}_duration_seconds histogram")
+            for op, stats in operations:
+                label = f'op="{_escape(op)}"'
+                for bound, count in stats.cumulative_buckets():
+                    lines.append(f'{PREFIX}_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f"{PREFIX}_duration_seconds_sum{{{label}}} {stats.duration_sum!r}")
+                lines.append(f"{PREFIX}_duration_seconds_count{{{label}}} {stats.calls}")
+            for name, values in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {PREFIX}_{name} gauge")
+                for op, gauge_value in sorted(values.items()):
+                    lines.append(f'{PREFIX}_{name}{{op="{_escape(op)}"}} {gauge_value!r}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path) -> None:
+        """Write a Prometheus textfile for `*.prom` paths, JSON otherwise.
+
+        The file is replaced atomically, so a textfile collector never reads
+        a partial report.
+        """
+        path = Path(path)
+        if path.suffix == ".prom":
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2) + "\n"
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+timer = REGISTRY.timer
+timed = REGISTRY.timed
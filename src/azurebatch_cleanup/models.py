@@ -1,11 +1,26 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Type, TypeVar
 
 from pydantic import BaseModel, Field, ConfigDict
 
 
+M = TypeVar("M", bound="AzModel")
+
+
+class AzModel(BaseModel):
+    """Model parsed from Azure CLI data, optionally keeping the source dict in `raw`"""
+    raw: Dict[str, Any] = Field(default_factory=dict)
+
+    @classmethod
+    def from_az(cls: Type[M], data: Dict[str, Any], *, keep_raw: bool = True) -> M:
+        """Create the model from Azure CLI data, optionally keeping the source dict in `raw`"""
+        if not keep_raw:
+            return cls(**data)
+        return cls(**data, raw=data)
+
+
 class AutoUser(BaseModel):
     """Auto user account settings"""
     elevation_level: Optional[str] = Field(None, alias="elevationLevel")
@@ -112,7 +127,18 @@ class OutputFile(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
-class TaskModel(BaseModel):
+class TaskSlimModel(AzModel):
+    """Azure Batch Task restricted to the fields used by cleanup criteria"""
+    id: str
+    state: str
+    last_modified: Optional[datetime] = Field(None, alias="lastModified")
+    e_tag: Optional[str] = Field(None, alias="eTag")
+    resource_files: Optional[List[ResourceFile]] = Field(None, alias="resourceFiles")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class TaskModel(TaskSlimModel):
     """Azure Batch Task"""
     id: str
     state: str
@@ -132,15 +158,9 @@ class TaskModel(BaseModel):
     output_files: Optional[List[OutputFile]] = Field(None, alias="outputFiles")
     required_slots: Optional[int] = Field(None, alias="requiredSlots")
     user_identity: Optional[UserIdentity] = Field(None, alias="userIdentity")
-    raw: Dict[str, Any] = Field(default_factory=dict)
 
     model_config = ConfigDict(populate_by_name=True)
 
-    @classmethod
-    def from_az(cls, data: Dict[str, Any]) -> "TaskModel":
-        """Create Task from Azure CLI data"""
-        return cls(**data, raw=data)
-
 
 class JobConstraints(BaseModel):
     """Job constraint settings"""
@@ -165,7 +185,18 @@ class JobExecutionInfo(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
-class JobModel(BaseModel):
+class JobSlimModel(AzModel):
+    """Azure Batch Job restricted to the fields used by cleanup criteria"""
+    id: str
+    state: str
+    last_modified: datetime = Field(..., alias="lastModified")
+    e_tag: Optional[str] = Field(None, alias="eTag")
+    display_name: Optional[str] = Field(None, alias="displayName")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class JobModel(JobSlimModel):
     """Azure Batch Job"""
     id: str
     state: str
@@ -184,15 +215,9 @@ class JobModel(BaseModel):
     execution_info: Optional[JobExecutionInfo] = Field(None, alias="executionInfo")
     on_all_tasks_complete: Optional[str] = Field(None, alias="onAllTasksComplete")
     on_task_failure: Optional[str] = Field(None, alias="onTaskFailure")
-    raw: Dict[str, Any] = Field(default_factory=dict)
 
     model_config = ConfigDict(populate_by_name=True)
 
-    @classmethod
-    def from_az(cls, data: Dict[str, Any]) -> "JobModel":
-        """Create Job from Azure CLI data"""
-        return cls(**data, raw=data)
-
 
 def ensure_utc(dt: datetime) -> datetime:
     """Ensure datetime is in UTC timezone"""
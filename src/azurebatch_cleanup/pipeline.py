@@ -0,0 +1,317 @@
+"""Streaming cleanup: list → task lookup → run info → evaluate → delete.
+
+Each stage runs in its own thread(s) and hands work to the next one through
+a bounded queue, so deletions can start while jobs are still being listed
+and memory is bounded by the queue sizes rather than by the inventory.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from . import keymap, metrics
+from .core import (
+    DeleteJobFn,
+    GetTasksRunInfoFn,
+    JobWithTasks,
+    JsonlReport,
+    ListJobsFn,
+    ListTasksFn,
+    candidate_formatter,
+    delete_jobs,
+    get_run_completed,
+    report_summary,
+)
+from .criteria import CleanupJobCriteria, CriteriaEvaluator
+from .io import ConsoleIO
+from .models import JobSlimModel, TaskSlimModel
+
+logger = logging.getLogger(__name__)
+
+# end-of-stream marker, sent once per upstream worker
+_DONE = object()
+
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class PipelineStats:
+    jobs: int = 0
+    skipped: int = 0
+    listing_failed: int = 0
+    evaluated: int = 0
+    candidates: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class _Listed:
+    job: JobSlimModel
+    tasks: List[TaskSlimModel]
+    error: Optional[str] = None
+
+
+class _Stages:
+    """Queues, cancellation and error propagation shared by the stage threads."""
+
+    def __init__(self, queue_size: int) -> None:
+        self.jobs: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.listed: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.looked_up: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.candidates: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.cancel = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._threads: List[threading.Thread] = []
+
+    def put(self, target: "queue.Queue[Any]", item: Any) -> bool:
+        """Put `item` unless the pipeline is cancelled while waiting for space."""
+        while not self.cancel.is_set():
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, source: "queue.Queue[Any]", timeout: Optional[float] = None) -> Any:
+        """Get an item; returns `_DONE` on cancellation and None on timeout."""
+        waited = 0.0
+        while not self.cancel.is_set():
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                waited += _POLL_SECONDS
+                if timeout is not None and waited >= timeout:
+                    return None
+        return _DONE
+
+    def start(self, name: str, target: Callable[[], None]) -> None:
+        def _run() -> None:
+            try:
+                target()
+            except BaseException as exc:  # surfaced by `join`
+                logger.error("Pipeline stage %s failed: %s", name, exc)
+                if self.error is None:
+                    self.error = exc
+                self.cancel.set()
+
+        thread = threading.Thread(target=_run, name=f"cleanup-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class _LockedIO(ConsoleIO):
+    """ConsoleIO sharing a print lock with the pipeline stages."""
+
+    def __init__(self, io: ConsoleIO, lock: threading.Lock) -> None:
+        def _print(message: str) -> None:
+            with lock:
+                io.print(message)
+
+        super().__init__(printer=_print, reader=io.input)
+
+
+def run_pipeline(
+    list_jobs: ListJobsFn,
+    list_tasks: ListTasksFn,
+    get_tasks_run_info: GetTasksRunInfoFn,
+    delete_job: DeleteJobFn,
+    criteria: CleanupJobCriteria,
+    *,
+    dry_run: bool,
+    assume_yes: bool,
+    ignore_errors: bool,
+    io: ConsoleIO,
+    now: datetime,
+    list_concurrency: int = 1,
+    delete_concurrency: int = 1,
+    delete_rate: Optional[float] = None,
+    queue_size: int = 100,
+    lookup_batch_size: int = 1000,
+    lookup_wait_seconds: float = 1.0,
+    output: str = "tasks",
+    report: Optional[JsonlReport] = None,
+) -> int:
+    """Streaming counterpart of `core.run_cleanup`.
+
+    With `assume_yes` candidates are deleted as soon as they are found.
+    Otherwise the pipeline only builds the plan (candidate ids); the plan is
+    confirmed, or reported for `dry_run`, before anything is deleted.
+    """
+    evaluator = CriteriaEvaluator(criteria, now)
+    format_lines = candidate_formatter(output)
+    stages = _Stages(queue_size)
+    stats = PipelineStats()
+    print_lock = threading.Lock()
+    workers = max(list_concurrency, 1)
+
+    def _print_lines(lines: List[str]) -> None:
+        with print_lock:
+            io.print_lines(lines)
+
+    def produce_jobs() -> None:
+        try:
+            with metrics.timer("list_jobs"):
+                jobs = list_jobs()
+            for job in jobs:
+                stats.jobs += 1
+                # jobs younger than every age cutoff cannot match
+                if not evaluator.may_match(job):
+                    stats.skipped += 1
+                    continue
+                if not stages.put(stages.jobs, job):
+                    return
+        finally:
+            for _ in range(workers):
+                stages.put(stages.jobs, _DONE)
+
+    def list_job_tasks() -> None:
+        while True:
+            job = stages.get(stages.jobs)
+            if job is _DONE:
+                stages.put(stages.listed, _DONE)
+                return
+            try:
+                with metrics.timer("list_tasks"):
+                    item = _Listed(job, list_tasks(job.id))
+            except Exception as exc:
+                logger.error("Failed to list tasks for job %s: %s", job.id, exc)
+                item = _Listed(job, [], str(exc) or type(exc).__name__)
+            if not stages.put(stages.listed, item):
+                return
+
+    def look_up_runs() -> None:
+        finished_workers = 0
+        batch: List[_Listed] = []
+        batch_tasks = 0
+
+        def flush() -> bool:
+            run_completed: Optional[Dict[str, bool]] = None
+            task_ids = [task.id for item in batch for task in item.tasks]
+            if criteria.task_run_completed is not None and task_ids:
+                run_completed = get_run_completed(
+                    task_ids, keymap.get_mapper("NEXTFLOW"), get_tasks_run_info)
+            for item in batch:
+                if not stages.put(stages.looked_up, (item, run_completed)):
+                    return False
+            batch.clear()
+            return True
+
+        while finished_workers < workers:
+            # flush partial batches when upstream is idle so work keeps flowing
+            item = stages.get(stages.listed, timeout=lookup_wait_seconds if batch else None)
+            if item is None:
+                batch_tasks = 0
+                if not flush():
+                    return
+                continue
+            if item is _DONE:
+                if stages.cancel.is_set():
+                    return
+                finished_workers += 1
+                continue
+            batch.append(item)
+            batch_tasks += len(item.tasks)
+            if batch_tasks >= lookup_batch_size:
+                batch_tasks = 0
+                if not flush():
+                    return
+        if flush():
+            stages.put(stages.looked_up, _DONE)
+
+    def evaluate() -> None:
+        while True:
+            entry = stages.get(stages.looked_up)
+            if entry is _DONE:
+                stages.put(stages.candidates, _DONE)
+                return
+            item, run_completed = entry
+            if item.error is not None:
+                stats.listing_failed += 1
+                _print_lines([f"Job skipped, task listing failed: {item.job.id}, error: {item.error}"])
+                if report is not None:
+                    report.write_skipped(item.job.id, item.error)
+                continue
+            stats.evaluated += 1
+            decision = evaluator.evaluate(item.job, item.tasks, run_completed)
+            if not decision.can_delete:
+                continue
+            stats.candidates.append(item.job.id)
+            candidate = JobWithTasks(item.job, item.tasks, decision)
+            _print_lines(format_lines(candidate))
+            if report is not None:
+                report.write_candidate(candidate)
+            if not stages.put(stages.candidates, item.job.id):
+                return
+
+    def candidate_ids() -> Iterator[str]:
+        while True:
+            job_id = stages.get(stages.candidates)
+            if job_id is _DONE:
+                return
+            yield job_id
+
+    stages.start("jobs", produce_jobs)
+    for index in range(workers):
+        stages.start(f"tasks-{index}", list_job_tasks)
+    stages.start("runs", look_up_runs)
+    stages.start("evaluate", evaluate)
+
+    stream_deletions = assume_yes and not dry_run
+    summary = None
+    try:
+        if stream_deletions:
+            summary = delete_jobs(
+                candidate_ids(),
+                delete_job,
+                _LockedIO(io, print_lock),
+                concurrency=delete_concurrency,
+                rate_limit=delete_rate,
+                ignore_errors=ignore_errors,
+            )
+            if summary.failed and not ignore_errors:
+                # stop upstream stages; nothing else will be deleted
+                stages.cancel.set()
+        else:
+            for _ in candidate_ids():
+                pass
+    except BaseException:
+        stages.cancel.set()
+        raise
+    finally:
+        stages.join()
+
+    io.print(
+        f"Jobs for deletion: {len(stats.candidates)}/{stats.jobs}"
+        f" (skipped without task listing: {stats.skipped},"
+        f" task listing failed: {stats.listing_failed})")
+
+    if summary is None:
+        if not stats.candidates:
+            return 0
+        if dry_run:
+            io.print("Dry-run mode: no deletions performed.")
+            return 0
+        if not io.confirm("Delete these jobs? [y/N]: "):
+            io.print("Aborted by user.")
+            return 0
+        summary = delete_jobs(
+            stats.candidates,
+            delete_job,
+            io,
+            concurrency=delete_concurrency,
+            rate_limit=delete_rate,
+            ignore_errors=ignore_errors,
+        )
+
+    return report_summary(summary, io, ignore_errors=ignore_errors)
+
@@ -0,0 +1,253 @@
+"""Shared retry policy for Batch and CP API calls.
+
+Transient failures are retried with exponential backoff and full jitter.
+A server-supplied `Retry-After` delay is honoured, and a policy stops at
+whichever comes first: its attempt limit or its total deadline.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import random
+import re
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+from urllib.error import URLError
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+_TRANSIENT_CODES = {"ServerBusy", "OperationTimedOut", "InternalError", "TooManyRequests"}
+# az reports service errors only as text on stderr
+_TRANSIENT_TEXT = re.compile(
+    r"ServerBusy|TooManyRequests|Too Many Requests|OperationTimedOut|\b(?:429|502|503|504)\b"
+    r"|timed out|Connection (?:aborted|reset|refused)|Temporary failure in name resolution",
+    re.IGNORECASE,
+)
+_THROTTLING_STATUS = {429, 503}
+_THROTTLING_CODES = {"ServerBusy", "TooManyRequests"}
+_THROTTLING_TEXT = re.compile(r"ServerBusy|TooManyRequests|Too Many Requests|\b429\b", re.IGNORECASE)
+_JOB_GONE_TEXT = re.compile(r"JobNotFound|JobBeingDeleted|job does not exist", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """`max_attempts` counts the first call; `deadline` is in seconds from the first call."""
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    deadline: Optional[float] = 300.0
+
+    def backoff(self, retry: int, rng: Callable[[float, float], float] = random.uniform) -> float:
+        """Full-jitter delay before retry number `retry` (1-based)."""
+        return rng(0.0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    for name in ("status", "code"):
+        value = getattr(exc, name, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Throttling, server-side and network errors that are worth retrying."""
+    status = _status(exc)
+    code = getattr(exc, "code", None)
+    if isinstance(code, str) and code in _TRANSIENT_CODES:
+        return True
+    if status is not None:
+        return status in _TRANSIENT_STATUS
+    if isinstance(exc, (ConnectionError, TimeoutError, socket.timeout, asyncio.TimeoutError, URLError)):
+        return True
+    return isinstance(exc, RuntimeError) and _TRANSIENT_TEXT.search(str(exc)) is not None
+
+
+def is_throttling(exc: BaseException) -> bool:
+    """The service asked callers to slow down, as opposed to failing outright."""
+    code = getattr(exc, "code", None)
+    if isinstance(code, str) and code in _THROTTLING_CODES:
+        return True
+    status = _status(exc)
+    if status is not None:
+        return status in _THROTTLING_STATUS
+    return isinstance(exc, RuntimeError) and _THROTTLING_TEXT.search(str(exc)) is not None
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds to wait from a `Retry-After` value: delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    value = getattr(exc, "retry_after", None)
+    if isinstance(value, (int, float)):
+        return float(value)
+    headers = getattr(exc, "headers", None)
+    if headers is not None:
+        return parse_retry_after(headers.get("Retry-After"))
+    return None
+
+
+def job_already_deleted(exc: BaseException) -> bool:
+    """A retried delete found the job gone or going, so an earlier attempt succeeded."""
+    code = getattr(exc, "code", None)
+    if isinstance(code, str):
+        return code in ("JobNotFound", "JobBeingDeleted")
+    return _JOB_GONE_TEXT.search(str(exc)) is not None
+
+
+class _Attempts:
+    """Attempt bookkeeping shared by the sync and async loops."""
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        description: str,
+        clock: Callable[[], float],
+        rng: Callable[[float, float], float],
+    ) -> None:
+        self.policy = policy
+        self.description = description
+        self.clock = clock
+        self.rng = rng
+        self.started = clock()
+        self.attempt = 0
+
+    def delay(self, exc: Exception) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up."""
+        if not is_transient(exc) or self.attempt >= self.policy.max_attempts:
+            return None
+        delay = self.policy.backoff(self.attempt, self.rng)
+        server_delay = retry_after(exc)
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        if self.policy.deadline is not None \
+                and self.clock() + delay - self.started > self.policy.deadline:
+            logger.warning("%s: retry deadline reached after %d attempts", self.description, self.attempt)
+            return None
+        logger.warning(
+            "%s failed (attempt %d/%d), retrying in %.1fs: %s",
+            self.description, self.attempt, self.policy.max_attempts, delay, exc)
+        return delay
+
+
+def call_with_retry(
+    func: Callable[[], T],
+    policy: RetryPolicy,
+    *,
+    description: str = "call",
+    already_done: Optional[Callable[[BaseException], bool]] = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    rng: Callable[[float, float], float] = random.uniform,
+) -> Optional[T]:
+    """Call `func` until it succeeds, fails permanently, or `policy` is exhausted.
+
+    `already_done` recognises errors of a repeated attempt meaning an earlier
+    attempt took effect, e.g. deleting a job that is already being deleted;
+    the call then returns None.
+    """
+    attempts = _Attempts(policy, description, clock, rng)
+    while True:
+        attempts.attempt += 1
+        try:
+            return func()
+        except Exception as exc:
+            if already_done is not None and attempts.attempt > 1 and already_done(exc):
+                return None
+            delay = attempts.delay(exc)
+            if delay is None:
+                raise
+        with metrics.timer("retry_wait"):
+            sleep(delay)
+
+
+async def call_with_retry_async(
+    func: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    *,
+    description: str = "call",
+    already_done: Optional[Callable[[BaseException], bool]] = None,
+    clock: Callable[[], float] = time.monotonic,
+    rng: Callable[[float, float], float] = random.uniform,
+) -> Optional[T]:
+    """Coroutine form of `call_with_retry`."""
+    attempts = _Attempts(policy, description, clock, rng)
+    while True:
+        attempts.attempt += 1
+        try:
+            return await func()
+        except Exception as exc:
+            if already_done is not None and attempts.attempt > 1 and already_done(exc):
+                return None
+            delay = attempts.delay(exc)
+            if delay is None:
+                raise
+        with metrics.timer("retry_wait"):
+            await asyncio.sleep(delay)
+
+
+def retrying(
+    func: Callable[..., T],
+    policy: RetryPolicy,
+    *,
+    description: str,
+    already_done: Optional[Callable[[BaseException], bool]] = None,
+) -> Callable[..., T]:
+    """Wrap a provider so every call goes through `call_with_retry`.
+
+    Positional arguments, such as the job id, are appended to `description`
+    in retry log messages.
+    """
+    @functools.wraps(func)
+    def _wrapper(*args: Any, **kwargs: Any) -> Any:
+        return call_with_retry(
+            lambda: func(*args, **kwargs),
+            policy,
+            description=" ".join([description, *map(str, args)]),
+            already_done=already_done,
+        )
+    return _wrapper
+
+
+def retrying_async(
+    func: Callable[..., Awaitable[T]],
+    policy: RetryPolicy,
+    *,
+    description: str,
+    already_done: Optional[Callable[[BaseException], bool]] = None,
+) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(func)
+    async def _wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await call_with_retry_async(
+            lambda: func(*args, **kwargs),
+            policy,
+            description=" ".join([description, *map(str, args)]),
+            already_done=already_done,
+        )
+    return _wrapper
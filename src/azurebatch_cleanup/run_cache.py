@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence
+
+from . import cp_api, metrics
+from .io import ConsoleIO
+
+CACHE_FILE_NAME = "run_status.sqlite3"
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+
+GetTasksRunInfoFn = Callable[[Iterable[str]], cp_api.CpApiTaskRunInfoResponse]
+
+
+class RunStatusCache:
+    """On-disk cache of CP API run statuses keyed by engine type and task key.
+
+    Terminal statuses (see `cp_api.is_run_completed`) never change and are kept
+    forever; other statuses expire after `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        ttl_seconds: float = 300,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path / CACHE_FILE_NAME
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS run_status ("
+            " engine_type TEXT NOT NULL,"
+            " task_key TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " completed INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (engine_type, task_key))"
+        )
+        self._db.commit()
+
+    def get_many(self, engine_type: str, task_keys: Sequence[str]) -> Dict[str, str]:
+        """Return cached statuses of `task_keys` that are terminal or still fresh."""
+        fresh_after = self._clock() - self.ttl_seconds
+        found: Dict[str, str] = {}
+        unique_keys = list(dict.fromkeys(task_keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), _QUERY_BATCH):
+                batch = unique_keys[start:start + _QUERY_BATCH]
+                rows = self._db.execute(
+                    "SELECT task_key, status FROM run_status"
+                    " WHERE engine_type = ? AND (completed = 1 OR fetched_at >= ?)"
+                    f" AND task_key IN ({', '.join('?' * len(batch))})",
+                    [engine_type, fresh_after, *batch],
+                )
+                found.update(rows)
+            self.hits += len(found)
+            self.misses += len(unique_keys) - len(found)
+        return found
+
+    def put_many(self, engine_type: str, statuses: Mapping[str, str]) -> None:
+        fetched_at = self._clock()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO run_status"
+                " (engine_type, task_key, status, completed, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (engine_type, key, status, int(cp_api.is_run_completed(status)), fetched_at)
+                    for key, status in statuses.items()
+                ],
+            )
+            self._db.commit()
+
+    def report_stats(self, io: ConsoleIO) -> None:
+        """Print hit and miss counts and record them as `--metrics-out` gauges."""
+        metrics.REGISTRY.set_gauge("cache_hits", "run_status_cache", self.hits)
+        metrics.REGISTRY.set_gauge("cache_misses", "run_status_cache", self.misses)
+        io.print(f"Run status cache: {self.hits} hits, {self.misses} misses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def cached_tasks_run_info(
+    get_tasks_run_info: GetTasksRunInfoFn,
+    cache: RunStatusCache,
+    engine_type: str = "NEXTFLOW",
+) -> GetTasksRunInfoFn:
+    """Wrap a run info provider so cached keys are answered without a CP API call."""
+
+    def _get_tasks_run_info(task_keys: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        key_list = list(task_keys)
+        cached = cache.get_many(engine_type, key_list)
+        keys_by_status: Dict[str, List[str]] = {}
+        for key, status in cached.items():
+            keys_by_status.setdefault(status, []).append(key)
+        responses = [
+            cp_api.CpApiTaskRunInfoResponse(
+                status="OK",
+                payload=[
+                    cp_api.CpApiRunItem(
+                        run=cp_api.CpApiRunInfo(status=status),
+                        engine_task_keys=keys,
+                    )
+                    for status, keys in keys_by_status.items()
+                ],
+            )
+        ]
+
+        missing = [key for key in dict.fromkeys(key_list) if key not in cached]
+        if missing:
+            fetched = get_tasks_run_info(missing)
+            cache.put_many(engine_type, {
+                key: item.run.status
+                for item in fetched.payload
+                for key in item.engine_task_keys
+            })
+            responses.append(fetched)
+        return cp_api.merge_task_run_info(responses)
+
+    return _get_tasks_run_info
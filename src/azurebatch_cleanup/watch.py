@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set
+
+from .core import (
+    DeleteJobFn,
+    GetTasksRunInfoFn,
+    JsonlReport,
+    ListJobsFn,
+    ListTasksFn,
+    candidate_formatter,
+    collect_jobs,
+    delete_jobs,
+)
+from .criteria import CleanupJobCriteria
+from .io import ConsoleIO
+from .job_filter import JobListFilter
+from .models import JobSlimModel, ensure_utc
+
+logger = logging.getLogger(__name__)
+
+Clock = Callable[[], datetime]
+
+
+def _utc_now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+@dataclass(frozen=True)
+class _WatchedJob:
+    e_tag: Optional[str]
+    last_modified: datetime
+    # next time the job crosses an age cutoff, None once all are crossed
+    next_check: Optional[datetime]
+    awaiting_runs: bool
+
+
+def _criteria_ages(criteria: CleanupJobCriteria) -> List[timedelta]:
+    ages = [criteria.age, criteria.empty, criteria.task_run_completed]
+    if criteria.task is not None:
+        ages.append(criteria.task.age)
+    return [age for age in ages if age is not None]
+
+
+def _next_crossing(job: JobSlimModel, ages: List[timedelta], now: datetime) -> Optional[datetime]:
+    last_modified = ensure_utc(job.last_modified)
+    crossings = [last_modified + age for age in ages if last_modified + age > now]
+    return min(crossings) if crossings else None
+
+
+class JobWatcher:
+    """Keeps per-job state between polls and selects the jobs to re-evaluate.
+
+    Only a small record per listed job is kept; jobs that disappear from the
+    listing are forgotten, so memory is bounded by the number of active jobs.
+    """
+
+    def __init__(self, criteria: CleanupJobCriteria) -> None:
+        self.criteria = criteria
+        self._ages = _criteria_ages(criteria)
+        self._jobs: Dict[str, _WatchedJob] = {}
+        self._deleted: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def select(self, jobs: List[JobSlimModel], now: datetime) -> List[JobSlimModel]:
+        """Forget vanished jobs and return those that changed or crossed a cutoff."""
+        listed_ids = {job.id for job in jobs}
+        for job_id in list(self._jobs):
+            if job_id not in listed_ids:
+                del self._jobs[job_id]
+        self._deleted &= listed_ids
+
+        selected: List[JobSlimModel] = []
+        for job in jobs:
+            if job.id in self._deleted or job.state == "deleting":
+                continue
+            watched = self._jobs.get(job.id)
+            if watched is None \
+                    or watched.e_tag != job.e_tag \
+                    or watched.last_modified != job.last_modified \
+                    or watched.awaiting_runs \
+                    or (watched.next_check is not None and watched.next_check <= now):
+                selected.append(job)
+        return selected
+
+    def record(self, job: JobSlimModel, can_delete: bool, now: datetime) -> None:
+        # run statuses can complete without the job changing, so jobs that are
+        # old enough for --task-run-completed stay selected until they match
+        awaiting_runs = not can_delete \
+            and self.criteria.task_run_completed is not None \
+            and ensure_utc(job.last_modified) <= now - self.criteria.task_run_completed
+        self._jobs[job.id] = _WatchedJob(
+            e_tag=job.e_tag,
+            last_modified=job.last_modified,
+            next_check=_next_crossing(job, self._ages, now),
+            awaiting_runs=awaiting_runs,
+        )
+
+    def mark_deleted(self, job_id: str) -> None:
+        self._deleted.add(job_id)
+        self._jobs.pop(job_id, None)
+
+    def forget(self, job_id: str) -> None:
+        """Re-evaluate the job on the next poll."""
+        self._jobs.pop(job_id, None)
+
+
+def run_watch(
+    list_jobs: ListJobsFn,
+    list_tasks: ListTasksFn,
+    get_tasks_run_info: GetTasksRunInfoFn,
+    delete_job: DeleteJobFn,
+    criteria: CleanupJobCriteria,
+    *,
+    interval: timedelta,
+    stop: threading.Event,
+    dry_run: bool,
+    ignore_errors: bool,
+    io: ConsoleIO,
+    clock: Clock = _utc_now,
+    list_concurrency: int = 1,
+    delete_concurrency: int = 1,
+    delete_rate: Optional[float] = None,
+    max_ticks: Optional[int] = None,
+    output: str = "tasks",
+    report: Optional[JsonlReport] = None,
+    job_filter: Optional[Callable[[datetime], JobListFilter]] = None,
+    verify_tasks: Optional[ListTasksFn] = None,
+) -> int:
+    """Poll jobs every `interval` and delete new candidates until `stop` is set.
+
+    Deletion is not confirmed interactively; callers must obtain consent up front.
+    `job_filter` builds the server-side job filter for the time of a poll; it
+    is passed to `list_jobs` as `job_filter=`, so jobs that cross an age
+    cutoff while the watch runs are listed once they can match.
+    `verify_tasks` re-lists the tasks of candidates before they are deleted,
+    as in `core.run_cleanup`.
+    """
+    watcher = JobWatcher(criteria)
+    format_lines = candidate_formatter(output)
+    ticks = 0
+    while not stop.is_set() and (max_ticks is None or ticks < max_ticks):
+        ticks += 1
+        now = clock()
+        job_list = None
+        try:
+            jobs = list_jobs(job_filter=job_filter(now)) if job_filter is not None else list_jobs()
+            selected = watcher.select(jobs, now)
+            job_list = collect_jobs(
+                lambda: selected,
+                list_tasks,
+                criteria,
+                get_tasks_run_info,
+                now,
+                list_concurrency=list_concurrency,
+                verify_tasks=verify_tasks,
+            ) if selected else []
+        except Exception as exc:
+            # a failed poll is retried on the next one instead of stopping the watch
+            logger.error("Watch poll failed: %s", exc)
+
+        if job_list is not None:
+
+            candidate_list = []
+            for item in job_list:
+                if item.error is None:
+                    watcher.record(item.job, item.decision.can_delete, now)
+                elif report is not None:
+                    # not recorded, so the job is retried and reported again next poll
+                    report.write_skipped(item.job.id, item.error)
+                if item.decision.can_delete:
+                    candidate_list.append(item)
+
+            io.print(
+                f"[{now.isoformat(timespec='seconds')}] jobs: {len(jobs)}, "
+                f"evaluated: {len(job_list)}, candidates: {len(candidate_list)}")
+            for candidate in candidate_list:
+                io.print_lines(format_lines(candidate))
+                if report is not None:
+                    report.write_candidate(candidate)
+            if report is not None:
+                # make each poll's records visible to readers of a long-running watch
+                report.flush()
+
+            if candidate_list and not dry_run:
+                summary = delete_jobs(
+                    [candidate.job.id for candidate in candidate_list],
+                    delete_job,
+                    io,
+                    concurrency=delete_concurrency,
+                    rate_limit=delete_rate,
+                    ignore_errors=ignore_errors,
+                )
+                for job_id in summary.deleted:
+                    watcher.mark_deleted(job_id)
+                for job_id in summary.failed:
+                    watcher.forget(job_id)
+                if summary.failed and not ignore_errors:
+                    return 1
+
+        if max_ticks is None or ticks < max_ticks:
+            stop.wait(interval.total_seconds())
+
+    io.print("Watch stopped.")
+    return 0
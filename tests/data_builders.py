@@ -1,6 +1,8 @@
 """Test data builders for creating JobModel and TaskModel objects."""
 
 from datetime import datetime
+from typing import List
+
 from azurebatch_cleanup.models import JobModel, TaskModel
 
 test_now = datetime.fromisoformat("2020-01-01T00:00:00+00:00")
@@ -69,3 +71,23 @@ def _task_with_workdir(task_id: str, http_url: str) -> TaskModel:
             ],
         }
     )
+
+
+class Recorder:
+    """Printer for `ConsoleIO` that keeps the printed lines."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def __call__(self, message: str) -> None:
+        self.lines.append(message)
+
+
+class FixedInput:
+    """Reader for `ConsoleIO` that answers every prompt with `value`."""
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def __call__(self, prompt: str) -> str:
+        return self.value
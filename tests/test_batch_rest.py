@@ -0,0 +1,164 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from azurebatch_cleanup import az_cli
+from azurebatch_cleanup.batch_rest import AzCliTokenProvider, BatchRestClient, BatchRestError
+from azurebatch_cleanup.models import TaskSlimModel
+
+
+def _job_item(job_id: str) -> Dict[str, Any]:
+    return {
+        "id": job_id,
+        "state": "active",
+        "creationTime": "2020-01-01T00:00:00Z",
+        "lastModified": "2020-01-01T00:00:00Z",
+        "stateTransitionTime": "2020-01-01T00:00:00Z",
+        "eTag": "0x1",
+        "url": f"https://example.test/jobs/{job_id}",
+        "poolInfo": {"poolId": "test-pool"},
+    }
+
+
+def _task_item(task_id: str) -> Dict[str, Any]:
+    return {
+        "id": task_id,
+        "state": "completed",
+        "creationTime": "2020-01-01T00:00:00Z",
+        "lastModified": "2020-01-01T00:00:00Z",
+        "stateTransitionTime": "2020-01-01T00:00:00Z",
+        "eTag": "0x1",
+        "url": f"https://example.test/tasks/{task_id}",
+        "commandLine": "echo test-task",
+    }
+
+
+class BatchStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests: List[Tuple[str, str, Dict[str, List[str]]]] = []
+    connections: Set[int] = set()
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _record(self) -> Tuple[str, Dict[str, List[str]]]:
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        self.requests.append((self.command, parts.path, query))
+        self.connections.add(self.client_address[1])
+        assert self.headers["Authorization"] == "Bearer test-token"
+        return parts.path, query
+
+    def do_GET(self) -> None:
+        path, query = self._record()
+        if path == "/jobs" and "page" not in query:
+            self._send_json(200, {
+                "value": [_job_item("job-1")],
+                "odata.nextLink": f"http://{self.headers['Host']}/jobs?api-version=x&page=2",
+            })
+        elif path == "/jobs":
+            self._send_json(200, {"value": [_job_item("job-2")]})
+        elif path == "/jobs/job-1/tasks":
+            self._send_json(200, {"value": [_task_item("task-1"), _task_item("task-2")]})
+        else:
+            self._send_json(404, {
+                "code": "JobNotFound",
+                "message": {"lang": "en-US", "value": "The specified job does not exist."},
+            })
+
+    def do_DELETE(self) -> None:
+        self._record()
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def batch_client() -> Iterator[BatchRestClient]:
+    BatchStandIn.requests = []
+    BatchStandIn.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    tokens: List[str] = []
+
+    def token_provider() -> str:
+        tokens.append("test-token")
+        return "test-token"
+
+    client = BatchRestClient(
+        token_provider,
+        endpoint=f"http://127.0.0.1:{server.server_address[1]}",
+        pool_size=1,
+    )
+    try:
+        yield client
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_batch_rest__list_jobs_follows_next_link(batch_client: BatchRestClient) -> None:
+    jobs = batch_client.list_non_complete_jobs()
+
+    assert [job.id for job in jobs] == ["job-1", "job-2"]
+    method, path, query = BatchStandIn.requests[0]
+    assert query["$filter"] == ["state ne 'completed'"]
+    assert query["api-version"] == [batch_client.api_version]
+
+
+def test_batch_rest__reuses_connection(batch_client: BatchRestClient) -> None:
+    tasks = batch_client.list_tasks("job-1")
+    batch_client.list_tasks("job-1")
+    batch_client.delete_job("job-1")
+
+    assert [task.id for task in tasks] == ["task-1", "task-2"]
+    assert [request[0] for request in BatchStandIn.requests] == ["GET", "GET", "DELETE"]
+    assert len(BatchStandIn.connections) == 1
+
+
+def test_batch_rest__error_response(batch_client: BatchRestClient) -> None:
+    with pytest.raises(BatchRestError) as error:
+        batch_client.list_tasks("missing")
+
+    assert error.value.status == 404
+    assert error.value.code == "JobNotFound"
+
+
+def test_batch_rest__token_cached_until_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: List[List[str]] = []
+    now = [1000.0]
+
+    def run_az_stub(args: List[str]) -> str:
+        calls.append(args)
+        return json.dumps({"accessToken": f"token-{len(calls)}", "expires_on": 4600})
+
+    monkeypatch.setattr(az_cli, "_run_az", run_az_stub)
+    provider = AzCliTokenProvider(clock=lambda: now[0])
+
+    assert provider() == "token-1"
+    assert provider() == "token-1"
+    now[0] = 4400.0
+    assert provider() == "token-2"
+    assert len(calls) == 2
+
+
+def test_batch_rest__projection_uses_select(batch_client: BatchRestClient) -> None:
+    tasks = batch_client.list_tasks("job-1", fields=("id", "state"))
+
+    assert [type(task) for task in tasks] == [TaskSlimModel, TaskSlimModel]
+    method, path, query = BatchStandIn.requests[0]
+    assert query["$select"] == ["id,state"]
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from typing import Dict, List
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from azurebatch_cleanup.columnar import evaluate_jobs_columnar
+from azurebatch_cleanup.criteria import CleanupJobCriteria, evaluate_job
+from azurebatch_cleanup.models import TaskModel
+from data_builders import _job, _task, _task_with_workdir, test_now
+
+
+def test_columnar__same_decisions_as_evaluate_job() -> None:
+    jobs = [
+        _job(id=f"job-{hours}-{variant}", last_modified=test_now - timedelta(hours=hours))
+        for hours in (0, 2, 5, 30)
+        for variant in range(4)
+    ]
+    tasks_by_job: Dict[str, List[TaskModel]] = {}
+    for job in jobs:
+        variant = int(job.id.rsplit("-", 1)[1])
+        tasks_by_job[job.id] = [
+            [],
+            [_task_with_workdir(f"nf-{job.id}-1", "https://s/work/1")],
+            [_task_with_workdir(f"nf-{job.id}-1", "https://s/work/1"), _task(f"nf-{job.id}-2")],
+            [_task(f"x-{job.id}-1"), _task(f"nf-{job.id}-2")],
+        ][variant]
+    task_run_completed = {
+        task.id: not task.id.endswith("-2")
+        for tasks in tasks_by_job.values() for task in tasks
+    }
+    criteria_list = [
+        CleanupJobCriteria(age=timedelta(days=1)),
+        CleanupJobCriteria(empty=timedelta(hours=1), age=timedelta(hours=4)),
+        CleanupJobCriteria(task_id_pattern="^nf-", task_age=timedelta(hours=1)),
+        CleanupJobCriteria(task_nf_workdir="work", task_age=timedelta(hours=3)),
+        CleanupJobCriteria(task_run_completed=timedelta(hours=1), empty=timedelta(0)),
+    ]
+
+    for criteria in criteria_list:
+        expected = [
+            evaluate_job(job, tasks_by_job[job.id], criteria, test_now, task_run_completed)
+            for job in jobs
+        ]
+        actual = evaluate_jobs_columnar(jobs, tasks_by_job, criteria, test_now, task_run_completed)
+        assert actual == expected
+        assert any(decision.can_delete for decision in actual)
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+import pytest
+
+from azurebatch_cleanup import cp_api, metrics
+from azurebatch_cleanup.batch_rest import BatchRestError
+from azurebatch_cleanup.concurrency import AdaptiveLimiter, describe_limits
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _succeed(limiter: AdaptiveLimiter, clock: FakeClock, latency: float = 1.0) -> None:
+    with limiter.slot():
+        clock.now += latency
+
+
+def _throttle(limiter: AdaptiveLimiter, clock: FakeClock) -> None:
+    with pytest.raises(BatchRestError):
+        with limiter.slot():
+            clock.now += 1.0
+            raise BatchRestError(429, "TooManyRequests", "slow down")
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    metrics.REGISTRY.reset()
+    yield
+    metrics.REGISTRY.reset()
+
+
+def test_limiter__grows_by_one_per_window_of_successes() -> None:
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("batch", 4, initial=2, clock=clock)
+
+    for _ in range(2):
+        _succeed(limiter, clock)
+    assert limiter.limit == 3
+    for _ in range(3):
+        _succeed(limiter, clock)
+    assert limiter.limit == 4
+    for _ in range(8):
+        _succeed(limiter, clock)
+    assert limiter.limit == 4
+    assert metrics.REGISTRY.snapshot()["gauges"]["concurrency_limit"] == {"batch": 4}
+
+
+def test_limiter__halves_once_per_throttling_episode() -> None:
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("batch", 16, initial=16, clock=clock)
+
+    started = [limiter.acquire() for _ in range(3)]
+    clock.now += 1.0
+    for start in started:
+        limiter.release(start, BatchRestError(503, "ServerBusy", "busy"))
+
+    # the calls were in flight together, so they count as one signal
+    assert limiter.limit == 8
+    _throttle(limiter, clock)
+    assert limiter.limit == 4
+    assert limiter.decreases == 2
+    assert limiter.in_flight == 0
+
+
+def test_limiter__ignores_permanent_errors() -> None:
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("batch", 8, initial=8, clock=clock)
+
+    with pytest.raises(BatchRestError):
+        with limiter.slot():
+            raise BatchRestError(404, "JobNotFound", "gone")
+
+    assert limiter.limit == 8
+
+
+def test_limiter__halves_on_latency_spike_after_warmup() -> None:
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("batch", 8, initial=8, warmup=5, clock=clock)
+
+    for _ in range(5):
+        _succeed(limiter, clock, latency=1.0)
+    _succeed(limiter, clock, latency=2.5)
+    assert limiter.limit == 8
+    _succeed(limiter, clock, latency=10.0)
+    assert limiter.limit == 4
+
+
+def test_limiter__without_latency_tolerance_ignores_mixed_call_sizes() -> None:
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("list_tasks", 8, initial=4, warmup=5, latency_tolerance=None, clock=clock)
+
+    # small jobs list in one page, large ones take many
+    for latency in [1.0] * 5 + [40.0, 1.0, 1.0, 120.0]:
+        _succeed(limiter, clock, latency=latency)
+
+    assert limiter.decreases == 0
+    assert limiter.limit == 6
+    _throttle(limiter, clock)
+    assert limiter.limit == 3
+
+
+def test_limiter__bounds_calls_in_flight() -> None:
+    limiter = AdaptiveLimiter("batch", 2, initial=2)
+    lock = threading.Lock()
+    running: List[int] = []
+    peak = [0]
+
+    @limiter.wrap
+    def call() -> None:
+        with lock:
+            running.append(1)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.01)
+        with lock:
+            running.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+
+
+def test_limiter__async_slots_wait_for_release() -> None:
+    limiter = AdaptiveLimiter("batch", 1)
+    order: List[str] = []
+
+    async def call(name: str) -> None:
+        async with limiter.slot_async():
+            order.append(f"start {name}")
+            await asyncio.sleep(0)
+            order.append(f"end {name}")
+
+    async def run() -> None:
+        await asyncio.gather(call("a"), call("b"))
+
+    asyncio.run(run())
+
+    assert order == ["start a", "end a", "start b", "end b"]
+
+
+def test_get_tasks_run_info__throttled_requests_lower_cp_api_limit(monkeypatch) -> None:
+    calls: List[int] = []
+
+    def get_run_info_stub(keys_list, engine_type, **kwargs):
+        calls.append(len(keys_list))
+        raise BatchRestError(429, "TooManyRequests", "slow down")
+
+    monkeypatch.setattr(cp_api, "get_run_info_by_engine_task_keys", get_run_info_stub)
+    limiter = AdaptiveLimiter("cp_api", 4, initial=4)
+
+    with pytest.raises(BatchRestError):
+        cp_api.get_tasks_run_info(["aa/000000"], limiter=limiter)
+
+    assert calls == [1]
+    assert limiter.limit == 2
+    assert "cp_api=2" in describe_limits()
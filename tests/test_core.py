@@ -1,27 +1,12 @@
+import json
 from datetime import datetime, timedelta
 from typing import Iterable, List, Optional
 
 from azurebatch_cleanup import cp_api
-from azurebatch_cleanup.core import run_cleanup
+from azurebatch_cleanup.core import JsonlReport, collect_jobs, delete_jobs, run_cleanup
 from azurebatch_cleanup.io import ConsoleIO
 from azurebatch_cleanup.criteria import CleanupJobCriteria
-from data_builders import _job, _task, test_now
-
-
-class Recorder:
-    def __init__(self) -> None:
-        self.lines: List[str] = []
-
-    def __call__(self, message: str) -> None:
-        self.lines.append(message)
-
-
-class FixedInput:
-    def __init__(self, value: str) -> None:
-        self.value = value
-
-    def __call__(self, prompt: str) -> str:
-        return self.value
+from data_builders import FixedInput, Recorder, _job, _task, test_now
 
 
 def test_core__dry_run_only_prints() -> None:
@@ -102,3 +87,144 @@ def test_core__confirm_and_delete() -> None:
 
     assert code == 0
     assert deleted == [job.id]
+
+
+def test_core__collect_jobs_concurrent_keeps_order_and_failures() -> None:
+    jobs = [
+        _job(id=f"job-{index}", last_modified=test_now - timedelta(hours=1))
+        for index in range(8)
+    ]
+
+    def list_jobs():
+        return jobs
+
+    def list_tasks(job_id: str):
+        if job_id == "job-3":
+            raise RuntimeError("az command failed")
+        return []
+
+    def get_tasks_run_info(task_id_list: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    result = collect_jobs(
+        list_jobs,
+        list_tasks,
+        CleanupJobCriteria(empty=timedelta(minutes=10)),
+        get_tasks_run_info,
+        test_now,
+        list_concurrency=4,
+    )
+
+    assert [item.job.id for item in result] == [job.id for job in jobs]
+    failed = result[3]
+    assert failed.error == "az command failed"
+    assert failed.decision.can_delete is False
+    assert all(item.decision.can_delete for item in result if item is not failed)
+
+
+def test_core__delete_jobs_stops_dispatch_on_first_failure() -> None:
+    attempted: List[str] = []
+
+    def delete_job(job_id: str) -> None:
+        attempted.append(job_id)
+        if job_id == "job-1":
+            raise RuntimeError("delete failed")
+
+    io = ConsoleIO(printer=Recorder(), reader=FixedInput("no"))
+    summary = delete_jobs(
+        ["job-0", "job-1", "job-2", "job-3"],
+        delete_job,
+        io,
+        concurrency=1,
+    )
+
+    assert attempted == ["job-0", "job-1"]
+    assert summary.deleted == ["job-0"]
+    assert summary.failed == ["job-1"]
+
+
+def test_core__delete_jobs_ignore_errors_parallel() -> None:
+    def delete_job(job_id: str) -> None:
+        if job_id == "job-1":
+            raise RuntimeError("delete failed")
+
+    io = ConsoleIO(printer=Recorder(), reader=FixedInput("no"))
+    job_ids = [f"job-{index}" for index in range(10)]
+    summary = delete_jobs(
+        job_ids,
+        delete_job,
+        io,
+        concurrency=4,
+        rate_limit=1000.0,
+        ignore_errors=True,
+    )
+
+    assert sorted(summary.deleted) == sorted(set(job_ids) - {"job-1"})
+    assert summary.failed == ["job-1"]
+
+
+def test_core__collect_jobs_skips_task_listing_for_recent_jobs() -> None:
+    old_job = _job(id="job-old", last_modified=test_now - timedelta(hours=3))
+    recent_job = _job(id="job-recent", last_modified=test_now - timedelta(minutes=30))
+    listed: List[str] = []
+
+    def list_tasks(job_id: str):
+        listed.append(job_id)
+        return [_task("nf-1")]
+
+    def get_tasks_run_info(task_id_list: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    criteria = CleanupJobCriteria(
+        empty=timedelta(hours=1),
+        task_id_pattern="^nf-",
+        task_age=timedelta(hours=2),
+    )
+    result = collect_jobs(
+        lambda: [old_job, recent_job],
+        list_tasks,
+        criteria,
+        get_tasks_run_info,
+        test_now,
+    )
+
+    assert listed == ["job-old"]
+    assert [item.decision.reasons for item in result] == [["task"], []]
+
+
+def test_core__summary_output_and_jsonl_report(tmp_path) -> None:
+    job = _job()
+    tasks = [_task(f"task-{index}") for index in range(3)]
+    tasks.append(tasks[0].model_copy(update={"id": "task-done", "state": "completed"}))
+
+    def get_tasks_run_info(task_id_list: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        return cp_api.CpApiTaskRunInfoResponse({})
+
+    printer = Recorder()
+    report_path = tmp_path / "plan.jsonl"
+
+    with JsonlReport(str(report_path)) as report:
+        code = run_cleanup(
+            lambda: [job],
+            lambda job_id: tasks,
+            get_tasks_run_info,
+            lambda job_id: None,
+            CleanupJobCriteria(age=timedelta(minutes=10)),
+            dry_run=True,
+            assume_yes=False,
+            ignore_errors=False,
+            io=ConsoleIO(printer=printer, reader=FixedInput("no")),
+            now=test_now + timedelta(days=1),
+            output="summary",
+            report=report,
+        )
+
+    assert code == 0
+    assert "  tasks: 4 (active: 3, completed: 1)" in printer.lines
+    assert not any("task_id:" in line for line in printer.lines)
+    records = [json.loads(line) for line in report_path.read_text(encoding="utf-8").splitlines()]
+    assert len(records) == 1
+    assert records[0]["type"] == "candidate"
+    assert records[0]["job_id"] == job.id
+    assert records[0]["tasks"] == 4
+    assert records[0]["task_states"] == {"active": 3, "completed": 1}
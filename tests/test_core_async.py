@@ -0,0 +1,141 @@
+import asyncio
+from datetime import timedelta
+from typing import Iterable, List
+
+from azurebatch_cleanup import cp_api
+from azurebatch_cleanup.core import collect_jobs
+from azurebatch_cleanup.core_async import collect_jobs_async, delete_jobs_async, run_cleanup_async
+from azurebatch_cleanup.criteria import CleanupJobCriteria
+from azurebatch_cleanup.io import ConsoleIO
+from azurebatch_cleanup.models import JobModel
+from data_builders import Recorder, _job, _task, test_now
+
+
+def _jobs() -> List[JobModel]:
+    old = test_now - timedelta(hours=5)
+    return [
+        _job(id="job-empty", last_modified=old),
+        _job(id="job-done", last_modified=old),
+        _job(id="job-running", last_modified=old),
+        _job(id="job-broken", last_modified=old),
+        _job(id="job-young", last_modified=test_now - timedelta(minutes=5)),
+    ]
+
+
+_TASKS = {
+    "job-empty": [],
+    "job-done": [_task("nf-ab123abc-1")],
+    "job-running": [_task("nf-cd456cde-1")],
+}
+
+
+def _list_tasks(job_id: str):
+    if job_id == "job-broken":
+        raise RuntimeError("listing failed")
+    return _TASKS[job_id]
+
+
+def _get_tasks_run_info(keys: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+    return cp_api.CpApiTaskRunInfoResponse(status="OK", payload=[
+        cp_api.CpApiRunItem(run=cp_api.CpApiRunInfo(status="SUCCESS"), engine_task_keys=["ab/123abc"]),
+        cp_api.CpApiRunItem(run=cp_api.CpApiRunInfo(status="RUNNING"), engine_task_keys=["cd/456cde"]),
+    ])
+
+
+_CRITERIA = CleanupJobCriteria(empty=timedelta(hours=1), task_run_completed=timedelta(hours=1))
+
+
+async def _list_jobs_async():
+    return _jobs()
+
+
+async def _list_tasks_async(job_id: str):
+    await asyncio.sleep(0)
+    return _list_tasks(job_id)
+
+
+async def _get_tasks_run_info_async(keys: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+    return _get_tasks_run_info(keys)
+
+
+def test_collect_jobs_async__matches_threaded_collect_jobs() -> None:
+    expected = collect_jobs(_jobs, _list_tasks, _CRITERIA, _get_tasks_run_info, test_now)
+
+    result = asyncio.run(collect_jobs_async(
+        _list_jobs_async,
+        _list_tasks_async,
+        _CRITERIA,
+        _get_tasks_run_info_async,
+        test_now,
+        list_concurrency=8,
+    ))
+
+    assert [(item.job.id, item.decision, item.error) for item in result] == \
+        [(item.job.id, item.decision, item.error) for item in expected]
+    assert [item.job.id for item in result if item.decision.can_delete] == ["job-empty", "job-done"]
+
+
+def test_run_cleanup_async__deletes_candidates() -> None:
+    deleted: List[str] = []
+    printer = Recorder()
+
+    async def delete_job(job_id: str) -> None:
+        deleted.append(job_id)
+
+    code = asyncio.run(run_cleanup_async(
+        _list_jobs_async,
+        _list_tasks_async,
+        _get_tasks_run_info_async,
+        delete_job,
+        _CRITERIA,
+        dry_run=False,
+        assume_yes=True,
+        ignore_errors=False,
+        io=ConsoleIO(printer=printer),
+        now=test_now,
+        delete_concurrency=4,
+    ))
+
+    assert code == 0
+    assert sorted(deleted) == ["job-done", "job-empty"]
+    assert "Jobs for deletion: 2/5" in printer.lines
+    assert "Deleted jobs: 2, failed: 0" in printer.lines
+
+
+def test_delete_jobs_async__stops_after_first_failure() -> None:
+    attempted: List[str] = []
+
+    async def delete_job(job_id: str) -> None:
+        attempted.append(job_id)
+        await asyncio.sleep(0)
+        if job_id == "job-1":
+            raise RuntimeError("boom")
+
+    summary = asyncio.run(delete_jobs_async(
+        ["job-1", "job-2", "job-3"], delete_job, ConsoleIO(printer=Recorder())))
+
+    assert attempted == ["job-1"]
+    assert summary.failed == ["job-1"]
+    assert summary.deleted == []
+
+
+def test_delete_jobs_async__bounds_in_flight_deletions() -> None:
+    in_flight = 0
+    peak = 0
+
+    async def delete_job(job_id: str) -> None:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    summary = asyncio.run(delete_jobs_async(
+        [f"job-{index}" for index in range(20)],
+        delete_job,
+        ConsoleIO(printer=Recorder()),
+        concurrency=5,
+    ))
+
+    assert len(summary.deleted) == 20
+    assert peak == 5
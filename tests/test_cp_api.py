@@ -1,8 +1,14 @@
+import gzip
+import io
 import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, Iterator, List, Set, Tuple
 
-from azurebatch_cleanup import cp_api, core
+import pytest
+
+from azurebatch_cleanup import core, cp_api, keymap, metrics
 
 
 def _load_task_run_info(task_keys: List[str]) -> cp_api.CpApiTaskRunInfoResponse:
@@ -31,7 +37,7 @@ def test__get_run_completed() -> None:
 
     result = core.get_run_completed(
         task_id_list,
-        cp_api.id2key_azur_to_nextflow,
+        keymap.get_mapper("NEXTFLOW"),
         get_tasks_run_info_stub,
     )
 
@@ -39,3 +45,191 @@ def test__get_run_completed() -> None:
     assert result == {
         task_id_list[0]: True,
     }
+
+
+def test__get_run_completed_dedupes_shared_keys() -> None:
+    task_id_list = [
+        "nf-ab123abc0123456789abcdef",
+        "nf-ab123abc0123456789abcdef-retry1",
+        "nf-cd456cde0123456789abcdef",
+        "nf-ab123abc0123456789abcdef-retry2",
+    ]
+    captured_keys: List[str] = []
+
+    def get_tasks_run_info_stub(keys: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        captured_keys.extend(keys)
+        return _load_task_run_info(["ab/123abc"])
+
+    result = core.get_run_completed(
+        task_id_list,
+        keymap.get_mapper("NEXTFLOW"),
+        get_tasks_run_info_stub,
+    )
+
+    assert captured_keys == ["ab/123abc", "cd/456cde"]
+    assert result == {
+        task_id_list[0]: True,
+        task_id_list[1]: True,
+        task_id_list[3]: True,
+    }
+
+
+class _SmallReads:
+    def __init__(self, text: str) -> None:
+        self.stream = io.StringIO(text)
+
+    def read(self, size: int = -1) -> str:
+        return self.stream.read(3)
+
+
+def test__parse_task_run_info_stream_matches_parse_task_run_info() -> None:
+    run_info = {
+        "status": "OK",
+        "payload": [
+            {"run": {"status": "SUCCESS", "id": 1}, "engineTaskKeys": ["ab/123abc", "cd/456cde"]},
+            {"engineTaskKeys": ["ef/789efa"], "extra": [1, {"x": None}], "run": {"status": "RUNNING"}},
+            {"run": {"status": "STOPPED"}},
+        ],
+        "errorMessage": None,
+    }
+
+    parsed = cp_api.parse_task_run_info_stream(_SmallReads(json.dumps(run_info, indent=2)))
+
+    assert parsed == cp_api.parse_task_run_info(run_info)
+    with pytest.raises(ValueError, match="status"):
+        cp_api.parse_task_run_info_stream(io.StringIO('{"payload": []}'))
+
+
+class _GzipResponse:
+    def __init__(self, body: bytes, read_size: int) -> None:
+        self.stream = io.BytesIO(gzip.compress(body))
+        self.read_size = read_size
+
+    def getheader(self, name: str) -> str:
+        return "gzip" if name == "Content-Encoding" else ""
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(self.read_size)
+
+
+@pytest.mark.parametrize("read_size", [8, 16])
+def test__response_text_reader_reads_gzip_body_in_small_reads(read_size: int) -> None:
+    run_info = {
+        "status": "OK",
+        "payload": [{"run": {"status": "SUCCESS"}, "engineTaskKeys": [f"{index:02x}/000000"]} for index in range(50)],
+    }
+    response = _GzipResponse(json.dumps(run_info).encode("utf-8"), read_size)
+
+    parsed = cp_api.parse_task_run_info_stream(cp_api._ResponseTextReader(response, metrics.Call()))
+
+    assert parsed == cp_api.parse_task_run_info(run_info)
+
+
+def test__get_tasks_run_info_chunks_and_retries_failed_chunks(monkeypatch) -> None:
+    keys = [f"{index:02x}/000000" for index in range(10)]
+    requests: List[List[str]] = []
+
+    def get_run_info_stub(keys_list, engine_type, **kwargs):
+        requests.append(list(keys_list))
+        if keys_list[0] == keys[4] and requests.count(list(keys_list)) == 1:
+            raise TimeoutError("timed out")
+        return {
+            "status": "OK",
+            "payload": [{"run": {"status": "SUCCESS"}, "engineTaskKeys": list(keys_list)}],
+        }
+
+    monkeypatch.setattr(cp_api, "get_run_info_by_engine_task_keys", get_run_info_stub)
+
+    response = cp_api.get_tasks_run_info(
+        keys, chunk_size=4, concurrency=3, max_retries=1)
+
+    assert [item.engine_task_keys for item in response.payload] == [
+        keys[0:4], keys[4:8], keys[8:10]]
+    assert response.status == "OK"
+    assert len(requests) == 4
+    assert requests.count(keys[4:8]) == 2
+
+
+def test__get_tasks_run_info_fails_after_retries(monkeypatch) -> None:
+    def get_run_info_stub(keys_list, engine_type, **kwargs):
+        raise TimeoutError("timed out")
+
+    monkeypatch.setattr(cp_api, "get_run_info_by_engine_task_keys", get_run_info_stub)
+
+    with pytest.raises(RuntimeError, match="2/2 chunks"):
+        cp_api.get_tasks_run_info(["aa/000000", "bb/000000"], chunk_size=1, max_retries=1)
+
+
+@pytest.fixture
+def cp_api_stand_in() -> Iterator[Tuple[List[List[str]], Set[int], str]]:
+    requests: List[List[str]] = []
+    client_ports: Set[int] = set()
+
+    class CpApiStandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            assert self.path == "/api/run/engine/NEXTFLOW/tasks/runInfo"
+            assert self.headers["Authorization"] == "Bearer test-token"
+            client_ports.add(self.client_address[1])
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            keys = json.loads(body)["engineTaskKeys"]
+            requests.append(keys)
+            if keys == ["busy/000000"]:
+                self.send_response(429)
+                self.send_header("Retry-After", "3")
+                self.send_header("Content-Length", "4")
+                self.end_headers()
+                self.wfile.write(b"busy")
+                return
+            data = json.dumps({
+                "status": "OK",
+                "payload": [{"run": {"status": "SUCCESS"}, "engineTaskKeys": keys}],
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                data = gzip.compress(data)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CpApiStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield requests, client_ports, f"http://127.0.0.1:{server.server_address[1]}/api"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_client__reuses_connection_and_decodes_gzip(cp_api_stand_in) -> None:
+    requests, client_ports, base_url = cp_api_stand_in
+    keys = [f"{index:02x}/000000" for index in range(300)]
+
+    with cp_api.CpApiClient(
+            cp_api.CpApiConfig(base_url=base_url + "/", token="test-token"),
+            gzip_requests=True) as client:
+        response = client.get_tasks_run_info(keys, chunk_size=100)
+
+    assert [key for item in response.payload for key in item.engine_task_keys] == keys
+    assert requests == [keys[0:100], keys[100:200], keys[200:300]]
+    assert len(client_ports) == 1
+
+
+def test_client__raises_http_errors_with_retry_after(cp_api_stand_in) -> None:
+    _, _, base_url = cp_api_stand_in
+
+    with cp_api.CpApiClient(cp_api.CpApiConfig(base_url=base_url + "/", token="test-token")) as client:
+        with pytest.raises(cp_api.CpApiHttpError, match="HTTP 429") as error:
+            client.fetch_task_run_info(["busy/000000"], "NEXTFLOW")
+
+    assert error.value.status == 429
+    assert error.value.retry_after == 3.0
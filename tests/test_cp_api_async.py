@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+from azurebatch_cleanup import cp_api_async
+
+
+@pytest.fixture
+def cp_api_stand_in() -> Iterator[List[List[str]]]:
+    requests: List[List[str]] = []
+
+    class CpApiStandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            assert self.path == "/api/run/engine/NEXTFLOW/tasks/runInfo"
+            assert self.headers["Authorization"] == "Bearer test-token"
+            keys = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["engineTaskKeys"]
+            requests.append(keys)
+            if keys == ["bad/000000"]:
+                self.send_response(500)
+                self.send_header("Content-Length", "4")
+                self.end_headers()
+                self.wfile.write(b"boom")
+                return
+            body = json.dumps({
+                "status": "OK",
+                "payload": [{"run": {"status": "SUCCESS"}, "engineTaskKeys": keys}],
+            }).encode("utf-8")
+            # chunked, to exercise the transfer-encoding decoder
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(body), 16):
+                chunk = body[start:start + 16]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CpApiStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield requests, f"http://127.0.0.1:{server.server_address[1]}/api"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_get_tasks_run_info__fetches_chunks_concurrently(cp_api_stand_in) -> None:
+    requests, base_url = cp_api_stand_in
+    keys = [f"{index:02x}/000000" for index in range(7)]
+
+    response = asyncio.run(cp_api_async.get_tasks_run_info(
+        keys,
+        base_url=base_url,
+        token="test-token",
+        chunk_size=3,
+        concurrency=2,
+    ))
+
+    assert sorted(requests) == [keys[0:3], keys[3:6], keys[6:7]]
+    assert response.status == "OK"
+    assert [key for item in response.payload for key in item.engine_task_keys] == keys
+
+
+def test_get_run_info_by_engine_task_keys__raises_on_http_error(cp_api_stand_in) -> None:
+    _, base_url = cp_api_stand_in
+
+    with pytest.raises(cp_api_async.CpApiHttpError) as error:
+        asyncio.run(cp_api_async.get_run_info_by_engine_task_keys(
+            ["bad/000000"], "NEXTFLOW", base_url=base_url, token="test-token"))
+
+    assert error.value.status == 500
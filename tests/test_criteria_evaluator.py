@@ -0,0 +1,45 @@
+from datetime import timedelta
+from typing import Iterator
+
+from azurebatch_cleanup.criteria import CleanupJobCriteria, CriteriaEvaluator, evaluate_job
+from azurebatch_cleanup.models import TaskModel
+from data_builders import _job, _task, test_now
+
+
+def test_evaluator__reused_across_jobs_matches_evaluate_job() -> None:
+    criteria = CleanupJobCriteria(
+        age=timedelta(days=7),
+        empty=timedelta(hours=1),
+        task_id_pattern="^nf-",
+        task_age=timedelta(hours=2),
+    )
+    evaluator = CriteriaEvaluator(criteria, test_now)
+    cases = [
+        (_job(last_modified=test_now - timedelta(days=8)), []),
+        (_job(last_modified=test_now - timedelta(hours=3)), []),
+        (_job(last_modified=test_now - timedelta(hours=3)), [_task("nf-1"), _task("nf-2")]),
+        (_job(last_modified=test_now - timedelta(hours=3)), [_task("nf-1"), _task("x-2")]),
+        (_job(last_modified=test_now - timedelta(minutes=5)), [_task("nf-1")]),
+    ]
+
+    for job, tasks in cases:
+        assert evaluator.evaluate(job, tasks) == evaluate_job(job, tasks, criteria, test_now)
+    assert [evaluator.evaluate(job, tasks).reasons for job, tasks in cases] == [
+        ["age", "empty"], ["empty"], ["task"], [], [],
+    ]
+
+
+def test_evaluator__stops_at_first_failing_task() -> None:
+    criteria = CleanupJobCriteria(task_id_pattern="^nf-", task_age=timedelta(hours=1))
+    consumed = []
+
+    def tasks() -> Iterator[TaskModel]:
+        for task_id in ["nf-1", "x-2", "nf-3", "nf-4"]:
+            consumed.append(task_id)
+            yield _task(task_id)
+
+    decision = CriteriaEvaluator(criteria, test_now).evaluate(
+        _job(last_modified=test_now - timedelta(days=1)), tasks())
+
+    assert decision.can_delete is False
+    assert consumed == ["nf-1", "x-2"]
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from azurebatch_cleanup import az_cli
+from azurebatch_cleanup.criteria import CleanupJobCriteria, projection_for
+from azurebatch_cleanup.models import TaskSlimModel
+
+
+def test_projection__resource_files_only_for_nf_workdir() -> None:
+    plain = projection_for(CleanupJobCriteria(
+        age=timedelta(days=1), task_id_pattern="^nf-", task_age=timedelta(days=1)))
+    workdir = projection_for(CleanupJobCriteria(
+        task_nf_workdir="work", task_age=timedelta(days=1)))
+
+    assert "resourceFiles" not in plain.task_fields
+    assert "resourceFiles" in workdir.task_fields
+    assert "lastModified" in plain.job_fields
+
+
+def test_projection__az_args() -> None:
+    args = az_cli._projection_args(("id", "state"))
+
+    assert args == [
+        "--select", "id,state",
+        "--query", "[].{id:id, state:state}",
+    ]
+    assert az_cli._projection_args(None) == []
+
+
+def test_projection__slim_task_accepts_projected_payload() -> None:
+    task = TaskSlimModel.from_az({
+        "id": "nf-ab123abc",
+        "state": "completed",
+        "lastModified": None,
+        "eTag": None,
+        "resourceFiles": [{"filePath": ".command.run", "httpUrl": "https://x/work"}],
+    })
+
+    assert task.resource_files is not None
+    assert task.resource_files[0].http_url == "https://x/work"
+
+
+def test_projection__job_list_relies_on_server_side_filter() -> None:
+    args = az_cli.list_jobs_args(None)
+
+    assert args[args.index("--filter") + 1] == "state ne 'completed'"
+    assert "--query" not in args
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List
+
+from azurebatch_cleanup import cp_api
+from azurebatch_cleanup.core import collect_jobs
+from azurebatch_cleanup.criteria import CleanupJobCriteria
+from azurebatch_cleanup.inventory import InventoryLister, InventoryStore
+from azurebatch_cleanup.models import JobModel, TaskModel
+from data_builders import _job, _task, _task_with_workdir, test_now
+
+
+def _job_with_etag(job_id: str, e_tag: str) -> JobModel:
+    job = _job(id=job_id, last_modified=test_now - timedelta(days=1))
+    return job.model_copy(update={"e_tag": e_tag})
+
+
+class FakeBatch:
+    def __init__(self) -> None:
+        self.jobs: List[JobModel] = []
+        self.tasks: Dict[str, List[TaskModel]] = {}
+        self.task_calls: List[str] = []
+
+    def list_jobs(self) -> List[JobModel]:
+        return list(self.jobs)
+
+    def list_tasks(self, job_id: str) -> List[TaskModel]:
+        self.task_calls.append(job_id)
+        return list(self.tasks.get(job_id, []))
+
+
+def test_inventory__relists_only_changed_jobs(tmp_path: Path) -> None:
+    batch = FakeBatch()
+    batch.jobs = [_job_with_etag("job-1", "0x1"), _job_with_etag("job-2", "0x1")]
+    batch.tasks = {
+        "job-1": [_task_with_workdir("nf-1", "https://s/work")],
+        "job-2": [_task("nf-2")],
+    }
+    store = InventoryStore(tmp_path / "inventory.sqlite3")
+
+    first = InventoryLister(store, batch.list_jobs, batch.list_tasks)
+    for job in first.list_jobs():
+        first.list_tasks(job.id)
+
+    batch.jobs = [_job_with_etag("job-1", "0x1"), _job_with_etag("job-2", "0x2")]
+    second = InventoryLister(store, batch.list_jobs, batch.list_tasks)
+    listed = {job.id: second.list_tasks(job.id) for job in second.list_jobs()}
+
+    assert batch.task_calls == ["job-1", "job-2", "job-2"]
+    assert (second.reused, second.listed) == (1, 1)
+    reused_task = listed["job-1"][0]
+    assert reused_task.id == "nf-1"
+    assert reused_task.resource_files is not None
+    assert reused_task.resource_files[0].http_url == "https://s/work"
+
+    batch.jobs = [_job_with_etag("job-2", "0x2")]
+    InventoryLister(store, batch.list_jobs, batch.list_tasks).list_jobs()
+    assert store.get("job-1") is None
+    store.close()
+
+
+def test_inventory__candidates_from_store_are_verified(tmp_path: Path) -> None:
+    batch = FakeBatch()
+    batch.jobs = [_job_with_etag("job-1", "0x1")]
+    store = InventoryStore(tmp_path / "inventory.sqlite3")
+    InventoryLister(store, batch.list_jobs, batch.list_tasks).list_jobs()
+    store.put("job-1", "0x1", [], refreshed_at=0)
+
+    # tasks were added without changing the job eTag
+    batch.tasks = {"job-1": [_task("nf-1")]}
+    lister = InventoryLister(store, batch.list_jobs, batch.list_tasks)
+
+    def get_tasks_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    result = collect_jobs(
+        lister.list_jobs,
+        lister.list_tasks,
+        CleanupJobCriteria(empty=timedelta(hours=1)),
+        get_tasks_run_info,
+        test_now,
+        verify_tasks=lister.verify_tasks,
+    )
+
+    assert batch.task_calls == ["job-1"]
+    assert result[0].decision.can_delete is False
+    assert [task.id for task in result[0].tasks] == ["nf-1"]
+    store.close()
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from azurebatch_cleanup.criteria import CleanupJobCriteria
+from azurebatch_cleanup.job_filter import JobListFilter, job_list_filter
+from data_builders import test_now
+
+
+def test_job_list_filter__default_lists_non_completed_jobs() -> None:
+    assert JobListFilter().odata() == "state ne 'completed'"
+
+
+def test_job_list_filter__uses_loosest_cutoff_and_pool() -> None:
+    criteria = CleanupJobCriteria(
+        age=timedelta(days=30),
+        empty=timedelta(hours=1),
+    )
+
+    job_filter = job_list_filter(criteria, test_now, pool_id="pool'1")
+
+    assert job_filter.modified_before == test_now - timedelta(hours=1)
+    assert job_filter.odata() == (
+        "state ne 'completed'"
+        " and creationTime le DateTime'2019-12-31T23:00:00.000000Z'"
+        " and stateTransitionTime le DateTime'2019-12-31T23:00:00.000000Z'"
+        " and executionInfo/poolId eq 'pool''1'"
+    )
@@ -0,0 +1,163 @@
+import asyncio
+import io
+import json
+import sys
+
+import pytest
+
+from azurebatch_cleanup import az_cli, az_cli_async
+from azurebatch_cleanup.jsonstream import JsonStreamReader, iter_json_array
+
+
+def test_jsonstream__yields_items_across_chunk_boundaries() -> None:
+    items = [
+        {"id": f"task-{index}", "exitCode": index * 1000, "nested": {"values": [1.5, None, True]}}
+        for index in range(50)
+    ]
+    text = json.dumps(items, indent=2)
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size=7)) == items
+
+
+def test_jsonstream__numbers_split_by_chunk() -> None:
+    assert list(iter_json_array(io.StringIO("[12345, 678]"), chunk_size=3)) == [12345, 678]
+
+
+def test_jsonstream__empty_input() -> None:
+    assert list(iter_json_array(io.StringIO(""))) == []
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+
+def test_jsonstream__truncated_input() -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"id": 1}, {"id"'), chunk_size=4))
+
+
+_SPLIT_NUMBER_DOCUMENTS = [
+    "[1.5]",
+    "[-2.5e10]",
+    "[null, 0.0001]",
+    "[12345, -0.5E-3, 7e+2, 0]",
+    '[{"took": 12.5, "ids": [1, 2.25]}, 3.0]',
+]
+
+
+@pytest.mark.parametrize("document", _SPLIT_NUMBER_DOCUMENTS)
+def test_jsonstream__numbers_split_at_any_chunk_size(document: str) -> None:
+    expected = json.loads(document)
+
+    for chunk_size in range(1, len(document) + 1):
+        assert list(iter_json_array(io.StringIO(document), chunk_size=chunk_size)) == expected
+
+        reader = JsonStreamReader()
+        pushed = []
+        for start in range(0, len(document), chunk_size):
+            reader.feed(document[start:start + chunk_size])
+            pushed.extend(reader.pending_elements())
+        reader.feed_eof()
+        pushed.extend(reader.pending_elements())
+        assert pushed == expected
+
+
+def test_jsonstream__string_arrays_with_escapes_and_mixed_values() -> None:
+    items = ["ab/123abc", 'quote "x"', "tab\tnew\nline", "", 5, None, "ünï"]
+    text = json.dumps(items, indent=1)
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size=3)) == items
+
+
+def test_jsonstream__navigates_objects_member_by_member() -> None:
+    text = json.dumps({"status": "OK", "payload": [{"keys": ["a", "b"]}, {"keys": []}], "extra": {"x": 1}})
+    reader = JsonStreamReader(io.StringIO(text), chunk_size=5)
+    seen = []
+
+    for name in reader.iter_object():
+        if name == "payload":
+            for _ in reader.iter_elements():
+                for member in reader.iter_object():
+                    seen.append((member, list(reader.iter_array())))
+        else:
+            seen.append((name, reader.decode_value()))
+
+    assert seen == [("status", "OK"), ("keys", ["a", "b"]), ("keys", []), ("extra", {"x": 1})]
+    assert reader.peek() == ""
+
+
+def test_jsonstream__push_mode_yields_completed_elements() -> None:
+    items = [{"id": f"task-{index}", "n": index * 1000} for index in range(20)] + ["ünï", 12345]
+    text = json.dumps(items)
+    reader = JsonStreamReader()
+    seen = []
+
+    for start in range(0, len(text), 7):
+        reader.feed(text[start:start + 7])
+        seen.extend(reader.pending_elements())
+    reader.feed_eof()
+    seen.extend(reader.pending_elements())
+
+    assert seen == items
+
+
+def test_jsonstream__push_mode_waits_for_split_numbers() -> None:
+    reader = JsonStreamReader()
+
+    reader.feed("[123")
+    assert list(reader.pending_elements()) == []
+    reader.feed("45, 6")
+    assert list(reader.pending_elements()) == [12345]
+    reader.feed("]")
+    assert list(reader.pending_elements()) == [6]
+
+
+def test_jsonstream__push_mode_empty_and_truncated_input() -> None:
+    empty = JsonStreamReader()
+    empty.feed_eof()
+    assert list(empty.pending_elements()) == []
+
+    truncated = JsonStreamReader()
+    truncated.feed('[{"id": 1}, {"id"')
+    assert list(truncated.pending_elements()) == [{"id": 1}]
+    truncated.feed_eof()
+    with pytest.raises(ValueError):
+        list(truncated.pending_elements())
+
+
+def test_az_cli_async__stream_az_reads_subprocess_output() -> None:
+    script = "import json; print(json.dumps([{'id': i, 'name': 'ü' * 40000} for i in range(3)]))"
+
+    async def collect():
+        return [item["id"] async for item in az_cli_async._stream_az([sys.executable, "-c", script])]
+
+    assert asyncio.run(collect()) == [0, 1, 2]
+
+
+def test_az_cli_async__stream_az_failure() -> None:
+    script = "import sys; sys.stderr.write('ERROR: job not found'); sys.exit(1)"
+
+    async def collect():
+        return [item async for item in az_cli_async._stream_az([sys.executable, "-c", script])]
+
+    with pytest.raises(RuntimeError, match="job not found"):
+        asyncio.run(collect())
+
+
+def test_az_cli__stream_az_reads_subprocess_output() -> None:
+    script = "import json; print(json.dumps([{'id': i} for i in range(3)]))"
+
+    assert list(az_cli._stream_az([sys.executable, "-c", script])) == [
+        {"id": 0}, {"id": 1}, {"id": 2}]
+
+
+def test_az_cli__stream_az_invalid_output_larger_than_pipe_buffer() -> None:
+    # parsing fails at once while az is still writing
+    script = "import sys; sys.stdout.write('[1, x' + ' ' * 1_000_000 + ']')"
+
+    with pytest.raises(ValueError):
+        list(az_cli._stream_az([sys.executable, "-c", script]))
+
+
+def test_az_cli__stream_az_failure() -> None:
+    script = "import sys; sys.stderr.write('ERROR: job not found'); sys.exit(1)"
+
+    with pytest.raises(RuntimeError, match="job not found"):
+        list(az_cli._stream_az([sys.executable, "-c", script]))
@@ -0,0 +1,49 @@
+import re
+from typing import List, Sequence
+
+import pytest
+
+from azurebatch_cleanup import core, keymap
+
+
+def _reference_key(task_id: str) -> str:
+    return re.sub(r"^nf-([a-f0-9]{2})([a-f0-9]{6}).*$", r"\1/\2", task_id)
+
+
+def test_nextflow_keys__matches_per_task_mapping_on_large_batches() -> None:
+    task_ids = [f"nf-{index:08x}_{index}" for index in range(5000)] + [
+        "nf-ab12",
+        "nf-AB123abc",
+        "nf-ab123abg0",
+        "xnf-ab123abc",
+        "nf-ab123abc",
+        "nf-ab12é3abc",
+        "",
+        "task-1",
+    ]
+
+    assert keymap.nextflow_keys(task_ids) == [_reference_key(task_id) for task_id in task_ids]
+    assert keymap.nextflow_keys(task_ids[-8:]) == [_reference_key(task_id) for task_id in task_ids[-8:]]
+
+
+def test_get_mapper__returns_registered_engine_mappers(monkeypatch) -> None:
+    monkeypatch.setattr(keymap, "_MAPPERS", dict(keymap._MAPPERS))
+
+    def upper_keys(task_ids: Sequence[str]) -> List[str]:
+        return [task_id.upper() for task_id in task_ids]
+
+    keymap.register_mapper("CROMWELL", upper_keys)
+
+    assert keymap.get_mapper("NEXTFLOW") is keymap.nextflow_keys
+    assert keymap.get_mapper("CROMWELL")(["a-1"]) == ["A-1"]
+    with pytest.raises(ValueError, match="SNAKEMAKE"):
+        keymap.get_mapper("SNAKEMAKE")
+
+
+def test_task_keys__strips_ids_and_maps_keys_back() -> None:
+    keys, key2id, shared = core.task_keys(
+        [" nf-ab123abc0 ", "nf-cd456cde1"], keymap.per_task(keymap.nextflow_key))
+
+    assert keys == ["ab/123abc", "cd/456cde"]
+    assert key2id == {"ab/123abc": "nf-ab123abc0", "cd/456cde": "nf-cd456cde1"}
+    assert shared == {}
@@ -0,0 +1,110 @@
+import json
+from datetime import timedelta
+from typing import Iterator, List
+
+import pytest
+
+from azurebatch_cleanup import cp_api, metrics
+from azurebatch_cleanup.core import collect_jobs, delete_jobs
+from azurebatch_cleanup.criteria import CleanupJobCriteria
+from azurebatch_cleanup.io import ConsoleIO
+from azurebatch_cleanup.metrics import MetricsRegistry
+from data_builders import _job, test_now
+
+
+class FakeClock:
+    def __init__(self, steps: List[float]) -> None:
+        self.steps = iter(steps)
+
+    def __call__(self) -> float:
+        return next(self.steps)
+
+
+@pytest.fixture(autouse=True)
+def reset_registry() -> Iterator[None]:
+    metrics.REGISTRY.reset()
+    yield
+    metrics.REGISTRY.reset()
+
+
+def test_registry__counts_calls_errors_bytes_and_latency() -> None:
+    registry = MetricsRegistry(clock=FakeClock([0.0, 0.02, 1.0, 4.0]))
+
+    with registry.timer("op") as call:
+        call.add_bytes(10)
+    with pytest.raises(RuntimeError):
+        with registry.timer("op"):
+            raise RuntimeError("boom")
+
+    stats = registry.snapshot()["operations"]["op"]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 1
+    assert stats["bytes_read"] == 10
+    assert stats["duration_seconds"]["sum"] == pytest.approx(3.02)
+    buckets = stats["duration_seconds"]["buckets"]
+    assert buckets["0.01"] == 0
+    assert buckets["0.025"] == 1
+    assert buckets["2.5"] == 1
+    assert buckets["5.0"] == 2
+    assert buckets["+Inf"] == 2
+
+
+def test_registry__prometheus_textfile() -> None:
+    registry = MetricsRegistry(clock=FakeClock([0.0, 0.5]))
+    with registry.timer('az batch "job" list'):
+        pass
+
+    text = registry.to_prometheus()
+
+    assert '# TYPE azbatch_cleanup_calls_total counter' in text
+    assert 'azbatch_cleanup_calls_total{op="az batch \\"job\\" list"} 1' in text
+    assert 'azbatch_cleanup_duration_seconds_bucket{op="az batch \\"job\\" list",le="0.25"} 0' in text
+    assert 'azbatch_cleanup_duration_seconds_bucket{op="az batch \\"job\\" list",le="0.5"} 1' in text
+    assert 'azbatch_cleanup_duration_seconds_count{op="az batch \\"job\\" list"} 1' in text
+
+
+def test_registry__write_picks_format_from_suffix(tmp_path) -> None:
+    registry = MetricsRegistry()
+    with registry.timer("op"):
+        pass
+
+    registry.write(tmp_path / "metrics.json")
+    registry.write(tmp_path / "metrics.prom")
+
+    assert json.loads((tmp_path / "metrics.json").read_text())["operations"]["op"]["calls"] == 1
+    assert (tmp_path / "metrics.prom").read_text().startswith("# HELP azbatch_cleanup_calls_total")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["metrics.json", "metrics.prom"]
+
+
+def test_instrumentation__collect_jobs_and_deletion_phases() -> None:
+    def list_tasks(job_id: str):
+        if job_id == "job-broken":
+            raise RuntimeError("listing failed")
+        return []
+
+    def get_tasks_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    def delete_job(job_id: str) -> None:
+        raise RuntimeError("delete failed")
+
+    old = test_now - timedelta(hours=5)
+    collect_jobs(
+        lambda: [_job(id="job-1", last_modified=old), _job(id="job-broken", last_modified=old)],
+        list_tasks,
+        CleanupJobCriteria(empty=timedelta(hours=1)),
+        get_tasks_run_info,
+        test_now,
+    )
+    delete_jobs(["job-1"], delete_job, ConsoleIO(printer=lambda message: None))
+
+    operations = metrics.REGISTRY.snapshot()["operations"]
+    assert {op: operations[op]["calls"] for op in operations} == {
+        "collect_jobs": 1,
+        "list_jobs": 1,
+        "list_tasks": 2,
+        "evaluate": 1,
+        "delete_job": 1,
+    }
+    assert operations["list_tasks"]["errors"] == 1
+    assert operations["delete_job"]["errors"] == 1
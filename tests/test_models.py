@@ -0,0 +1,17 @@
+from azurebatch_cleanup.models import JobSlimModel, TaskSlimModel
+
+
+def test_models__raw_retention_is_optional() -> None:
+    data = {"id": "task-1", "state": "active"}
+
+    assert TaskSlimModel.from_az(data).raw == data
+    assert TaskSlimModel.from_az(data, keep_raw=False).raw == {}
+
+
+def test_models__from_az_returns_the_called_class() -> None:
+    job = JobSlimModel.from_az(
+        {"id": "job-1", "state": "active", "lastModified": "2020-01-01T00:00:00+00:00"},
+        keep_raw=False)
+
+    assert type(job) is JobSlimModel
+    assert job.raw == {}
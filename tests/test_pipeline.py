@@ -0,0 +1,90 @@
+from datetime import timedelta
+from typing import List
+
+from azurebatch_cleanup import cp_api
+from azurebatch_cleanup.criteria import CleanupJobCriteria
+from azurebatch_cleanup.io import ConsoleIO
+from azurebatch_cleanup.models import JobModel
+from azurebatch_cleanup.pipeline import run_pipeline
+from data_builders import Recorder, _job, _task, test_now
+
+
+def _jobs() -> List[JobModel]:
+    old = test_now - timedelta(hours=5)
+    return [
+        _job(id="job-empty-1", last_modified=old),
+        _job(id="job-busy", last_modified=old),
+        _job(id="job-empty-2", last_modified=old),
+        _job(id="job-young", last_modified=test_now - timedelta(minutes=5)),
+    ]
+
+
+def _list_tasks(job_id: str):
+    return [_task("nf-1")] if job_id == "job-busy" else []
+
+
+def _no_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+    raise AssertionError("run info must not be requested")
+
+
+def _run(delete_job, *, dry_run=False, assume_yes=True, ignore_errors=False, reply="", printer=None):
+    return run_pipeline(
+        _jobs,
+        _list_tasks,
+        _no_run_info,
+        delete_job,
+        CleanupJobCriteria(empty=timedelta(hours=1)),
+        dry_run=dry_run,
+        assume_yes=assume_yes,
+        ignore_errors=ignore_errors,
+        io=ConsoleIO(printer=printer or Recorder(), reader=lambda prompt: reply),
+        now=test_now,
+        list_concurrency=2,
+        queue_size=1,
+    )
+
+
+def test_run_pipeline__streams_deletions_with_assume_yes() -> None:
+    deleted: List[str] = []
+    printer = Recorder()
+
+    code = _run(deleted.append, printer=printer)
+
+    assert code == 0
+    assert sorted(deleted) == ["job-empty-1", "job-empty-2"]
+    assert "Jobs for deletion: 2/4 (skipped without task listing: 1, task listing failed: 0)" in printer.lines
+    assert "Deleted jobs: 2, failed: 0" in printer.lines
+
+
+def test_run_pipeline__dry_run_deletes_nothing() -> None:
+    deleted: List[str] = []
+    printer = Recorder()
+
+    code = _run(deleted.append, dry_run=True, assume_yes=False, printer=printer)
+
+    assert code == 0
+    assert deleted == []
+    assert "Dry-run mode: no deletions performed." in printer.lines
+
+
+def test_run_pipeline__confirms_plan_before_deleting() -> None:
+    deleted: List[str] = []
+
+    assert _run(deleted.append, assume_yes=False, reply="n") == 0
+    assert deleted == []
+
+    assert _run(deleted.append, assume_yes=False, reply="y") == 0
+    assert sorted(deleted) == ["job-empty-1", "job-empty-2"]
+
+
+def test_run_pipeline__stops_after_failed_deletion() -> None:
+    attempted: List[str] = []
+
+    def delete_job(job_id: str) -> None:
+        attempted.append(job_id)
+        raise RuntimeError("boom")
+
+    code = _run(delete_job)
+
+    assert code == 1
+    assert len(attempted) == 1
@@ -0,0 +1,39 @@
+from typing import List
+
+from azurebatch_cleanup.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket__burst_then_steady_rate() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(2.0, capacity=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        bucket.acquire()
+
+    assert clock.sleeps == [0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_token_bucket__refills_up_to_capacity() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(1.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    clock.now += 10.0
+    bucket.acquire()
+    bucket.acquire()
+
+    assert clock.sleeps == [1.0]
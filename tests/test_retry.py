@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+
+from azurebatch_cleanup import cp_api
+from azurebatch_cleanup.batch_rest import BatchRestError
+from azurebatch_cleanup.retry import (
+    RetryPolicy,
+    call_with_retry,
+    call_with_retry_async,
+    is_transient,
+    job_already_deleted,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _upper_bound(low: float, high: float) -> float:
+    return high
+
+
+class Flaky:
+    def __init__(self, errors: List[Exception]) -> None:
+        self.errors = errors
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def _call(func, policy: RetryPolicy, clock: FakeClock, **kwargs):
+    return call_with_retry(
+        func, policy, clock=clock, sleep=clock.sleep, rng=_upper_bound, **kwargs)
+
+
+def test_call_with_retry__backs_off_exponentially_on_transient_errors() -> None:
+    clock = FakeClock()
+    func = Flaky([
+        RuntimeError("ERROR: (ServerBusy) The server is currently busy"),
+        ConnectionResetError("reset"),
+        TimeoutError("timed out"),
+    ])
+
+    assert _call(func, RetryPolicy(max_attempts=4, base_delay=1.0), clock) == "ok"
+    assert func.calls == 4
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+
+
+def test_call_with_retry__raises_permanent_errors_immediately() -> None:
+    clock = FakeClock()
+    func = Flaky([RuntimeError("ERROR: (JobNotFound) The specified job does not exist.")])
+
+    with pytest.raises(RuntimeError, match="JobNotFound"):
+        _call(func, RetryPolicy(), clock)
+    assert func.calls == 1
+    assert clock.sleeps == []
+
+
+def test_call_with_retry__honours_retry_after_and_attempt_limit() -> None:
+    clock = FakeClock()
+    throttled = [BatchRestError(429, "TooManyRequests", "slow down", retry_after=7.0) for _ in range(3)]
+    func = Flaky(throttled)
+
+    with pytest.raises(BatchRestError):
+        _call(func, RetryPolicy(max_attempts=3, base_delay=1.0), clock)
+    assert func.calls == 3
+    assert clock.sleeps == [7.0, 7.0]
+
+
+def test_call_with_retry__stops_at_deadline() -> None:
+    clock = FakeClock()
+    func = Flaky([TimeoutError("timed out") for _ in range(10)])
+
+    with pytest.raises(TimeoutError):
+        _call(func, RetryPolicy(max_attempts=10, base_delay=4.0, deadline=10.0), clock)
+    # the second wait of 8 s would end 12 s after the first attempt
+    assert clock.sleeps == [4.0]
+
+
+def test_call_with_retry__treats_job_gone_on_retry_as_done() -> None:
+    clock = FakeClock()
+    func = Flaky([
+        TimeoutError("timed out"),
+        BatchRestError(409, "JobBeingDeleted", "The specified job is already being deleted."),
+    ])
+
+    result = _call(func, RetryPolicy(base_delay=0.0), clock, already_done=job_already_deleted)
+
+    assert result is None
+    assert func.calls == 2
+
+
+def test_call_with_retry_async__retries_transient_errors() -> None:
+    func = Flaky([BatchRestError(503, "ServerBusy", "busy")])
+
+    async def call() -> str:
+        return func()
+
+    assert asyncio.run(call_with_retry_async(call, RetryPolicy(base_delay=0.0))) == "ok"
+    assert func.calls == 2
+
+
+def test_is_transient__classifies_status_and_codes() -> None:
+    assert is_transient(BatchRestError(500, None, "oops"))
+    assert is_transient(BatchRestError(409, "ServerBusy", "busy"))
+    assert not is_transient(BatchRestError(403, "AuthenticationFailed", "denied"))
+    assert not is_transient(ValueError("bad input"))
+
+
+def test_parse_retry_after__seconds_and_http_date() -> None:
+    now = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("Wed, 01 Jan 2020 00:00:30 GMT", now) == 30.0
+    assert parse_retry_after("soon") is None
+
+
+def test_get_tasks_run_info__retries_request_with_policy(monkeypatch) -> None:
+    requests: List[List[str]] = []
+
+    def get_run_info_stub(keys_list, engine_type, **kwargs):
+        requests.append(list(keys_list))
+        if len(requests) == 1:
+            raise TimeoutError("timed out")
+        return {"status": "OK", "payload": []}
+
+    monkeypatch.setattr(cp_api, "get_run_info_by_engine_task_keys", get_run_info_stub)
+
+    response = cp_api.get_tasks_run_info(
+        ["aa/000000"], retry_policy=RetryPolicy(base_delay=0.0))
+
+    assert response.status == "OK"
+    assert requests == [["aa/000000"], ["aa/000000"]]
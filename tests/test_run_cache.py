@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Iterable, List
+
+from azurebatch_cleanup import cp_api, metrics
+from azurebatch_cleanup.io import ConsoleIO
+from azurebatch_cleanup.run_cache import RunStatusCache, cached_tasks_run_info
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _response(statuses: dict) -> cp_api.CpApiTaskRunInfoResponse:
+    return cp_api.CpApiTaskRunInfoResponse(
+        status="OK",
+        payload=[
+            cp_api.CpApiRunItem(run=cp_api.CpApiRunInfo(status=status), engine_task_keys=[key])
+            for key, status in statuses.items()
+        ],
+    )
+
+
+def _completed_by_key(response: cp_api.CpApiTaskRunInfoResponse) -> dict:
+    return {
+        key: cp_api.is_run_completed(item.run.status)
+        for item in response.payload for key in item.engine_task_keys
+    }
+
+
+def test_run_cache__terminal_forever_running_until_ttl(tmp_path: Path) -> None:
+    clock = FakeClock()
+    requested: List[List[str]] = []
+
+    def get_tasks_run_info(keys: Iterable[str]) -> cp_api.CpApiTaskRunInfoResponse:
+        key_list = list(keys)
+        requested.append(key_list)
+        return _response({key: {"aa/1": "SUCCESS", "bb/2": "RUNNING"}[key]
+                          for key in key_list if key != "cc/3"})
+
+    cache = RunStatusCache(tmp_path, ttl_seconds=60, clock=clock)
+    cached = cached_tasks_run_info(get_tasks_run_info, cache)
+    keys = ["aa/1", "bb/2", "cc/3"]
+
+    first = cached(keys)
+    clock.now += 30
+    second = cached(keys)
+    clock.now += 60
+    third = cached(keys)
+
+    assert _completed_by_key(first) == {"aa/1": True, "bb/2": False}
+    assert _completed_by_key(second) == _completed_by_key(first)
+    assert _completed_by_key(third) == _completed_by_key(first)
+    assert requested == [keys, ["cc/3"], ["bb/2", "cc/3"]]
+    assert (cache.hits, cache.misses) == (3, 6)
+    printed: List[str] = []
+    cache.report_stats(ConsoleIO(printer=printed.append))
+    assert printed == ["Run status cache: 3 hits, 6 misses"]
+    assert metrics.REGISTRY.snapshot()["gauges"]["cache_hits"]["run_status_cache"] == 3
+    cache.close()
+
+    clock.now += 61
+    reopened = RunStatusCache(tmp_path, ttl_seconds=60, clock=clock)
+    assert reopened.get_many("NEXTFLOW", keys) == {"aa/1": "SUCCESS"}
+    assert reopened.get_many("OTHER", keys) == {}
+    reopened.close()
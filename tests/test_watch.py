@@ -0,0 +1,176 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Optional
+
+from azurebatch_cleanup import cp_api
+from azurebatch_cleanup.core import JsonlReport
+from azurebatch_cleanup.criteria import CleanupJobCriteria
+from azurebatch_cleanup.inventory import InventoryLister, InventoryStore
+from azurebatch_cleanup.io import ConsoleIO
+from azurebatch_cleanup.job_filter import JobListFilter, job_list_filter
+from azurebatch_cleanup.models import JobModel
+from azurebatch_cleanup.watch import run_watch
+from data_builders import Recorder, _job, _task, test_now
+
+
+def test_watch__re_evaluates_changed_and_aged_jobs_only() -> None:
+    jobs: Dict[str, JobModel] = {
+        "job-old": _job(id="job-old", last_modified=test_now - timedelta(hours=5)),
+        "job-young": _job(id="job-young", last_modified=test_now - timedelta(minutes=50)),
+        "job-busy": _job(id="job-busy", last_modified=test_now - timedelta(hours=5)),
+    }
+    ticks = iter([test_now + timedelta(minutes=5 * index) for index in range(4)])
+    listed: List[str] = []
+    deleted: List[str] = []
+
+    def list_jobs() -> List[JobModel]:
+        return list(jobs.values())
+
+    def list_tasks(job_id: str):
+        listed.append(job_id)
+        return [_task("nf-1")] if job_id == "job-busy" else []
+
+    def get_tasks_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    def delete_job(job_id: str) -> None:
+        deleted.append(job_id)
+        del jobs[job_id]
+
+    def clock() -> datetime:
+        return next(ticks)
+
+    code = run_watch(
+        list_jobs,
+        list_tasks,
+        get_tasks_run_info,
+        delete_job,
+        CleanupJobCriteria(empty=timedelta(hours=1)),
+        interval=timedelta(0),
+        stop=threading.Event(),
+        dry_run=False,
+        ignore_errors=False,
+        io=ConsoleIO(printer=Recorder()),
+        clock=clock,
+        max_ticks=4,
+    )
+
+    assert code == 0
+    # tick 1 lists old/busy jobs, tick 3 picks up the young job once it crosses 1h
+    assert listed == ["job-old", "job-busy", "job-young"]
+    assert deleted == ["job-old", "job-young"]
+
+
+def test_watch__rebuilds_job_filter_every_poll() -> None:
+    criteria = CleanupJobCriteria(empty=timedelta(hours=1))
+    jobs = [_job(id="job-new", last_modified=test_now - timedelta(minutes=50))]
+    ticks = iter([test_now, test_now + timedelta(minutes=15)])
+    cutoffs: List[Optional[datetime]] = []
+    deleted: List[str] = []
+
+    def list_jobs(*, job_filter: JobListFilter) -> List[JobModel]:
+        # the service only returns jobs that have not changed since the cutoff
+        cutoffs.append(job_filter.modified_before)
+        return [job for job in jobs if job.last_modified <= job_filter.modified_before]
+
+    def get_tasks_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    code = run_watch(
+        list_jobs,
+        lambda job_id: [],
+        get_tasks_run_info,
+        deleted.append,
+        criteria,
+        interval=timedelta(0),
+        stop=threading.Event(),
+        dry_run=False,
+        ignore_errors=False,
+        io=ConsoleIO(printer=Recorder()),
+        clock=lambda: next(ticks),
+        max_ticks=2,
+        job_filter=partial(job_list_filter, criteria),
+    )
+
+    assert code == 0
+    assert cutoffs == [test_now - timedelta(hours=1), test_now - timedelta(minutes=45)]
+    # created after startup and old enough only on the second poll
+    assert deleted == ["job-new"]
+
+
+def test_watch__report_includes_jobs_whose_task_listing_failed(tmp_path) -> None:
+    old = test_now - timedelta(hours=5)
+    jobs = [_job(id="job-empty", last_modified=old), _job(id="job-broken", last_modified=old)]
+    report_path = tmp_path / "watch.jsonl"
+
+    def list_tasks(job_id: str):
+        if job_id == "job-broken":
+            raise RuntimeError("listing failed")
+        return []
+
+    def get_tasks_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    with JsonlReport(str(report_path)) as report:
+        run_watch(
+            lambda: jobs,
+            list_tasks,
+            get_tasks_run_info,
+            lambda job_id: None,
+            CleanupJobCriteria(empty=timedelta(hours=1)),
+            interval=timedelta(0),
+            stop=threading.Event(),
+            dry_run=True,
+            ignore_errors=False,
+            io=ConsoleIO(printer=Recorder()),
+            clock=lambda: test_now,
+            max_ticks=1,
+            report=report,
+        )
+
+    records = [json.loads(line) for line in report_path.read_text(encoding="utf-8").splitlines()]
+    assert sorted((record["type"], record["job_id"]) for record in records) == [
+        ("candidate", "job-empty"), ("skipped", "job-broken")]
+    assert "listing failed" in next(r["error"] for r in records if r["type"] == "skipped")
+
+
+def test_watch__inventory_candidates_are_relisted_before_deletion(tmp_path) -> None:
+    job = _job(id="job-1", last_modified=test_now - timedelta(hours=5))
+    tasks: Dict[str, List] = {"job-1": []}
+    deleted: List[str] = []
+    store = InventoryStore(tmp_path / "inventory.sqlite3")
+
+    # a previous run stored the job while it had no tasks
+    previous = InventoryLister(store, lambda: [job], lambda job_id: list(tasks[job_id]))
+    for listed_job in previous.list_jobs():
+        previous.list_tasks(listed_job.id)
+    # adding a task does not change the job's eTag
+    tasks["job-1"] = [_task("nf-1")]
+
+    inventory = InventoryLister(store, lambda: [job], lambda job_id: list(tasks[job_id]))
+
+    def get_tasks_run_info(keys) -> cp_api.CpApiTaskRunInfoResponse:
+        raise AssertionError("run info must not be requested")
+
+    code = run_watch(
+        inventory.list_jobs,
+        inventory.list_tasks,
+        get_tasks_run_info,
+        deleted.append,
+        CleanupJobCriteria(empty=timedelta(hours=1)),
+        interval=timedelta(0),
+        stop=threading.Event(),
+        dry_run=False,
+        ignore_errors=False,
+        io=ConsoleIO(printer=Recorder()),
+        clock=lambda: test_now,
+        max_ticks=2,
+        verify_tasks=inventory.verify_tasks,
+    )
+    store.close()
+
+    assert code == 0
+    assert inventory.reused == 1
+    assert deleted == []